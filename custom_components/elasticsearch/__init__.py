@@ -6,6 +6,7 @@ from logging import Logger
 from typing import TYPE_CHECKING
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady, IntegrationError
 from homeassistant.loader import (
     async_get_integration,
@@ -30,7 +31,7 @@ from custom_components.elasticsearch.logger import (
 from .es_integration import ElasticIntegration
 
 if TYPE_CHECKING:  # pragma: no cover
-    from homeassistant.core import HomeAssistant
+    from homeassistant.core import Event, HomeAssistant
 
 type ElasticIntegrationConfigEntry = ConfigEntry[ElasticIntegration]
 
@@ -61,6 +62,13 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ElasticIntegratio
         raise IntegrationError(err) from err
 
     config_entry.runtime_data = integration
+
+    # Config entries are not unloaded when Home Assistant stops, so the queued events are flushed here instead
+    async def async_shutdown_on_stop(event: Event) -> None:
+        await integration.async_shutdown()
+
+    config_entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_shutdown_on_stop))
+
     return True
 
 
@@ -19,6 +19,7 @@ from homeassistant.helpers.selector import (
     BooleanSelectorConfig,
     NumberSelector,
     NumberSelectorConfig,
+    NumberSelectorMode,
     SelectSelector,
     SelectSelectorConfig,
     TargetSelector,
@@ -30,17 +31,71 @@ from homeassistant.helpers.selector import (
 
 from custom_components.elasticsearch.const import (
     CONF_AUTHENTICATION_TYPE,
+    CONF_BULK_ADAPTIVE,
+    CONF_BULK_CHUNK_SIZE,
+    CONF_BULK_CONCURRENCY,
+    CONF_BULK_MAX_CHUNK_BYTES,
+    CONF_BULK_MAX_RETRIES,
+    CONF_BULK_NDJSON_WRITER,
+    CONF_BULK_TARGET_LATENCY,
     CONF_CHANGE_DETECTION_TYPE,
+    CONF_CIRCUIT_BREAKER,
+    CONF_CIRCUIT_BREAKER_MAX_BACKOFF,
+    CONF_DEAD_LETTER_ENABLED,
+    CONF_DEAD_LETTER_MAX_BYTES,
+    CONF_DRAIN_BATCH_SIZE,
+    CONF_DRAIN_BUDGET,
     CONF_EXCLUDE_TARGETS,
+    CONF_FAST_SERIALIZER,
+    CONF_FORMAT_WORKERS,
+    CONF_HEALTH_CHECK_INTERVAL,
+    CONF_HTTP_COMPRESS,
     CONF_INCLUDE_TARGETS,
+    CONF_PASSIVE_HEALTH_CHECK,
     CONF_POLLING_FREQUENCY,
+    CONF_POLLING_KEYFRAME_INTERVAL,
+    CONF_POLLING_SCHEDULE,
+    CONF_POLLING_SLOTS,
     CONF_PUBLISH_FREQUENCY,
+    CONF_PUBLISH_MAX_AGE,
+    CONF_PUBLISH_MAX_BYTES,
+    CONF_PUBLISH_MAX_EVENTS,
+    CONF_QUEUE_COALESCE,
+    CONF_QUEUE_MAX_BYTES,
+    CONF_QUEUE_MAX_EVENTS,
+    CONF_QUEUE_OVERFLOW_POLICY,
+    CONF_SHUTDOWN_FLUSH_TIMEOUT,
+    CONF_SPOOL_ENABLED,
+    CONF_SPOOL_MAX_BYTES,
+    CONF_SPOOL_REPLAY_RATE,
     CONF_SSL_CA_PATH,
     CONF_SSL_VERIFY_HOSTNAME,
     CONF_TAGS,
     CONF_TARGETS_TO_EXCLUDE,
     CONF_TARGETS_TO_INCLUDE,
+    DEFAULT_BULK_CHUNK_SIZE,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BULK_MAX_CHUNK_BYTES,
+    DEFAULT_BULK_MAX_RETRIES,
+    DEFAULT_BULK_TARGET_LATENCY,
+    DEFAULT_CIRCUIT_BREAKER_MAX_BACKOFF,
+    DEFAULT_DEAD_LETTER_MAX_BYTES,
+    DEFAULT_DRAIN_BATCH_SIZE,
+    DEFAULT_DRAIN_BUDGET,
+    DEFAULT_FORMAT_WORKERS,
+    DEFAULT_HEALTH_CHECK_INTERVAL,
+    DEFAULT_POLLING_KEYFRAME_INTERVAL,
+    DEFAULT_POLLING_SLOTS,
+    DEFAULT_PUBLISH_MAX_AGE,
+    DEFAULT_PUBLISH_MAX_BYTES,
+    DEFAULT_PUBLISH_MAX_EVENTS,
+    DEFAULT_QUEUE_MAX_BYTES,
+    DEFAULT_QUEUE_MAX_EVENTS,
+    DEFAULT_SHUTDOWN_FLUSH_TIMEOUT,
+    DEFAULT_SPOOL_MAX_BYTES,
+    DEFAULT_SPOOL_REPLAY_RATE,
     ONE_MINUTE,
+    QueueOverflowPolicy,
     StateChangeType,
 )
 from custom_components.elasticsearch.const import DOMAIN as ELASTIC_DOMAIN
@@ -51,6 +106,7 @@ from custom_components.elasticsearch.errors import (
     UntrustedCertificate,
 )
 from custom_components.elasticsearch.es_gateway_8 import Elasticsearch8Gateway
+from custom_components.elasticsearch.polling_schedule import PollingSchedule
 
 from .logger import LOGGER as BASE_LOGGER
 from .logger import (
@@ -383,16 +439,25 @@ class ElasticOptionsFlowHandler(config_entries.OptionsFlow):
         user_input: dict | None = None,
     ) -> ConfigFlowResult:
         """Publish Options."""
+        errors: dict[str, str] = {}
+
         if user_input is not None:
-            self.options.update(user_input)
+            try:
+                for entry in user_input.get(CONF_POLLING_SCHEDULE, []):
+                    PollingSchedule.parse_entry(entry)
+            except ValueError:
+                errors[CONF_POLLING_SCHEDULE] = "invalid_polling_schedule"
+            else:
+                self.options.update(user_input)
 
-            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+                self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
 
-            return self.async_create_entry(title="", data=self.options)
+                return self.async_create_entry(title="", data=self.options)
 
         return self.async_show_form(
             step_id="options",
             data_schema=self._build_options_schema(),
+            errors=errors,
         )
 
     @log_enter_exit_debug
@@ -436,7 +501,7 @@ class ElasticOptionsFlowHandler(config_entries.OptionsFlow):
             "default": from_options(CONF_TARGETS_TO_EXCLUDE),
         }
 
-        return vol.Schema(
+        schema = vol.Schema(
             {
                 vol.Optional(**SCHEMA_PUBLISH_FREQUENCY): NumberSelector(
                     NumberSelectorConfig(
@@ -478,3 +543,368 @@ class ElasticOptionsFlowHandler(config_entries.OptionsFlow):
                 ),
             }
         )
+
+        if self.show_advanced_options:
+            schema = schema.extend(self._build_advanced_options_schema())
+
+        return schema
+
+    @log_enter_exit_debug
+    def _build_advanced_options_schema(self) -> dict[Any, Any]:
+        """Build the schema for options that are only shown to users in advanced mode."""
+
+        from_options = self.config_entry.options.get
+
+        SCHEMA_QUEUE_MAX_EVENTS = {
+            "schema": CONF_QUEUE_MAX_EVENTS,
+            "default": from_options(CONF_QUEUE_MAX_EVENTS, DEFAULT_QUEUE_MAX_EVENTS),
+        }
+        SCHEMA_QUEUE_MAX_BYTES = {
+            "schema": CONF_QUEUE_MAX_BYTES,
+            "default": from_options(CONF_QUEUE_MAX_BYTES, DEFAULT_QUEUE_MAX_BYTES),
+        }
+        SCHEMA_QUEUE_OVERFLOW_POLICY = {
+            "schema": CONF_QUEUE_OVERFLOW_POLICY,
+            "default": from_options(CONF_QUEUE_OVERFLOW_POLICY, QueueOverflowPolicy.DROP_OLDEST.value),
+        }
+        SCHEMA_QUEUE_COALESCE = {
+            "schema": CONF_QUEUE_COALESCE,
+            "default": from_options(CONF_QUEUE_COALESCE, False),
+        }
+        SCHEMA_PUBLISH_MAX_EVENTS = {
+            "schema": CONF_PUBLISH_MAX_EVENTS,
+            "default": from_options(CONF_PUBLISH_MAX_EVENTS, DEFAULT_PUBLISH_MAX_EVENTS),
+        }
+        SCHEMA_PUBLISH_MAX_BYTES = {
+            "schema": CONF_PUBLISH_MAX_BYTES,
+            "default": from_options(CONF_PUBLISH_MAX_BYTES, DEFAULT_PUBLISH_MAX_BYTES),
+        }
+        SCHEMA_PUBLISH_MAX_AGE = {
+            "schema": CONF_PUBLISH_MAX_AGE,
+            "default": from_options(CONF_PUBLISH_MAX_AGE, DEFAULT_PUBLISH_MAX_AGE),
+        }
+        SCHEMA_SPOOL_ENABLED = {
+            "schema": CONF_SPOOL_ENABLED,
+            "default": from_options(CONF_SPOOL_ENABLED, False),
+        }
+        SCHEMA_SPOOL_MAX_BYTES = {
+            "schema": CONF_SPOOL_MAX_BYTES,
+            "default": from_options(CONF_SPOOL_MAX_BYTES, DEFAULT_SPOOL_MAX_BYTES),
+        }
+        SCHEMA_SPOOL_REPLAY_RATE = {
+            "schema": CONF_SPOOL_REPLAY_RATE,
+            "default": from_options(CONF_SPOOL_REPLAY_RATE, DEFAULT_SPOOL_REPLAY_RATE),
+        }
+        SCHEMA_DEAD_LETTER_ENABLED = {
+            "schema": CONF_DEAD_LETTER_ENABLED,
+            "default": from_options(CONF_DEAD_LETTER_ENABLED, False),
+        }
+        SCHEMA_DEAD_LETTER_MAX_BYTES = {
+            "schema": CONF_DEAD_LETTER_MAX_BYTES,
+            "default": from_options(CONF_DEAD_LETTER_MAX_BYTES, DEFAULT_DEAD_LETTER_MAX_BYTES),
+        }
+        SCHEMA_BULK_CONCURRENCY = {
+            "schema": CONF_BULK_CONCURRENCY,
+            "default": from_options(CONF_BULK_CONCURRENCY, DEFAULT_BULK_CONCURRENCY),
+        }
+        SCHEMA_BULK_CHUNK_SIZE = {
+            "schema": CONF_BULK_CHUNK_SIZE,
+            "default": from_options(CONF_BULK_CHUNK_SIZE, DEFAULT_BULK_CHUNK_SIZE),
+        }
+        SCHEMA_BULK_MAX_CHUNK_BYTES = {
+            "schema": CONF_BULK_MAX_CHUNK_BYTES,
+            "default": from_options(CONF_BULK_MAX_CHUNK_BYTES, DEFAULT_BULK_MAX_CHUNK_BYTES),
+        }
+        SCHEMA_BULK_ADAPTIVE = {
+            "schema": CONF_BULK_ADAPTIVE,
+            "default": from_options(CONF_BULK_ADAPTIVE, False),
+        }
+        SCHEMA_BULK_TARGET_LATENCY = {
+            "schema": CONF_BULK_TARGET_LATENCY,
+            "default": from_options(CONF_BULK_TARGET_LATENCY, DEFAULT_BULK_TARGET_LATENCY),
+        }
+        SCHEMA_BULK_MAX_RETRIES = {
+            "schema": CONF_BULK_MAX_RETRIES,
+            "default": from_options(CONF_BULK_MAX_RETRIES, DEFAULT_BULK_MAX_RETRIES),
+        }
+        SCHEMA_HTTP_COMPRESS = {
+            "schema": CONF_HTTP_COMPRESS,
+            "default": from_options(CONF_HTTP_COMPRESS, False),
+        }
+        SCHEMA_PASSIVE_HEALTH_CHECK = {
+            "schema": CONF_PASSIVE_HEALTH_CHECK,
+            "default": from_options(CONF_PASSIVE_HEALTH_CHECK, False),
+        }
+        SCHEMA_HEALTH_CHECK_INTERVAL = {
+            "schema": CONF_HEALTH_CHECK_INTERVAL,
+            "default": from_options(CONF_HEALTH_CHECK_INTERVAL, DEFAULT_HEALTH_CHECK_INTERVAL),
+        }
+        SCHEMA_CIRCUIT_BREAKER = {
+            "schema": CONF_CIRCUIT_BREAKER,
+            "default": from_options(CONF_CIRCUIT_BREAKER, False),
+        }
+        SCHEMA_CIRCUIT_BREAKER_MAX_BACKOFF = {
+            "schema": CONF_CIRCUIT_BREAKER_MAX_BACKOFF,
+            "default": from_options(CONF_CIRCUIT_BREAKER_MAX_BACKOFF, DEFAULT_CIRCUIT_BREAKER_MAX_BACKOFF),
+        }
+        SCHEMA_FAST_SERIALIZER = {
+            "schema": CONF_FAST_SERIALIZER,
+            "default": from_options(CONF_FAST_SERIALIZER, False),
+        }
+        SCHEMA_BULK_NDJSON_WRITER = {
+            "schema": CONF_BULK_NDJSON_WRITER,
+            "default": from_options(CONF_BULK_NDJSON_WRITER, False),
+        }
+        SCHEMA_FORMAT_WORKERS = {
+            "schema": CONF_FORMAT_WORKERS,
+            "default": from_options(CONF_FORMAT_WORKERS, DEFAULT_FORMAT_WORKERS),
+        }
+        SCHEMA_DRAIN_BATCH_SIZE = {
+            "schema": CONF_DRAIN_BATCH_SIZE,
+            "default": from_options(CONF_DRAIN_BATCH_SIZE, DEFAULT_DRAIN_BATCH_SIZE),
+        }
+        SCHEMA_DRAIN_BUDGET = {
+            "schema": CONF_DRAIN_BUDGET,
+            "default": from_options(CONF_DRAIN_BUDGET, DEFAULT_DRAIN_BUDGET),
+        }
+        SCHEMA_SHUTDOWN_FLUSH_TIMEOUT = {
+            "schema": CONF_SHUTDOWN_FLUSH_TIMEOUT,
+            "default": from_options(CONF_SHUTDOWN_FLUSH_TIMEOUT, DEFAULT_SHUTDOWN_FLUSH_TIMEOUT),
+        }
+        SCHEMA_POLLING_SLOTS = {
+            "schema": CONF_POLLING_SLOTS,
+            "default": from_options(CONF_POLLING_SLOTS, DEFAULT_POLLING_SLOTS),
+        }
+        SCHEMA_POLLING_SCHEDULE = {
+            "schema": CONF_POLLING_SCHEDULE,
+            "default": from_options(CONF_POLLING_SCHEDULE, []),
+        }
+        SCHEMA_POLLING_KEYFRAME_INTERVAL = {
+            "schema": CONF_POLLING_KEYFRAME_INTERVAL,
+            "default": from_options(CONF_POLLING_KEYFRAME_INTERVAL, DEFAULT_POLLING_KEYFRAME_INTERVAL),
+        }
+
+        return {
+            vol.Optional(**SCHEMA_QUEUE_MAX_EVENTS): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=1000000,
+                    step=1000,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="events",
+                )
+            ),
+            vol.Optional(**SCHEMA_QUEUE_MAX_BYTES): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=1073741824,
+                    step=1048576,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="bytes",
+                )
+            ),
+            vol.Optional(**SCHEMA_QUEUE_OVERFLOW_POLICY): SelectSelector(
+                SelectSelectorConfig(
+                    translation_key="queue_overflow_policy",
+                    options=[policy.value for policy in QueueOverflowPolicy],
+                )
+            ),
+            vol.Optional(**SCHEMA_QUEUE_COALESCE): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_PUBLISH_MAX_EVENTS): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=100000,
+                    step=100,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="events",
+                )
+            ),
+            vol.Optional(**SCHEMA_PUBLISH_MAX_BYTES): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=104857600,
+                    step=1048576,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="bytes",
+                )
+            ),
+            vol.Optional(**SCHEMA_PUBLISH_MAX_AGE): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=600,
+                    step=1,
+                    unit_of_measurement="seconds",
+                )
+            ),
+            vol.Optional(**SCHEMA_SPOOL_ENABLED): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_SPOOL_MAX_BYTES): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=10737418240,
+                    step=1048576,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="bytes",
+                )
+            ),
+            vol.Optional(**SCHEMA_SPOOL_REPLAY_RATE): NumberSelector(
+                NumberSelectorConfig(
+                    min=1,
+                    max=100000,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="events/s",
+                )
+            ),
+            vol.Optional(**SCHEMA_DEAD_LETTER_ENABLED): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_DEAD_LETTER_MAX_BYTES): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=1073741824,
+                    step=1048576,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="bytes",
+                )
+            ),
+            vol.Optional(**SCHEMA_BULK_CONCURRENCY): NumberSelector(
+                NumberSelectorConfig(
+                    min=1,
+                    max=8,
+                    step=1,
+                    unit_of_measurement="requests",
+                )
+            ),
+            vol.Optional(**SCHEMA_BULK_CHUNK_SIZE): NumberSelector(
+                NumberSelectorConfig(
+                    min=50,
+                    max=10000,
+                    step=50,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="documents",
+                )
+            ),
+            vol.Optional(**SCHEMA_BULK_MAX_CHUNK_BYTES): NumberSelector(
+                NumberSelectorConfig(
+                    min=1048576,
+                    max=104857600,
+                    step=1048576,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="bytes",
+                )
+            ),
+            vol.Optional(**SCHEMA_BULK_ADAPTIVE): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_BULK_TARGET_LATENCY): NumberSelector(
+                NumberSelectorConfig(
+                    min=0.1,
+                    max=30,
+                    step=0.1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="seconds",
+                )
+            ),
+            vol.Optional(**SCHEMA_BULK_MAX_RETRIES): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=10,
+                    step=1,
+                    unit_of_measurement="retries",
+                )
+            ),
+            vol.Optional(**SCHEMA_HTTP_COMPRESS): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_PASSIVE_HEALTH_CHECK): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_HEALTH_CHECK_INTERVAL): NumberSelector(
+                NumberSelectorConfig(
+                    min=1,
+                    max=3600,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="seconds",
+                )
+            ),
+            vol.Optional(**SCHEMA_CIRCUIT_BREAKER): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_CIRCUIT_BREAKER_MAX_BACKOFF): NumberSelector(
+                NumberSelectorConfig(
+                    min=10,
+                    max=3600,
+                    step=10,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="seconds",
+                )
+            ),
+            vol.Optional(**SCHEMA_FAST_SERIALIZER): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_BULK_NDJSON_WRITER): BooleanSelector(
+                BooleanSelectorConfig(),
+            ),
+            vol.Optional(**SCHEMA_FORMAT_WORKERS): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=8,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="threads",
+                )
+            ),
+            vol.Optional(**SCHEMA_DRAIN_BATCH_SIZE): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=100000,
+                    step=100,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="events",
+                )
+            ),
+            vol.Optional(**SCHEMA_DRAIN_BUDGET): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=1000,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="ms",
+                )
+            ),
+            vol.Optional(**SCHEMA_SHUTDOWN_FLUSH_TIMEOUT): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=120,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="seconds",
+                )
+            ),
+            vol.Optional(**SCHEMA_POLLING_SLOTS): NumberSelector(
+                NumberSelectorConfig(
+                    min=1,
+                    max=3600,
+                    step=1,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="groups",
+                )
+            ),
+            vol.Optional(**SCHEMA_POLLING_SCHEDULE): SelectSelector(
+                SelectSelectorConfig(options=[], custom_value=True, multiple=True)
+            ),
+            vol.Optional(**SCHEMA_POLLING_KEYFRAME_INTERVAL): NumberSelector(
+                NumberSelectorConfig(
+                    min=0,
+                    max=86400,
+                    step=60,
+                    mode=NumberSelectorMode.BOX,
+                    unit_of_measurement="seconds",
+                )
+            ),
+        }
@@ -28,12 +28,94 @@ CONF_SSL_CA_PATH: str = "ssl_ca_path"
 
 CONF_TAGS: str = "tags"
 
+CONF_QUEUE_MAX_EVENTS: str = "queue_max_events"
+CONF_QUEUE_MAX_BYTES: str = "queue_max_bytes"
+CONF_QUEUE_OVERFLOW_POLICY: str = "queue_overflow_policy"
+CONF_QUEUE_COALESCE: str = "queue_coalesce"
+CONF_PUBLISH_MAX_EVENTS: str = "publish_max_events"
+CONF_PUBLISH_MAX_BYTES: str = "publish_max_bytes"
+CONF_PUBLISH_MAX_AGE: str = "publish_max_age"
+CONF_SPOOL_ENABLED: str = "spool_enabled"
+CONF_SPOOL_MAX_BYTES: str = "spool_max_bytes"
+CONF_SPOOL_REPLAY_RATE: str = "spool_replay_rate"
+CONF_DEAD_LETTER_ENABLED: str = "dead_letter_enabled"
+CONF_DEAD_LETTER_MAX_BYTES: str = "dead_letter_max_bytes"
+CONF_BULK_CONCURRENCY: str = "bulk_concurrency"
+CONF_BULK_CHUNK_SIZE: str = "bulk_chunk_size"
+CONF_BULK_MAX_CHUNK_BYTES: str = "bulk_max_chunk_bytes"
+CONF_BULK_ADAPTIVE: str = "bulk_adaptive"
+CONF_BULK_TARGET_LATENCY: str = "bulk_target_latency"
+CONF_BULK_MAX_RETRIES: str = "bulk_max_retries"
+CONF_HTTP_COMPRESS: str = "http_compress"
+CONF_PASSIVE_HEALTH_CHECK: str = "passive_health_check"
+CONF_HEALTH_CHECK_INTERVAL: str = "health_check_interval"
+CONF_CIRCUIT_BREAKER: str = "circuit_breaker"
+CONF_CIRCUIT_BREAKER_MAX_BACKOFF: str = "circuit_breaker_max_backoff"
+CONF_FAST_SERIALIZER: str = "fast_serializer"
+CONF_BULK_NDJSON_WRITER: str = "bulk_ndjson_writer"
+CONF_FORMAT_WORKERS: str = "format_workers"
+CONF_DRAIN_BATCH_SIZE: str = "drain_batch_size"
+CONF_DRAIN_BUDGET: str = "drain_budget"
+CONF_SHUTDOWN_FLUSH_TIMEOUT: str = "shutdown_flush_timeout"
+CONF_POLLING_SLOTS: str = "polling_slots"
+CONF_POLLING_SCHEDULE: str = "polling_schedule"
+CONF_POLLING_KEYFRAME_INTERVAL: str = "polling_keyframe_interval"
+
 # For trimming keys with values that are None, empty lists, or empty objects
 SKIP_VALUES = [None, [], {}]
 
 ONE_MINUTE: int = 60
 ONE_HOUR: int = 60 * 60
 
+# A value of zero leaves the event queue unbounded
+DEFAULT_QUEUE_MAX_EVENTS: int = 0
+DEFAULT_QUEUE_MAX_BYTES: int = 0
+
+# A value of zero only publishes on the publish frequency
+DEFAULT_PUBLISH_MAX_EVENTS: int = 0
+DEFAULT_PUBLISH_MAX_BYTES: int = 0
+DEFAULT_PUBLISH_MAX_AGE: int = 0
+
+DEFAULT_SPOOL_MAX_BYTES: int = 256 * 1024 * 1024
+# Number of spooled events replayed per second once the connection is restored
+DEFAULT_SPOOL_REPLAY_RATE: int = 500
+
+# Size at which the dead letter file is rotated
+DEFAULT_DEAD_LETTER_MAX_BYTES: int = 10 * 1024 * 1024
+
+# Number of bulk requests that may be in flight at once
+DEFAULT_BULK_CONCURRENCY: int = 1
+DEFAULT_BULK_CHUNK_SIZE: int = 500
+DEFAULT_BULK_MAX_CHUNK_BYTES: int = 100 * 1024 * 1024
+# Target duration of a single bulk request, in seconds, when adapting the chunk size
+DEFAULT_BULK_TARGET_LATENCY: float = 1.0
+# Number of times a document which failed with a retryable error is sent again
+DEFAULT_BULK_MAX_RETRIES: int = 3
+
+# Seconds without traffic after which the connection is checked again when tracking its health passively
+DEFAULT_HEALTH_CHECK_INTERVAL: int = 60
+
+# Longest wait, in seconds, between attempts to reach an unreachable cluster
+DEFAULT_CIRCUIT_BREAKER_MAX_BACKOFF: int = 300
+
+# Number of worker threads formatting and encoding events. Zero formats them on the event loop
+DEFAULT_FORMAT_WORKERS: int = 0
+
+# Events handled, or milliseconds spent, before the pipeline yields to the event loop while draining the queue
+# or polling. Zero disables the corresponding limit
+DEFAULT_DRAIN_BATCH_SIZE: int = 1000
+DEFAULT_DRAIN_BUDGET: int = 5
+
+# Seconds spent publishing the queued events on shutdown before the rest is persisted to the spool. Zero, the
+# default, discards the queued events
+DEFAULT_SHUTDOWN_FLUSH_TIMEOUT: int = 0
+
+# Poll every entity at once, rather than spreading polling over the polling frequency
+DEFAULT_POLLING_SLOTS: int = 1
+
+# Publish every polled entity on every poll, whether it changed or not
+DEFAULT_POLLING_KEYFRAME_INTERVAL: int = 0
+
 DATASTREAM_TYPE: str = "metrics"
 DATASTREAM_DATASET_PREFIX: str = "homeassistant"
 DATASTREAM_NAMESPACE: str = "default"
@@ -84,6 +166,14 @@ class StateChangeType(Enum):
         return PUBLISH_REASON_POLLING
 
 
+class QueueOverflowPolicy(Enum):
+    """Event queue overflow policies, applied when the queue reaches its configured capacity."""
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_POLLED_FIRST = "drop_polled_first"
+    COALESCE_PER_ENTITY = "coalesce_per_entity"
+
+
 class CAPABILITIES:
     """Elasticsearch CAPABILITIES constants."""
 
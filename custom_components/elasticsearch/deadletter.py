@@ -0,0 +1,167 @@
+"""Rotating newline-delimited JSON file for documents that Elasticsearch permanently rejected."""
+
+import json
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+from logging import Logger
+from pathlib import Path
+from typing import Any
+
+from .es_gateway import RejectedDocument
+from .logger import LOGGER as BASE_LOGGER
+
+DEAD_LETTER_FILE = "deadletter.ndjson"
+
+DEFAULT_BACKUP_COUNT = 3
+DEFAULT_MAX_BUFFERED = 1000
+
+UNKNOWN_ENTITY = "unknown"
+
+
+class DeadLetterFile:
+    """Record documents that Elasticsearch rejected permanently, e.g. because of a mapping or parsing error.
+
+    Rejected documents are buffered in memory as they are reported, and written as newline-delimited JSON entries
+    holding the original document, the error and the number of documents rejected so far for the same entity. The
+    file is rotated once it reaches its maximum size, keeping a fixed number of older files.
+
+    Rejected documents may be added from the event loop, while flush performs blocking file I/O and must be run in
+    an executor.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        max_buffered: int = DEFAULT_MAX_BUFFERED,
+        log: Logger = BASE_LOGGER,
+    ) -> None:
+        """Initialize the dead letter file."""
+        self._logger = log if log else BASE_LOGGER
+
+        self._path: Path = path
+        self._max_bytes: int = max_bytes
+        self._backup_count: int = backup_count
+        self._max_buffered: int = max_buffered
+
+        self._lock = threading.Lock()
+
+        self._buffer: list[dict[str, Any]] = []
+        self._entities: Counter[str] = Counter()
+
+        self._written: int = 0
+        self._dropped: int = 0
+        self._rotations: int = 0
+
+    @property
+    def file(self) -> Path:
+        """Return the path of the file currently being written."""
+        return self._path / DEAD_LETTER_FILE
+
+    @property
+    def pending(self) -> bool:
+        """Return True if rejected documents are waiting to be flushed.
+
+        The buffer is read without the lock, so a document added concurrently may only be seen by the next check.
+        """
+        return len(self._buffer) > 0
+
+    def add(self, document: RejectedDocument) -> None:
+        """Buffer a rejected document until the next flush."""
+        source = document.action.get("_source", {})
+        entity_id = (
+            source.get("hass.entity.id", UNKNOWN_ENTITY) if isinstance(source, dict) else UNKNOWN_ENTITY
+        )
+
+        with self._lock:
+            self._entities[entity_id] += 1
+
+            if len(self._buffer) >= self._max_buffered:
+                self._dropped += 1
+                return
+
+            self._buffer.append(
+                {
+                    "@timestamp": datetime.now(tz=UTC).isoformat(),
+                    "entity_id": entity_id,
+                    "entity_rejections": self._entities[entity_id],
+                    "index": document.action.get("_index"),
+                    "operation": document.operation,
+                    "status": document.status,
+                    "error": {"type": document.error_type, "reason": document.error_reason},
+                    "source": source,
+                }
+            )
+
+    def flush(self) -> int:
+        """Write the buffered entries to the file, returning the number of entries written."""
+        with self._lock:
+            entries, self._buffer = self._buffer, []
+
+        if not entries:
+            return 0
+
+        data = b"".join(json.dumps(entry, default=str).encode() + b"\n" for entry in entries)
+
+        try:
+            self._path.mkdir(parents=True, exist_ok=True)
+
+            if (
+                self._max_bytes > 0
+                and self.file.exists()
+                and self.file.stat().st_size + len(data) > self._max_bytes
+            ):
+                self._rotate()
+
+            with self.file.open("ab") as dead_letter_file:
+                dead_letter_file.write(data)
+        except OSError:
+            self._restore(entries)
+            raise
+
+        with self._lock:
+            self._written += len(entries)
+
+        self._logger.warning(
+            "Elasticsearch rejected %s event(s). They were written to [%s].", len(entries), self.file
+        )
+
+        return len(entries)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return dead letter statistics for diagnostics."""
+        with self._lock:
+            return {
+                "path": str(self.file),
+                "written": self._written,
+                "buffered": len(self._buffer),
+                "dropped": self._dropped,
+                "rotations": self._rotations,
+                "entities": dict(self._entities.most_common(25)),
+            }
+
+    def _restore(self, entries: list[dict[str, Any]]) -> None:
+        """Put entries that failed to be written back ahead of the buffer, dropping any beyond its limit."""
+        with self._lock:
+            buffer = entries + self._buffer
+            self._dropped += max(0, len(buffer) - self._max_buffered)
+            self._buffer = buffer[: self._max_buffered]
+
+    def _rotate(self) -> None:
+        """Shift the older files along, dropping the oldest, and move the current file to the first backup."""
+        for index in range(self._backup_count - 1, 0, -1):
+            source = self._backup_path(index)
+            if source.exists():
+                source.replace(self._backup_path(index + 1))
+
+        if self._backup_count > 0:
+            self.file.replace(self._backup_path(1))
+        else:
+            self.file.unlink(missing_ok=True)
+
+        self._rotations += 1
+
+    def _backup_path(self, index: int) -> Path:
+        return self._path / f"{DEAD_LETTER_FILE}.{index}"
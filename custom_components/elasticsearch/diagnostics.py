@@ -11,13 +11,22 @@ from homeassistant.const import (
 )
 from homeassistant.core import HomeAssistant
 
+from custom_components.elasticsearch.es_integration import ElasticIntegration
+
 CONFIG_TO_REDACT = {CONF_API_KEY, CONF_PASSWORD, CONF_USERNAME}
 
 
 async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:  # noqa: ARG001
     """Return diagnostics for the config entry."""
 
-    return {
+    diagnostics: dict[str, Any] = {
         "data": async_redact_data(entry.data, CONFIG_TO_REDACT),
         "options": async_redact_data(entry.options, CONFIG_TO_REDACT),
     }
+
+    integration = getattr(entry, "runtime_data", None)
+
+    if isinstance(integration, ElasticIntegration):
+        diagnostics["runtime"] = integration.diagnostics()
+
+    return diagnostics
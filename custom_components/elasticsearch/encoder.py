@@ -3,6 +3,7 @@
 import json
 from typing import Any
 
+import orjson
 from elasticsearch8.serializer import JSONSerializer
 from homeassistant.helpers.json import json_encoder_default
 
@@ -46,6 +47,17 @@ class Serializer(JSONSerializer):
         return super().default(convert_set_to_list(data))
 
 
+class EncodedDocument(dict):
+    """A document which carries its serialized form, so that it is not serialized again when it is published."""
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, document: dict[str, Any], encoded: bytes) -> None:
+        """Initialize the document."""
+        super().__init__(document)
+        self.encoded: bytes = encoded
+
+
 class Encoder(json.JSONEncoder):
     """JSONSerializer which serializes sets to lists."""
 
@@ -56,3 +68,61 @@ class Encoder(json.JSONEncoder):
             return json_encoder_default(o)
         except TypeError:
             return super().default(convert_set_to_list(o))
+
+
+# json writes floats outside of this range in exponent notation, as in 1e-05 and 1e+16, where orjson writes 0.00001 and
+# 1e16. orjson also writes NaN and Infinity as null.
+FAST_SERIALIZER_MIN_FLOAT = 1e-4
+FAST_SERIALIZER_MAX_FLOAT = 1e16
+
+
+def has_float_with_different_encoding(data: Any) -> bool:
+    """Return True if data holds a float which orjson would encode differently from json."""
+
+    data_type = type(data)
+
+    if data_type is float:
+        return data != 0 and not FAST_SERIALIZER_MIN_FLOAT <= abs(data) < FAST_SERIALIZER_MAX_FLOAT
+
+    if data_type is dict:
+        for value in data.values():
+            if has_float_with_different_encoding(value):
+                return True
+
+    elif data_type is list or data_type is tuple:
+        for value in data:
+            if has_float_with_different_encoding(value):
+                return True
+
+    return False
+
+
+class FastSerializer(Serializer):
+    """Serializer which uses orjson, producing the same output as Serializer.
+
+    Data which orjson cannot serialize (integers wider than 64 bits, non-string keys, lone surrogates) or would
+    serialize differently (floats in exponent notation, NaN and Infinity) is serialized by Serializer instead.
+    """
+
+    def json_dumps(self, data: Any) -> bytes:
+        """Serialize data to JSON."""
+
+        if has_float_with_different_encoding(data):
+            return super().json_dumps(data)
+
+        try:
+            return orjson.dumps(data, default=self._orjson_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().json_dumps(data)
+
+    def _orjson_default(self, data: Any) -> Any:
+        """Convert data which orjson cannot serialize natively."""
+
+        result = self.default(data)
+
+        # e.g. a Decimal converted to a float, which orjson would encode differently
+        if has_float_with_different_encoding(result):
+            msg = f"Unable to serialize {data!r} with orjson"
+            raise TypeError(msg)
+
+        return result
@@ -2,8 +2,12 @@
 
 from __future__ import annotations  # noqa: I001
 
+import random
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from enum import Enum
+from http import HTTPStatus
 from types import MappingProxyType
 from typing import TYPE_CHECKING
 from custom_components.elasticsearch.errors import InsufficientPrivileges, UnsupportedVersion
@@ -14,7 +18,7 @@ from .logger import log_enter_exit_debug
 from typing import Any
 
 if TYPE_CHECKING:  # pragma: no cover
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, Callable
     from logging import Logger
 
     from elasticsearch8._async.client import AsyncElasticsearch as AsyncElasticsearch8
@@ -34,9 +38,22 @@ class GatewaySettings(ABC):
     verify_hostname: bool = True
     minimum_version: tuple[int, int] | None = None
     minimum_privileges: MappingProxyType[str, Any] = MappingProxyType[str, Any]({})
+    bulk_chunk_size: int = 500
+    bulk_concurrency: int = 1
+    bulk_max_chunk_bytes: int = 100 * 1024 * 1024
+    bulk_adaptive: bool = False
+    bulk_target_latency: float = 1.0
+    bulk_max_retries: int = 3
+    http_compress: bool = False
+    passive_health_check: bool = False
+    health_check_interval: int = 60
+    circuit_breaker: bool = False
+    circuit_breaker_max_backoff: int = 300
+    fast_serializer: bool = False
+    bulk_ndjson_writer: bool = False
 
     @abstractmethod
-    def to_client(self) -> AsyncElasticsearch8:
+    def to_client(self, compression_stats: CompressionStats | None = None) -> AsyncElasticsearch8:
         """Return an Elasticsearch client."""
 
     def to_dict(self) -> dict:
@@ -53,9 +70,365 @@ class GatewaySettings(ABC):
             "minimum_version": self.minimum_version,
             # Perform a shallow copy of the mapping proxy to allow serialization
             "minimum_privileges": self.minimum_privileges.copy(),
+            "bulk_chunk_size": self.bulk_chunk_size,
+            "bulk_concurrency": self.bulk_concurrency,
+            "bulk_max_chunk_bytes": self.bulk_max_chunk_bytes,
+            "bulk_adaptive": self.bulk_adaptive,
+            "bulk_target_latency": self.bulk_target_latency,
+            "bulk_max_retries": self.bulk_max_retries,
+            "http_compress": self.http_compress,
+            "passive_health_check": self.passive_health_check,
+            "health_check_interval": self.health_check_interval,
+            "circuit_breaker": self.circuit_breaker,
+            "circuit_breaker_max_backoff": self.circuit_breaker_max_backoff,
+            "fast_serializer": self.fast_serializer,
+            "bulk_ndjson_writer": self.bulk_ndjson_writer,
         }
 
 
+class BulkItemOutcome(Enum):
+    """Classification of the outcome of a single document in a bulk request."""
+
+    SUCCEEDED = "succeeded"
+    # The document was already indexed, e.g. a time series document that was sent twice
+    DUPLICATE = "duplicate"
+    # The cluster could not handle the document right now, sending it again later may succeed
+    RETRYABLE = "retryable"
+    # The document was rejected, e.g. because of a mapping or parsing error, and will never succeed
+    PERMANENT = "permanent"
+
+
+RETRYABLE_STATUSES: frozenset[int] = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+)
+
+RETRYABLE_ERROR_TYPES: frozenset[str] = frozenset(
+    {
+        "es_rejected_execution_exception",
+        "circuit_breaking_exception",
+        "timeout_exception",
+        "process_cluster_event_timeout_exception",
+        "unavailable_shards_exception",
+    }
+)
+
+
+def classify_bulk_item(ok: bool, item: dict[str, Any]) -> BulkItemOutcome:
+    """Classify the outcome of a single document from a bulk response item."""
+    if ok:
+        return BulkItemOutcome.SUCCEEDED
+
+    status = item.get("status")
+
+    if status == HTTPStatus.CONFLICT:
+        return BulkItemOutcome.DUPLICATE
+
+    error = item.get("error")
+    error_type = error.get("type") if isinstance(error, dict) else None
+
+    if status in RETRYABLE_STATUSES or error_type in RETRYABLE_ERROR_TYPES:
+        return BulkItemOutcome.RETRYABLE
+
+    return BulkItemOutcome.PERMANENT
+
+
+@dataclass
+class RejectedDocument:
+    """A document which Elasticsearch rejected permanently, along with the reason it was rejected."""
+
+    action: dict[str, Any]
+    operation: str
+    status: int | None = None
+    error_type: str | None = None
+    error_reason: str | None = None
+
+    @classmethod
+    def from_bulk_item(cls, action: dict[str, Any], operation: str, item: dict[str, Any]) -> RejectedDocument:
+        """Create a rejected document from the action that was sent and its bulk response item."""
+        error = item.get("error")
+
+        if isinstance(error, dict):
+            return cls(
+                action=action,
+                operation=operation,
+                status=item.get("status"),
+                error_type=error.get("type"),
+                error_reason=error.get("reason"),
+            )
+
+        return cls(
+            action=action,
+            operation=operation,
+            status=item.get("status"),
+            error_reason=str(error) if error is not None else None,
+        )
+
+
+@dataclass
+class BulkResult:
+    """Outcome of a bulk operation.
+
+    Duplicates are included in the succeeded count. Documents which failed with a retryable error and were handed
+    back to be sent again by a later bulk operation are counted as retried, rather than as succeeded or failed.
+    """
+
+    succeeded: int = 0
+    failed: int = 0
+    throttled: int = 0
+    duplicates: int = 0
+    retried: int = 0
+
+    def __add__(self, other: BulkResult) -> BulkResult:
+        """Combine the outcomes of two bulk operations."""
+        return BulkResult(
+            succeeded=self.succeeded + other.succeeded,
+            failed=self.failed + other.failed,
+            throttled=self.throttled + other.throttled,
+            duplicates=self.duplicates + other.duplicates,
+            retried=self.retried + other.retried,
+        )
+
+    @property
+    def total(self) -> int:
+        """Return the number of documents in the bulk operation."""
+        return self.succeeded + self.failed
+
+
+class CompressionStats:
+    """Track how much smaller compression makes the request bodies sent to Elasticsearch.
+
+    Sizes are accumulated over the lifetime of the gateway and per publish cycle, where a cycle spans a single bulk
+    operation which may be sent as several requests.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the compression statistics."""
+        self._requests: int = 0
+        self._raw_bytes: int = 0
+        self._compressed_bytes: int = 0
+
+        self._cycle_start: tuple[int, int] = (0, 0)
+        self._last_cycle: tuple[int, int] = (0, 0)
+
+    @property
+    def saved_bytes(self) -> int:
+        """Return the number of bytes that compression kept off the wire."""
+        return self._raw_bytes - self._compressed_bytes
+
+    def record(self, raw_bytes: int, compressed_bytes: int) -> None:
+        """Record the size of a request body before and after compression."""
+        self._requests += 1
+        self._raw_bytes += raw_bytes
+        self._compressed_bytes += compressed_bytes
+
+    def start_cycle(self) -> None:
+        """Mark the start of a publish cycle."""
+        self._cycle_start = (self._raw_bytes, self._compressed_bytes)
+
+    def end_cycle(self) -> tuple[int, int]:
+        """Mark the end of a publish cycle, returning the raw and compressed bytes sent during the cycle."""
+        self._last_cycle = (
+            self._raw_bytes - self._cycle_start[0],
+            self._compressed_bytes - self._cycle_start[1],
+        )
+
+        return self._last_cycle
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the compression statistics for diagnostics."""
+        last_raw, last_compressed = self._last_cycle
+
+        return {
+            "requests": self._requests,
+            "raw_bytes": self._raw_bytes,
+            "compressed_bytes": self._compressed_bytes,
+            "saved_bytes": self.saved_bytes,
+            "ratio": round(self._raw_bytes / self._compressed_bytes, 2) if self._compressed_bytes else None,
+            "last_cycle_raw_bytes": last_raw,
+            "last_cycle_compressed_bytes": last_compressed,
+            "last_cycle_saved_bytes": last_raw - last_compressed,
+        }
+
+
+class BulkChunkSizer:
+    """Adapt the number of documents per bulk request to the latency observed from the cluster.
+
+    The chunk size grows by a quarter after each full chunk that completes under the target latency, and is halved
+    after a chunk that is slower than the target or that was throttled or rejected as too large. Chunks are also
+    limited to a byte ceiling when they are sent.
+    """
+
+    GROWTH_FACTOR = 1.25
+    SHRINK_FACTOR = 0.5
+
+    def __init__(
+        self,
+        initial_size: int = 500,
+        minimum_size: int = 50,
+        maximum_size: int = 10000,
+        target_latency: float = 1.0,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+    ) -> None:
+        """Initialize the chunk sizer."""
+        self._minimum_size: int = minimum_size
+        self._maximum_size: int = maximum_size
+        self._target_latency: float = target_latency
+        self._max_chunk_bytes: int = max_chunk_bytes
+
+        self._chunk_size: int = min(max(initial_size, minimum_size), maximum_size)
+        self._last_latency: float | None = None
+
+        self._grown: int = 0
+        self._shrunk: int = 0
+
+    @property
+    def chunk_size(self) -> int:
+        """Return the number of documents to send in the next chunk."""
+        return self._chunk_size
+
+    @property
+    def max_chunk_bytes(self) -> int:
+        """Return the maximum size of a chunk in bytes."""
+        return self._max_chunk_bytes
+
+    def record(self, documents: int, latency: float, throttled: bool = False) -> None:
+        """Adjust the chunk size based on the outcome of a chunk."""
+        self._last_latency = latency
+
+        if throttled or latency > self._target_latency:
+            self.shrink()
+            return
+
+        # A partial chunk says nothing about how the cluster handles a larger one
+        if documents >= self._chunk_size and self._chunk_size < self._maximum_size:
+            self._chunk_size = min(self._maximum_size, int(self._chunk_size * self.GROWTH_FACTOR) + 1)
+            self._grown += 1
+
+    def shrink(self) -> None:
+        """Reduce the chunk size after a slow, throttled or rejected chunk."""
+        if self._chunk_size > self._minimum_size:
+            self._chunk_size = max(self._minimum_size, int(self._chunk_size * self.SHRINK_FACTOR))
+            self._shrunk += 1
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the state of the chunk sizer for diagnostics."""
+        return {
+            "chunk_size": self._chunk_size,
+            "minimum_size": self._minimum_size,
+            "maximum_size": self._maximum_size,
+            "target_latency": self._target_latency,
+            "max_chunk_bytes": self._max_chunk_bytes,
+            "last_latency": self._last_latency,
+            "grown": self._grown,
+            "shrunk": self._shrunk,
+        }
+
+
+class CircuitState(Enum):
+    """States of the circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop contacting an unreachable cluster, probing it again with exponential backoff.
+
+    The breaker starts closed and opens on the first failure. While open, no requests are allowed until the backoff
+    expires, at which point the breaker is half-open and allows a single probe. A successful probe closes the
+    breaker, while a failed probe opens it again with twice the backoff, up to a maximum. Each backoff is reduced
+    by a random amount of up to half, so that many clients do not all reconnect at the same moment.
+    """
+
+    JITTER = 0.5
+
+    def __init__(self, initial_backoff: float = 10.0, max_backoff: float = 300.0) -> None:
+        """Initialize the circuit breaker."""
+        self._initial_backoff: float = initial_backoff
+        self._max_backoff: float = max(max_backoff, initial_backoff)
+
+        self._state: CircuitState = CircuitState.CLOSED
+        self._failures: int = 0
+        self._backoff: float = 0.0
+        self._retry_at: float = 0.0
+        self._probing: bool = False
+
+        self._transitions: dict[str, int] = {}
+
+    @property
+    def state(self) -> CircuitState:
+        """Return the state of the circuit breaker."""
+        return self._state
+
+    @property
+    def backoff(self) -> float:
+        """Return the current backoff, in seconds, before the next probe."""
+        return self._backoff
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to the cluster."""
+        if self._state is CircuitState.CLOSED:
+            return True
+
+        if self._state is CircuitState.OPEN:
+            if time.monotonic() < self._retry_at:
+                return False
+
+            self._transition(CircuitState.HALF_OPEN)
+
+        # Only a single probe is allowed until its outcome is known
+        if self._probing:
+            return False
+
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Record a request that reached the cluster."""
+        self._failures = 0
+        self._backoff = 0.0
+        self._probing = False
+
+        if self._state is not CircuitState.CLOSED:
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the breaker."""
+        self._probing = False
+
+        if self._state is CircuitState.OPEN:
+            return
+
+        self._failures += 1
+        self._backoff = min(self._max_backoff, self._initial_backoff * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + self._backoff * (1 - random.uniform(0, self.JITTER))  # noqa: S311
+
+        self._transition(CircuitState.OPEN)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the state of the circuit breaker for diagnostics."""
+        return {
+            "state": self._state.value,
+            "failures": self._failures,
+            "backoff": self._backoff,
+            "retry_in": max(0.0, round(self._retry_at - time.monotonic(), 1))
+            if self._state is CircuitState.OPEN
+            else None,
+            "transitions": dict(self._transitions),
+        }
+
+    def _transition(self, state: CircuitState) -> None:
+        key = f"{self._state.value}_to_{state.value}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        self._state = state
+
+
 class ElasticsearchGateway(ABC):
     """Encapsulates Elasticsearch operations."""
 
@@ -72,6 +445,18 @@ class ElasticsearchGateway(ABC):
 
         self._previous_ping: bool | None = None
 
+        self._passive_health_check: bool = gateway_settings.passive_health_check
+        self._health_check_interval: int = gateway_settings.health_check_interval
+        self._last_success: float | None = None
+
+        self._rejection_listeners: list[Callable[[RejectedDocument], None]] = []
+        self._retry_listeners: list[Callable[[dict[str, Any]], None]] = []
+        self._requeue_listeners: list[Callable[[dict[str, Any]], None]] = []
+
+        self._circuit_breaker: CircuitBreaker | None = None
+        if gateway_settings.circuit_breaker:
+            self._circuit_breaker = CircuitBreaker(max_backoff=gateway_settings.circuit_breaker_max_backoff)
+
     @log_enter_exit_debug
     async def async_init(self) -> None:
         """I/O bound init."""
@@ -121,7 +506,20 @@ class ElasticsearchGateway(ABC):
         """Retrieve info about the connected elasticsearch cluster."""
 
     async def check_connection(self) -> bool:
-        """Check if the connection to the Elasticsearch cluster is working."""
+        """Check if the connection to the Elasticsearch cluster is working.
+
+        When tracking the connection health passively, recent successful requests stand in for a ping, so the cluster
+        is only pinged after a failed request or once no request has succeeded for the health check interval.
+
+        When the circuit breaker is open, the cluster is not contacted at all until the breaker allows a probe.
+        """
+
+        if self._circuit_breaker is not None and not self._circuit_breaker.allow_request():
+            return False
+
+        if self._recently_succeeded():
+            self._logger.debug("Connection to Elasticsearch is healthy based on recent requests.")
+            return True
 
         previous_ping = self._previous_ping
         new_ping = await self.ping()
@@ -155,6 +553,62 @@ class ElasticsearchGateway(ABC):
 
         return new_ping
 
+    def add_rejection_listener(self, listener: Callable[[RejectedDocument], None]) -> None:
+        """Register a callback to be invoked for each document that Elasticsearch rejects permanently."""
+        self._rejection_listeners.append(listener)
+
+    def _notify_rejected(self, document: RejectedDocument) -> None:
+        """Report a permanently rejected document to the rejection listeners."""
+        for listener in self._rejection_listeners:
+            listener(document)
+
+    def add_retry_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        """Register a callback to be handed each action that failed with a retryable error, to send it again later."""
+        self._retry_listeners.append(listener)
+
+    def _notify_retry(self, action: dict[str, Any]) -> None:
+        """Hand an action which failed with a retryable error to the retry listeners."""
+        for listener in self._retry_listeners:
+            listener(action)
+
+    def add_requeue_listener(self, listener: Callable[[dict[str, Any]], None]) -> None:
+        """Register a callback to be handed each action which was read but never sent, to send it again later."""
+        self._requeue_listeners.append(listener)
+
+    def _notify_requeue(self, action: dict[str, Any]) -> None:
+        """Hand an action which was never sent to the requeue listeners."""
+        for listener in self._requeue_listeners:
+            listener(action)
+
+    def record_success(self) -> None:
+        """Record a request that reached the Elasticsearch cluster."""
+        self._last_success = time.monotonic()
+
+        if self._circuit_breaker is not None:
+            if self._circuit_breaker.state is not CircuitState.CLOSED:
+                self._logger.info("Circuit breaker closed, resuming requests to Elasticsearch.")
+
+            self._circuit_breaker.record_success()
+
+    def record_failure(self) -> None:
+        """Record a request that failed, so that the next connection check pings the cluster."""
+        self._last_success = None
+
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.record_failure()
+
+            self._logger.debug(
+                "Circuit breaker open, pausing requests to Elasticsearch for up to %s seconds.",
+                self._circuit_breaker.backoff,
+            )
+
+    def _recently_succeeded(self) -> bool:
+        """Return True if passive health tracking considers the connection healthy without a ping."""
+        if not self._passive_health_check or not self._previous_ping or self._last_success is None:
+            return False
+
+        return time.monotonic() - self._last_success < self._health_check_interval
+
     @abstractmethod
     async def ping(self) -> bool:
         """Pings the connected elasticsearch cluster."""
@@ -187,6 +641,13 @@ class ElasticsearchGateway(ABC):
     async def bulk(self, actions: AsyncGenerator[dict[str, Any], Any]) -> None:
         """Perform a bulk operation."""
 
+    def diagnostics(self) -> dict[str, Any]:
+        """Return runtime statistics of the gateway for diagnostics."""
+        if self._circuit_breaker is None:
+            return {}
+
+        return {"circuit_breaker": self._circuit_breaker.diagnostics()}
+
     @abstractmethod
     async def stop(self) -> None:
         """Stop the gateway."""
@@ -2,21 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
+import gzip
 import ssl
-from collections import OrderedDict
+import time
+from collections import OrderedDict, deque
 from contextlib import contextmanager
 from dataclasses import dataclass
+from http import HTTPStatus
 from types import MappingProxyType
 from typing import TYPE_CHECKING, Any
 
 import elasticsearch8
-from elastic_transport import ObjectApiResponse
+from elastic_transport import AiohttpHttpNode, HttpHeaders, NodeConfig, ObjectApiResponse
+from elastic_transport.client_utils import DEFAULT, DefaultType
 from elasticsearch8._async.client import AsyncElasticsearch
-from elasticsearch8.helpers import async_streaming_bulk
+from elasticsearch8.helpers import async_streaming_bulk, expand_action
 from homeassistant.util.ssl import client_context
 
 from custom_components.elasticsearch.const import ES_CHECK_PERMISSIONS_DATASTREAM
-from custom_components.elasticsearch.encoder import Serializer
+from custom_components.elasticsearch.encoder import EncodedDocument, FastSerializer, Serializer
 from custom_components.elasticsearch.errors import (
     AuthenticationRequired,
     CannotConnect,
@@ -24,29 +29,184 @@ from custom_components.elasticsearch.errors import (
     ServerError,
     UntrustedCertificate,
 )
-from custom_components.elasticsearch.es_gateway import ElasticsearchGateway, GatewaySettings
+from custom_components.elasticsearch.es_gateway import (
+    RETRYABLE_STATUSES,
+    BulkChunkSizer,
+    BulkItemOutcome,
+    BulkResult,
+    CompressionStats,
+    ElasticsearchGateway,
+    GatewaySettings,
+    RejectedDocument,
+    classify_bulk_item,
+)
 
 from .logger import LOGGER as BASE_LOGGER
 from .logger import async_log_enter_exit_debug
 
 if TYPE_CHECKING:  # pragma: no cover
-    from collections.abc import AsyncGenerator
+    from collections.abc import AsyncGenerator, AsyncIterable, Iterable
     from logging import Logger
 
+    from elastic_transport._node import NodeApiResponse
+
+# Headers of a bulk request whose body is already written as newline-delimited JSON
+BULK_NDJSON_HEADERS = MappingProxyType({"accept": "application/json", "content-type": "application/x-ndjson"})
+
+# Repetitive JSON compresses nearly as well at this level as at the maximum, for a fraction of the CPU time
+GZIP_COMPRESS_LEVEL = 6
+
+# Operation reported for a bulk response item which does not name one
+UNKNOWN_OPERATION = "unknown"
+
+
+class CompressingHttpNode(AiohttpHttpNode):
+    """HTTP node which gzips request bodies and records how much smaller they became."""
+
+    compression_stats: CompressionStats | None = None
+
+    def __init__(self, config: NodeConfig) -> None:
+        """Initialize the node, compressing request bodies here instead of in the transport."""
+        super().__init__(config)
+
+        # The transport would compress the body again, but still asks for compressed responses
+        self._http_compress = False
+
+    @classmethod
+    def with_stats(cls, compression_stats: CompressionStats | None) -> type[CompressingHttpNode]:
+        """Return a node class which records its compression statistics in the provided object."""
+        return type(cls.__name__, (cls,), {"compression_stats": compression_stats})
+
+    # BaseNode declares perform_request as synchronous, which AiohttpHttpNode overrides in the same way
+    async def perform_request(  # type: ignore[override]
+        self,
+        method: str,
+        target: str,
+        body: bytes | None = None,
+        headers: HttpHeaders | None = None,
+        request_timeout: DefaultType | float | None = DEFAULT,
+    ) -> NodeApiResponse:
+        """Compress the request body, if there is one, and perform the request."""
+        if body:
+            compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+
+            if self.compression_stats is not None:
+                self.compression_stats.record(raw_bytes=len(body), compressed_bytes=len(compressed))
+
+            headers = HttpHeaders(headers or {})
+            headers["content-encoding"] = "gzip"
+            body = compressed
+
+        return await super().perform_request(
+            method, target, body=body, headers=headers, request_timeout=request_timeout
+        )
+
+
+class BulkBodyWriter:
+    """Encode bulk actions into the lines of a newline-delimited JSON request body.
+
+    The action line of each operation and index is encoded once and reused for every later document, for as long as
+    the writer is kept.
+    """
+
+    def __init__(self, serializer: Serializer) -> None:
+        """Initialize the writer."""
+        self._serializer: Serializer = serializer
+
+        self._action_lines: dict[tuple[str, str], bytes] = {}
+
+    def encode(self, action: dict[str, Any]) -> tuple[bytes, bytes]:
+        """Return the encoded action line and source line of an action."""
+        if len(action) == 3 and "_source" in action and "_index" in action and "_op_type" in action:
+            key = (action["_op_type"], action["_index"])
+
+            action_line = self._action_lines.get(key)
+            if action_line is None:
+                action_line = self._action_lines[key] = (
+                    self._serializer.json_dumps({key[0]: {"_index": key[1]}}) + b"\n"
+                )
+
+            source = action["_source"]
+
+            # Documents formatted in a worker thread were serialized there already
+            if type(source) is EncodedDocument:
+                return action_line, source.encoded + b"\n"
+
+            return action_line, self._serializer.json_dumps(source) + b"\n"
+
+        # Actions with other metadata are rare, so their action line is not cached
+        metadata, source = expand_action(action)
+
+        return self._serializer.json_dumps(metadata) + b"\n", self._serializer.json_dumps(source) + b"\n"
+
+
+class BulkBody:
+    """Collect encoded bulk actions into chunks of a newline-delimited JSON request body.
+
+    The buffer is reused from one chunk to the next. A chunk is full once it holds the maximum number of actions, or
+    once the next action would take it over the maximum size.
+    """
+
+    def __init__(self, max_chunk_size: int, max_chunk_bytes: int) -> None:
+        """Initialize the body."""
+        self._max_chunk_size: int = max_chunk_size
+        self._max_chunk_bytes: int = max_chunk_bytes
+
+        self._buffer = bytearray()
+        self._actions: list[dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        """Return the number of actions in the current chunk."""
+        return len(self._actions)
+
+    def is_full(self, action_line: bytes, source_line: bytes) -> bool:
+        """Return True if the encoded action does not fit in the current chunk."""
+        if not self._actions:
+            return False
+
+        return (
+            len(self._actions) >= self._max_chunk_size
+            or len(self._buffer) + len(action_line) + len(source_line) > self._max_chunk_bytes
+        )
+
+    def add(self, action: dict[str, Any], action_line: bytes, source_line: bytes) -> None:
+        """Append an encoded action to the current chunk."""
+        self._buffer += action_line
+        self._buffer += source_line
+        self._actions.append(action)
+
+    def take(self) -> tuple[bytes, list[dict[str, Any]]]:
+        """Return the body and actions of the current chunk, and start a new chunk."""
+        body = bytes(self._buffer)
+        actions = self._actions
+
+        self._buffer.clear()
+        self._actions = []
+
+        return body, actions
+
 
 @dataclass
 class Gateway8Settings(GatewaySettings):
     """Elasticsearch Gateway settings object."""
 
-    def to_client(self) -> AsyncElasticsearch:
+    def to_serializer(self) -> Serializer:
+        """Create the serializer which encodes request bodies."""
+        return FastSerializer() if self.fast_serializer else Serializer()
+
+    def to_client(self, compression_stats: CompressionStats | None = None) -> AsyncElasticsearch:
         """Create an Elasticsearch client from the settings."""
 
         settings = {
             "hosts": [self.url],
-            "serializer": Serializer(),
+            "serializer": self.to_serializer(),
             "request_timeout": self.request_timeout,
         }
 
+        if self.http_compress:
+            settings["http_compress"] = True
+            settings["node_class"] = CompressingHttpNode.with_stats(compression_stats)
+
         if self.url.startswith("https"):
             context: ssl.SSLContext = client_context()
 
@@ -90,7 +250,23 @@ class Elasticsearch8Gateway(ElasticsearchGateway):
         )
 
         self._settings = gateway_settings
-        self._client = self._settings.to_client()
+
+        self._compression_stats: CompressionStats | None = None
+        if self._settings.http_compress:
+            self._compression_stats = CompressionStats()
+
+        self._client = self._settings.to_client(compression_stats=self._compression_stats)
+
+        # Kept for the life of the gateway, so that the encoded action lines are reused across publishes
+        self._body_writer = BulkBodyWriter(serializer=self._settings.to_serializer())
+
+        self._chunk_sizer: BulkChunkSizer | None = None
+        if self._settings.bulk_adaptive:
+            self._chunk_sizer = BulkChunkSizer(
+                initial_size=self._settings.bulk_chunk_size,
+                target_latency=self._settings.bulk_target_latency,
+                max_chunk_bytes=self._settings.bulk_max_chunk_bytes,
+            )
 
     async def async_init(self) -> None:
         """Initialize the Elasticsearch Gateway."""
@@ -162,18 +338,21 @@ class Elasticsearch8Gateway(ElasticsearchGateway):
 
         except AuthenticationRequired:
             self._previous_ping = False
+            self.record_failure()
 
             self._logger.debug("Authentication error pinging Elasticsearch", exc_info=True)
 
             raise
         except:  # noqa: E722
             self._previous_ping = False
+            self.record_failure()
 
             self._logger.debug("Error pinging Elasticsearch", exc_info=True)
 
             return False
         else:
             self._previous_ping = True
+            self.record_success()
 
             return True
 
@@ -246,32 +425,358 @@ class Elasticsearch8Gateway(ElasticsearchGateway):
     async def bulk(self, actions: AsyncGenerator[dict[str, Any], Any]) -> None:
         """Perform a bulk operation."""
 
-        with self._error_converter("Error performing bulk operation"):
-            count = 0
-            okcount = 0
-            errcount = 0
-            async for ok, result in async_streaming_bulk(
-                client=self.client,
-                actions=actions,
-                max_retries=3,
-                raise_on_error=False,
-                yield_ok=True,
-            ):
-                count += 1
-                action, outcome = result.popitem()
-                if not ok:
-                    errcount += 1
-                    self._logger.error("failed to %s, error information: %s", action, outcome)
+        if self._compression_stats is not None:
+            self._compression_stats.start_cycle()
+
+        try:
+            with self._error_converter("Error performing bulk operation"):
+                if self._settings.bulk_concurrency > 1 or self._chunk_sizer is not None:
+                    result = await self._bulk_chunked(actions)
                 else:
-                    okcount += 1
+                    result = await self._bulk_chunk(actions)
+        except Exception as err:
+            if self._is_connection_failure(err):
+                self.record_failure()
+            raise
+
+        # An empty bulk operation never reaches the cluster, so it says nothing about the connection
+        if result.total > 0:
+            self.record_success()
+
+        if self._compression_stats is not None:
+            raw_bytes, compressed_bytes = self._compression_stats.end_cycle()
+
+            if raw_bytes > 0:
+                self._logger.debug(
+                    "Compressed bulk requests from %d to %d bytes, saving %d bytes",
+                    raw_bytes,
+                    compressed_bytes,
+                    raw_bytes - compressed_bytes,
+                )
+
+        if result.total > 0:
+            if result.failed == 0:
+                self._logger.info("Successfully published %d documents", result.succeeded)
+            elif result.failed > 0:
+                self._logger.error("Failed to publish %d of %d documents", result.failed, result.total)
+        else:
+            self._logger.debug("Publish skipped, no new events to publish.")
+
+    @staticmethod
+    def _is_connection_failure(err: Exception) -> bool:
+        """Determine if an error means that the cluster could not be reached or could not handle a request.
+
+        Errors caused by the request itself, such as a rejected request body or a bug, say nothing about the
+        connection and are left out of its health.
+        """
+        if isinstance(err, TimeoutError):
+            return True
+
+        if not isinstance(err, CannotConnect):
+            return False
+
+        if isinstance(err.__cause__, elasticsearch8.ApiError):
+            status = err.__cause__.status_code
+
+            return status == HTTPStatus.TOO_MANY_REQUESTS or status >= HTTPStatus.INTERNAL_SERVER_ERROR
+
+        return True
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return runtime statistics of the gateway for diagnostics."""
+        diagnostics: dict[str, Any] = super().diagnostics()
+
+        if self._chunk_sizer is not None:
+            diagnostics["bulk_chunk_sizer"] = self._chunk_sizer.diagnostics()
+
+        if self._compression_stats is not None:
+            diagnostics["compression"] = self._compression_stats.diagnostics()
+
+        return diagnostics
+
+    def _chunk_size(self) -> int:
+        """Return the number of documents to send per bulk request."""
+        if self._chunk_sizer is not None:
+            return self._chunk_sizer.chunk_size
+
+        return self._settings.bulk_chunk_size
+
+    async def _bulk_chunk(
+        self, actions: AsyncIterable[dict[str, Any]] | Iterable[dict[str, Any]]
+    ) -> BulkResult:
+        """Stream actions to Elasticsearch once, handing documents which failed with a retryable error back.
+
+        Waiting to retry documents here would hold up the caller, so they are handed to the retry listeners to be
+        sent again by a later bulk operation. Without retry listeners, they are counted as failed. Other documents
+        are never sent twice.
+        """
+        result = BulkResult()
+
+        to_retry = await self._bulk_attempt(actions, result)
+
+        if not to_retry:
+            return result
+
+        if self._hand_back(to_retry):
+            result.retried += len(to_retry)
+        else:
+            result.failed += len(to_retry)
+
+        return result
 
-            if count > 0:
-                if errcount == 0:
-                    self._logger.info("Successfully published %d documents", okcount)
-                elif errcount > 0:
-                    self._logger.error("Failed to publish %d of %d documents", errcount, count)
+    def _hand_back(self, actions: list[dict[str, Any]]) -> bool:
+        """Hand actions to the retry listeners to be sent again by a later bulk operation.
+
+        Returns False, after logging the documents as failed, when there are no retry listeners.
+        """
+        if not self._retry_listeners:
+            self._logger.error("Failed to publish %d documents which can be retried", len(actions))
+            return False
+
+        self._logger.debug("Handing back %d documents to be retried", len(actions))
+
+        for action in actions:
+            self._notify_retry(action)
+
+        return True
+
+    def _requeue(self, actions: list[dict[str, Any]]) -> None:
+        """Hand actions which were read but never sent to the requeue listeners, as they did not use up an attempt.
+
+        Without requeue listeners, they are handed back to be retried instead.
+        """
+        if not self._requeue_listeners:
+            self._hand_back(actions)
+            return
+
+        self._logger.debug("Requeueing %d documents which were not sent", len(actions))
+
+        for action in actions:
+            self._notify_requeue(action)
+
+    async def _bulk_attempt(
+        self, actions: AsyncIterable[dict[str, Any]] | Iterable[dict[str, Any]], result: BulkResult
+    ) -> list[dict[str, Any]]:
+        """Send actions once, counting their outcome and returning the actions which should be retried."""
+        to_retry: list[dict[str, Any]] = []
+
+        # Responses are yielded in the order actions are read, which lets a failed item be matched to its action
+        in_flight: deque[dict[str, Any]] = deque()
+
+        async def track() -> AsyncGenerator[dict[str, Any], Any]:
+            if hasattr(actions, "__aiter__"):
+                async for action in actions:
+                    in_flight.append(action)
+                    yield action
+            else:
+                for action in actions:
+                    in_flight.append(action)
+                    yield action
+
+        try:
+            if self._settings.bulk_ndjson_writer:
+                await self._bulk_write(actions, in_flight, result, to_retry)
+            else:
+                async for ok, item in async_streaming_bulk(
+                    client=self.client,
+                    actions=track(),
+                    chunk_size=self._chunk_size(),
+                    max_chunk_bytes=self._settings.bulk_max_chunk_bytes,
+                    max_retries=0,
+                    raise_on_error=False,
+                    yield_ok=True,
+                ):
+                    self._record_item(in_flight.popleft(), ok, item, result, to_retry)
+
+        except elasticsearch8.ApiError as err:
+            if err.status_code not in RETRYABLE_STATUSES:
+                raise
+
+            # The whole request was rejected, so every document it contained is retried. Unread actions are left
+            # for the next publish.
+            if err.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                result.throttled += len(in_flight)
+
+            to_retry.extend(in_flight)
+
+        return to_retry
+
+    async def _bulk_write(
+        self,
+        actions: AsyncIterable[dict[str, Any]] | Iterable[dict[str, Any]],
+        in_flight: deque[dict[str, Any]],
+        result: BulkResult,
+        to_retry: list[dict[str, Any]],
+    ) -> None:
+        """Send actions in chunks written directly as newline-delimited JSON, recording the outcome of each item.
+
+        Every action read is kept in in_flight until its response is recorded, including the action which did not
+        fit in the chunk being sent, so that a rejected request retries it as well.
+        """
+        chunk = BulkBody(
+            max_chunk_size=self._chunk_size(), max_chunk_bytes=self._settings.bulk_max_chunk_bytes
+        )
+
+        async def send() -> None:
+            body, _ = chunk.take()
+
+            # The body is already encoded, so it is sent as is rather than through the bulk API's operations
+            response = await self.client.perform_request(
+                "PUT", "/_bulk", body=body, headers=BULK_NDJSON_HEADERS, endpoint_id="bulk"
+            )
+
+            for item in response.body["items"]:
+                _, outcome = self._item_outcome(item)
+                status = outcome.get("status", HTTPStatus.INTERNAL_SERVER_ERROR)
+                ok = HTTPStatus.OK <= status < HTTPStatus.MULTIPLE_CHOICES
+                self._record_item(in_flight.popleft(), ok, item, result, to_retry)
+
+        async def write(action: dict[str, Any]) -> None:
+            in_flight.append(action)
+
+            action_line, source_line = self._body_writer.encode(action)
+
+            if chunk.is_full(action_line, source_line):
+                await send()
+
+            chunk.add(action, action_line, source_line)
+
+        if hasattr(actions, "__aiter__"):
+            async for action in actions:
+                await write(action)
+        else:
+            for action in actions:
+                await write(action)
+
+        if len(chunk) > 0:
+            await send()
+
+    def _record_item(
+        self,
+        document: dict[str, Any],
+        ok: bool,
+        item: dict[str, Any],
+        result: BulkResult,
+        to_retry: list[dict[str, Any]],
+    ) -> None:
+        """Count the outcome of a single document, queueing it for a retry or reporting it as rejected."""
+        operation, outcome = self._item_outcome(item)
+
+        if outcome.get("status") == HTTPStatus.TOO_MANY_REQUESTS:
+            result.throttled += 1
+
+        match classify_bulk_item(ok, outcome):
+            case BulkItemOutcome.SUCCEEDED:
+                result.succeeded += 1
+            case BulkItemOutcome.DUPLICATE:
+                result.succeeded += 1
+                result.duplicates += 1
+            case BulkItemOutcome.RETRYABLE:
+                to_retry.append(document)
+            case BulkItemOutcome.PERMANENT:
+                result.failed += 1
+
+                # Rejected documents are only logged individually when nothing else records them
+                if self._rejection_listeners:
+                    self._notify_rejected(RejectedDocument.from_bulk_item(document, operation, outcome))
+                else:
+                    self._logger.error("failed to %s, error information: %s", operation, outcome)
+
+    @staticmethod
+    def _item_outcome(item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """Return the operation and outcome of a bulk response item, without changing the response.
+
+        An empty or malformed item has no status, so its document is recorded as failed rather than raising.
+        """
+        operation, outcome = next(iter(item.items()), (UNKNOWN_OPERATION, {}))
+
+        return operation, outcome if isinstance(outcome, dict) else {}
+
+    async def _send_chunk(self, chunk: list[dict[str, Any]]) -> BulkResult:
+        """Send a single chunk of actions, feeding its latency and outcome to the chunk sizer."""
+        if self._chunk_sizer is None:
+            return await self._bulk_chunk(chunk)
+
+        start = time.monotonic()
+
+        try:
+            result = await self._bulk_chunk(chunk)
+        except elasticsearch8.ApiError as err:
+            if err.status_code in (HTTPStatus.REQUEST_ENTITY_TOO_LARGE, HTTPStatus.TOO_MANY_REQUESTS):
+                self._chunk_sizer.shrink()
+            raise
+
+        self._chunk_sizer.record(
+            documents=len(chunk), latency=time.monotonic() - start, throttled=result.throttled > 0
+        )
+
+        return result
+
+    async def _bulk_chunked(self, actions: AsyncGenerator[dict[str, Any], Any]) -> BulkResult:
+        """Send chunks of actions with up to the configured number of bulk requests in flight.
+
+        Chunks may complete out of order. The first request error stops reading actions, and is raised once the
+        other requests in flight have completed. The chunk which was read but not yet sent is requeued, and unread
+        actions are left for the next publish. If the bulk operation is cancelled, the requests in flight are
+        cancelled and their chunks are requeued too, so they may be published twice rather than lost.
+        """
+        in_flight = asyncio.Semaphore(self._settings.bulk_concurrency)
+        tasks: dict[asyncio.Task[BulkResult], list[dict[str, Any]]] = {}
+        chunk: list[dict[str, Any]] = []
+
+        async def send(chunk: list[dict[str, Any]]) -> BulkResult:
+            try:
+                return await self._send_chunk(chunk)
+            finally:
+                in_flight.release()
+
+        async def dispatch(chunk: list[dict[str, Any]]) -> bool:
+            """Send a chunk once a request can be made, unless a previous chunk failed."""
+            await in_flight.acquire()
+
+            if any(task.done() and not task.cancelled() and task.exception() is not None for task in tasks):
+                in_flight.release()
+                return False
+
+            tasks[asyncio.create_task(send(chunk))] = chunk
+            return True
+
+        try:
+            async for action in actions:
+                chunk.append(action)
+
+                if len(chunk) >= self._chunk_size():
+                    if not await dispatch(chunk):
+                        break
+
+                    chunk = []
             else:
-                self._logger.debug("Publish skipped, no new events to publish.")
+                if chunk and await dispatch(chunk):
+                    chunk = []
+
+            if tasks:
+                await asyncio.wait(tasks)
+
+        except BaseException:
+            cancelled = [task for task in tasks if not task.done()]
+
+            for task in cancelled:
+                task.cancel()
+
+            unsent = chunk + [action for task in cancelled for action in tasks[task]]
+
+            if unsent:
+                self._requeue(unsent)
+            raise
+
+        if chunk:
+            self._requeue(chunk)
+
+        for task in tasks:
+            if (err := task.exception()) is not None:
+                raise err
+
+        return sum((task.result() for task in tasks), BulkResult())
 
     async def stop(self) -> None:
         """Stop the gateway."""
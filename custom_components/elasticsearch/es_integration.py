@@ -15,18 +15,72 @@ from homeassistant.const import (
 )
 
 from custom_components.elasticsearch.const import (
+    CONF_BULK_ADAPTIVE,
+    CONF_BULK_CHUNK_SIZE,
+    CONF_BULK_CONCURRENCY,
+    CONF_BULK_MAX_CHUNK_BYTES,
+    CONF_BULK_MAX_RETRIES,
+    CONF_BULK_NDJSON_WRITER,
+    CONF_BULK_TARGET_LATENCY,
     CONF_CHANGE_DETECTION_TYPE,
+    CONF_CIRCUIT_BREAKER,
+    CONF_CIRCUIT_BREAKER_MAX_BACKOFF,
+    CONF_DEAD_LETTER_ENABLED,
+    CONF_DEAD_LETTER_MAX_BYTES,
     CONF_DEBUG_ATTRIBUTE_FILTERING,
+    CONF_DRAIN_BATCH_SIZE,
+    CONF_DRAIN_BUDGET,
     CONF_EXCLUDE_TARGETS,
+    CONF_FAST_SERIALIZER,
+    CONF_FORMAT_WORKERS,
+    CONF_HEALTH_CHECK_INTERVAL,
+    CONF_HTTP_COMPRESS,
     CONF_INCLUDE_TARGETS,
+    CONF_PASSIVE_HEALTH_CHECK,
     CONF_POLLING_FREQUENCY,
+    CONF_POLLING_KEYFRAME_INTERVAL,
+    CONF_POLLING_SCHEDULE,
+    CONF_POLLING_SLOTS,
     CONF_PUBLISH_FREQUENCY,
+    CONF_PUBLISH_MAX_AGE,
+    CONF_PUBLISH_MAX_BYTES,
+    CONF_PUBLISH_MAX_EVENTS,
+    CONF_QUEUE_COALESCE,
+    CONF_QUEUE_MAX_BYTES,
+    CONF_QUEUE_MAX_EVENTS,
+    CONF_QUEUE_OVERFLOW_POLICY,
+    CONF_SHUTDOWN_FLUSH_TIMEOUT,
+    CONF_SPOOL_ENABLED,
+    CONF_SPOOL_MAX_BYTES,
+    CONF_SPOOL_REPLAY_RATE,
     CONF_SSL_CA_PATH,
     CONF_SSL_VERIFY_HOSTNAME,
     CONF_TAGS,
     CONF_TARGETS_TO_EXCLUDE,
     CONF_TARGETS_TO_INCLUDE,
+    DEFAULT_BULK_CHUNK_SIZE,
+    DEFAULT_BULK_CONCURRENCY,
+    DEFAULT_BULK_MAX_CHUNK_BYTES,
+    DEFAULT_BULK_MAX_RETRIES,
+    DEFAULT_BULK_TARGET_LATENCY,
+    DEFAULT_CIRCUIT_BREAKER_MAX_BACKOFF,
+    DEFAULT_DEAD_LETTER_MAX_BYTES,
+    DEFAULT_DRAIN_BATCH_SIZE,
+    DEFAULT_DRAIN_BUDGET,
+    DEFAULT_FORMAT_WORKERS,
+    DEFAULT_HEALTH_CHECK_INTERVAL,
+    DEFAULT_POLLING_KEYFRAME_INTERVAL,
+    DEFAULT_POLLING_SLOTS,
+    DEFAULT_PUBLISH_MAX_AGE,
+    DEFAULT_PUBLISH_MAX_BYTES,
+    DEFAULT_PUBLISH_MAX_EVENTS,
+    DEFAULT_QUEUE_MAX_BYTES,
+    DEFAULT_QUEUE_MAX_EVENTS,
+    DEFAULT_SHUTDOWN_FLUSH_TIMEOUT,
+    DEFAULT_SPOOL_MAX_BYTES,
+    DEFAULT_SPOOL_REPLAY_RATE,
     ES_CHECK_PERMISSIONS_DATASTREAM,
+    QueueOverflowPolicy,
 )
 from custom_components.elasticsearch.errors import ESIntegrationException
 from custom_components.elasticsearch.es_datastream_manager import DatastreamManager
@@ -90,9 +144,16 @@ class ElasticIntegration:
 
     async def async_shutdown(self) -> None:
         """Async shutdown procedure."""
-        self._pipeline_manager.stop()
+        await self._pipeline_manager.async_shutdown()
         await self._gateway.stop()
 
+    def diagnostics(self) -> dict[str, Any]:
+        """Return runtime statistics of the integration components."""
+        return {
+            "gateway": self._gateway.diagnostics(),
+            "pipeline": self._pipeline_manager.diagnostics(),
+        }
+
     @classmethod
     def build_gateway_parameters(
         cls,
@@ -110,6 +171,29 @@ class ElasticIntegration:
             ca_certs=config_entry.data.get(CONF_SSL_CA_PATH),
             request_timeout=config_entry.data.get(CONF_TIMEOUT, 30),
             minimum_privileges=minimum_privileges,
+            bulk_concurrency=int(config_entry.options.get(CONF_BULK_CONCURRENCY, DEFAULT_BULK_CONCURRENCY)),
+            bulk_chunk_size=int(config_entry.options.get(CONF_BULK_CHUNK_SIZE, DEFAULT_BULK_CHUNK_SIZE)),
+            bulk_max_chunk_bytes=int(
+                config_entry.options.get(CONF_BULK_MAX_CHUNK_BYTES, DEFAULT_BULK_MAX_CHUNK_BYTES)
+            ),
+            bulk_adaptive=config_entry.options.get(CONF_BULK_ADAPTIVE, False),
+            bulk_target_latency=float(
+                config_entry.options.get(CONF_BULK_TARGET_LATENCY, DEFAULT_BULK_TARGET_LATENCY)
+            ),
+            bulk_max_retries=int(config_entry.options.get(CONF_BULK_MAX_RETRIES, DEFAULT_BULK_MAX_RETRIES)),
+            http_compress=config_entry.options.get(CONF_HTTP_COMPRESS, False),
+            passive_health_check=config_entry.options.get(CONF_PASSIVE_HEALTH_CHECK, False),
+            health_check_interval=int(
+                config_entry.options.get(CONF_HEALTH_CHECK_INTERVAL, DEFAULT_HEALTH_CHECK_INTERVAL)
+            ),
+            circuit_breaker=config_entry.options.get(CONF_CIRCUIT_BREAKER, False),
+            circuit_breaker_max_backoff=int(
+                config_entry.options.get(
+                    CONF_CIRCUIT_BREAKER_MAX_BACKOFF, DEFAULT_CIRCUIT_BREAKER_MAX_BACKOFF
+                )
+            ),
+            fast_serializer=config_entry.options.get(CONF_FAST_SERIALIZER, False),
+            bulk_ndjson_writer=config_entry.options.get(CONF_BULK_NDJSON_WRITER, False),
         )
 
     @classmethod
@@ -135,6 +219,40 @@ class ElasticIntegration:
             excluded_devices=config_entry.options[CONF_TARGETS_TO_EXCLUDE].get("device_id", []),
             included_entities=config_entry.options[CONF_TARGETS_TO_INCLUDE].get("entity_id", []),
             excluded_entities=config_entry.options[CONF_TARGETS_TO_EXCLUDE].get("entity_id", []),
+            queue_max_events=int(config_entry.options.get(CONF_QUEUE_MAX_EVENTS, DEFAULT_QUEUE_MAX_EVENTS)),
+            queue_max_bytes=int(config_entry.options.get(CONF_QUEUE_MAX_BYTES, DEFAULT_QUEUE_MAX_BYTES)),
+            queue_overflow_policy=QueueOverflowPolicy(
+                config_entry.options.get(CONF_QUEUE_OVERFLOW_POLICY, QueueOverflowPolicy.DROP_OLDEST.value)
+            ),
+            queue_coalesce=config_entry.options.get(CONF_QUEUE_COALESCE, False),
+            publish_max_events=int(
+                config_entry.options.get(CONF_PUBLISH_MAX_EVENTS, DEFAULT_PUBLISH_MAX_EVENTS)
+            ),
+            publish_max_bytes=int(
+                config_entry.options.get(CONF_PUBLISH_MAX_BYTES, DEFAULT_PUBLISH_MAX_BYTES)
+            ),
+            publish_max_age=int(config_entry.options.get(CONF_PUBLISH_MAX_AGE, DEFAULT_PUBLISH_MAX_AGE)),
+            spool_enabled=config_entry.options.get(CONF_SPOOL_ENABLED, False),
+            spool_max_bytes=int(config_entry.options.get(CONF_SPOOL_MAX_BYTES, DEFAULT_SPOOL_MAX_BYTES)),
+            spool_replay_rate=int(
+                config_entry.options.get(CONF_SPOOL_REPLAY_RATE, DEFAULT_SPOOL_REPLAY_RATE)
+            ),
+            dead_letter_enabled=config_entry.options.get(CONF_DEAD_LETTER_ENABLED, False),
+            dead_letter_max_bytes=int(
+                config_entry.options.get(CONF_DEAD_LETTER_MAX_BYTES, DEFAULT_DEAD_LETTER_MAX_BYTES)
+            ),
+            fast_serializer=config_entry.options.get(CONF_FAST_SERIALIZER, False),
+            format_workers=int(config_entry.options.get(CONF_FORMAT_WORKERS, DEFAULT_FORMAT_WORKERS)),
+            drain_batch_size=int(config_entry.options.get(CONF_DRAIN_BATCH_SIZE, DEFAULT_DRAIN_BATCH_SIZE)),
+            drain_budget=int(config_entry.options.get(CONF_DRAIN_BUDGET, DEFAULT_DRAIN_BUDGET)),
+            shutdown_flush_timeout=int(
+                config_entry.options.get(CONF_SHUTDOWN_FLUSH_TIMEOUT, DEFAULT_SHUTDOWN_FLUSH_TIMEOUT)
+            ),
+            polling_slots=int(config_entry.options.get(CONF_POLLING_SLOTS, DEFAULT_POLLING_SLOTS)),
+            polling_schedule=config_entry.options.get(CONF_POLLING_SCHEDULE, []),
+            polling_keyframe_interval=int(
+                config_entry.options.get(CONF_POLLING_KEYFRAME_INTERVAL, DEFAULT_POLLING_KEYFRAME_INTERVAL)
+            ),
         )
 
         return {"hass": hass, "gateway": gateway, "settings": settings}
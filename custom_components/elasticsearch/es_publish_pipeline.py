@@ -5,11 +5,17 @@ from __future__ import annotations
 import asyncio
 import re
 import unicodedata
-from collections.abc import AsyncGenerator
-from datetime import UTC, datetime
-from functools import lru_cache
+import zlib
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterable, Callable, Iterable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache, partial
 from logging import Logger
 from math import isinf, isnan
+from pathlib import Path
+from types import MappingProxyType
 from typing import TYPE_CHECKING, Any
 
 from homeassistant.components.lock.const import LockState
@@ -26,6 +32,7 @@ from homeassistant.const import (
     STATE_UNKNOWN,
 )
 from homeassistant.core import (
+    CALLBACK_TYPE,
     Event,
     EventStateChangedData,
     HomeAssistant,
@@ -36,9 +43,12 @@ from homeassistant.helpers import (
     area_registry,
     device_registry,
     entity_registry,
+    floor_registry,
     label_registry,
 )
 from homeassistant.helpers import state as state_helper
+from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.storage import STORAGE_DIR
 from homeassistant.util import dt as dt_util
 from homeassistant.util.logging import async_create_catching_coro
 
@@ -48,9 +58,17 @@ from custom_components.elasticsearch.const import (
     DATASTREAM_DATASET_PREFIX,
     DATASTREAM_NAMESPACE,
     DATASTREAM_TYPE,
+    DOMAIN,
+    QueueOverflowPolicy,
     StateChangeType,
 )
-from custom_components.elasticsearch.encoder import convert_set_to_list
+from custom_components.elasticsearch.deadletter import DeadLetterFile
+from custom_components.elasticsearch.encoder import (
+    EncodedDocument,
+    FastSerializer,
+    Serializer,
+    convert_set_to_list,
+)
 from custom_components.elasticsearch.entity_details import (
     ExtendedEntityDetails,
 )
@@ -64,7 +82,9 @@ from custom_components.elasticsearch.logger import (
     log_enter_exit_debug,
     log_enter_exit_info,
 )
-from custom_components.elasticsearch.loop import LoopHandler
+from custom_components.elasticsearch.loop import Clock, DrainBudget, LoopHandler, LoopLagMonitor, LoopMode
+from custom_components.elasticsearch.polling_schedule import PollingSchedule
+from custom_components.elasticsearch.spool import Spool
 from custom_components.elasticsearch.system_info import SystemInfo, SystemInfoResult
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -84,9 +104,383 @@ SKIP_ATTRIBUTES = [
     "unit_of_measurement",
 ]
 
+# Rough per-event sizes used to estimate the memory held by the event queue
+EVENT_SIZE_OVERHEAD = 512
+ATTRIBUTE_SIZE_ESTIMATE = 64
+
+# Number of events handed to a worker thread at once when formatting outside of the event loop
+FORMAT_BATCH_SIZE = 500
+
+# Number of events sent per bulk operation when flushing the queue on shutdown, so that the events which were not
+# published before the deadline are known exactly
+SHUTDOWN_FLUSH_BATCH_SIZE = 1000
+
+# Backoff, in seconds, before a document which failed with a retryable error is sent again
+RETRY_INITIAL_BACKOFF = 2
+RETRY_MAX_BACKOFF = 30
+
+# The flattened registry details and the datastream fields of an entity
+EntityFragment = tuple[Mapping[str, Any], Mapping[str, Any]]
+
+# An event waiting in the event queue: when it happened, the new state and why it was captured
+QueueItem = tuple[datetime, State, StateChangeType]
+
+
+@dataclass(slots=True)
+class QueuedEvent:
+    """An event held by the event queue, along with its estimated size."""
+
+    timestamp: datetime
+    state: State
+    reason: StateChangeType
+    size: int
+    removed: bool = False
+
+    @property
+    def item(self) -> QueueItem:
+        """Return the event as it was put into the queue."""
+        return (self.timestamp, self.state, self.reason)
+
+
+class RetryAction(dict):
+    """A bulk action handed back to be sent again.
+
+    It carries the number of times it was sent and when it may be sent next, which are not serialized with it.
+    """
+
+    __slots__ = ("attempts", "retry_at")
+
+    def __init__(self, action: dict[str, Any], attempts: int, retry_at: float) -> None:
+        """Initialize the action."""
+        super().__init__(action)
+        self.attempts: int = attempts
+        self.retry_at: float = retry_at
+
+
+class EventQueue:
+    """Queue for storing events.
+
+    The queue is unbounded unless a maximum number of events or a maximum estimated size is provided. When
+    adding an event would exceed either limit, the overflow policy selects pending events to drop.
+
+    Dropped events are marked as removed and skipped when they reach the front of the queue, and the pending
+    polled events and the pending events of each entity are indexed, so that making room never scans the queue.
+    """
+
+    def __init__(
+        self,
+        max_events: int = 0,
+        max_bytes: int = 0,
+        overflow_policy: QueueOverflowPolicy = QueueOverflowPolicy.DROP_OLDEST,
+        log: Logger = BASE_LOGGER,
+    ) -> None:
+        """Initialize the queue."""
+        self._logger = log if log else BASE_LOGGER
+
+        self._max_events: int = max_events
+        self._max_bytes: int = max_bytes
+        self._overflow_policy: QueueOverflowPolicy = overflow_policy
+
+        self._events: deque[QueuedEvent] = deque()
+        self._size: int = 0
+
+        self._estimated_bytes: int = 0
+        self._pending_polled: deque[QueuedEvent] = deque()
+        self._pending_per_entity: dict[str, deque[QueuedEvent]] = {}
+        self._overflowing: bool = False
+
+        self._dropped: dict[str, int] = {change_type.value: 0 for change_type in StateChangeType}
+
+        self._put_listeners: list[Callable[[], None]] = []
+        self._drop_listeners: list[Callable[[QueueItem], None]] = []
+
+    @property
+    def bounded(self) -> bool:
+        """Return True if the queue has a configured capacity."""
+        return self._max_events > 0 or self._max_bytes > 0
+
+    @property
+    def estimated_bytes(self) -> int:
+        """Return the estimated size of the pending events."""
+        return self._estimated_bytes
+
+    @property
+    def dropped(self) -> dict[str, int]:
+        """Return the number of dropped events per change type."""
+        return dict(self._dropped)
+
+    def qsize(self) -> int:
+        """Return the number of pending events."""
+        return self._size
+
+    def empty(self) -> bool:
+        """Return True if there are no pending events."""
+        return self._size == 0
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return queue statistics for diagnostics."""
+        return {
+            "size": self.qsize(),
+            "estimated_bytes": self._estimated_bytes,
+            "max_events": self._max_events,
+            "max_bytes": self._max_bytes,
+            "overflow_policy": self._overflow_policy.value,
+            "dropped": self.dropped,
+            "dropped_total": sum(self._dropped.values()),
+        }
+
+    def add_put_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback that is called each time an event is added to the queue."""
+        self._put_listeners.append(listener)
+
+    def add_drop_listener(self, listener: Callable[[QueueItem], None]) -> None:
+        """Register a callback that is handed each event the queue drops to make room."""
+        self._drop_listeners.append(listener)
+
+    @staticmethod
+    def estimate_size(state: State) -> int:
+        """Roughly estimate the size of the document produced from a state without serializing it."""
+        return (
+            EVENT_SIZE_OVERHEAD
+            + len(state.entity_id)
+            + len(state.state)
+            + ATTRIBUTE_SIZE_ESTIMATE * len(state.attributes)
+        )
+
+    def put_nowait(self, item: QueueItem) -> None:
+        """Add an event to the queue, making room for it first if the queue is at capacity."""
+        timestamp, state, reason = item
+
+        event = QueuedEvent(timestamp=timestamp, state=state, reason=reason, size=self.estimate_size(state))
+
+        if self.bounded:
+            self._make_room(event.state.entity_id, event.size)
+
+        self._append(event)
+
+        for listener in self._put_listeners:
+            listener()
+
+    def get_nowait(self) -> QueueItem:
+        """Remove and return the oldest event, raising asyncio.QueueEmpty if there is none."""
+        if self.empty():
+            raise asyncio.QueueEmpty
+
+        event = self._oldest()
+        self._events.popleft()
+        self._remove(event)
+
+        if self._overflowing and not self._is_over_capacity(0):
+            self._overflowing = False
+
+        return event.item
+
+    def _append(self, event: QueuedEvent) -> None:
+        """Add an event to the end of the queue and index it."""
+        self._events.append(event)
+        self._size += 1
+        self._estimated_bytes += event.size
+
+        if not self.bounded:
+            return
+
+        if event.reason == StateChangeType.NO_CHANGE:
+            self._pending_polled.append(event)
+
+        if self._overflow_policy == QueueOverflowPolicy.COALESCE_PER_ENTITY:
+            self._pending_per_entity.setdefault(event.state.entity_id, deque()).append(event)
+
+    def _remove(self, event: QueuedEvent) -> None:
+        """Mark an event as removed and update the bookkeeping for it leaving the queue."""
+        event.removed = True
+
+        self._size -= 1
+        self._estimated_bytes -= event.size
+
+        if self._size == 0:
+            # Release the dropped events which are still waiting to be skipped
+            self._events.clear()
+
+        if not self.bounded:
+            return
+
+        # An event only ever leaves the queue as the oldest pending event of its kind, so it is at the front of
+        # its indexes and is discarded from them here
+        self._discard_removed(self._pending_polled)
+
+        pending = self._pending_per_entity.get(event.state.entity_id)
+
+        if pending is not None:
+            self._discard_removed(pending)
+
+            if not pending:
+                del self._pending_per_entity[event.state.entity_id]
+
+    @staticmethod
+    def _discard_removed(events: deque[QueuedEvent]) -> None:
+        """Discard the removed events at the front of a deque."""
+        while events and events[0].removed:
+            events.popleft()
+
+    def _oldest(self) -> QueuedEvent:
+        """Return the oldest pending event, skipping the events that were dropped."""
+        self._discard_removed(self._events)
+
+        return self._events[0]
+
+    def _is_over_capacity(self, incoming_size: int, incoming_events: int = 1) -> bool:
+        """Determine if adding an event of the provided size would exceed the capacity of the queue."""
+        if self._max_events > 0 and self._size + incoming_events > self._max_events:
+            return True
+
+        return self._max_bytes > 0 and self._estimated_bytes + incoming_size > self._max_bytes
+
+    def _make_room(self, entity_id: str, size: int, incoming_events: int = 1) -> None:
+        """Drop pending events according to the overflow policy until the new event fits."""
+        while self._size > 0 and self._is_over_capacity(size, incoming_events):
+            if not self._overflowing:
+                self._overflowing = True
+                self._logger.warning(
+                    "Event queue is at capacity (%s events, ~%s bytes). Dropping events using policy [%s].",
+                    self._size,
+                    self._estimated_bytes,
+                    self._overflow_policy.value,
+                )
+
+            self._drop(self._select_victim(entity_id))
+
+    def _select_victim(self, entity_id: str) -> QueuedEvent:
+        """Return the pending event that should be dropped to make room for a new event for the provided entity."""
+        if self._overflow_policy == QueueOverflowPolicy.DROP_POLLED_FIRST and self._pending_polled:
+            return self._pending_polled[0]
 
-class EventQueue(asyncio.Queue[tuple[datetime, State, StateChangeType]]):
-    """Queue for storing events."""
+        if self._overflow_policy == QueueOverflowPolicy.COALESCE_PER_ENTITY:
+            pending = self._pending_per_entity.get(entity_id)
+            if pending:
+                return pending[0]
+
+        return self._oldest()
+
+    def _drop(self, event: QueuedEvent) -> None:
+        """Drop a pending event."""
+        self._remove(event)
+        self._dropped[event.reason.value] += 1
+
+        self._logger.debug(
+            "Dropped queued event for entity [%s] with change type [%s].",
+            event.state.entity_id,
+            event.reason.value,
+        )
+
+        for listener in self._drop_listeners:
+            listener(event.item)
+
+
+class CoalescingEventQueue(EventQueue):
+    """Queue for storing events that coalesces attribute and polling churn per entity.
+
+    A newer event for an entity supersedes the pending event for the same entity and change type, taking its
+    place in the queue. State changes are never coalesced, and a state change closes the pending events of its
+    entity so that later events are never published ahead of it.
+    """
+
+    def __init__(
+        self,
+        max_events: int = 0,
+        max_bytes: int = 0,
+        overflow_policy: QueueOverflowPolicy = QueueOverflowPolicy.DROP_OLDEST,
+        log: Logger = BASE_LOGGER,
+    ) -> None:
+        """Initialize the queue."""
+        super().__init__(
+            max_events=max_events,
+            max_bytes=max_bytes,
+            overflow_policy=overflow_policy,
+            log=log,
+        )
+
+        # The pending events which a newer event for the same entity and change type replaces in place
+        self._pending_events: dict[tuple[str, StateChangeType], QueuedEvent] = {}
+
+        self._coalesced: dict[str, int] = {change_type.value: 0 for change_type in StateChangeType}
+
+    @property
+    def coalesced(self) -> dict[str, int]:
+        """Return the number of superseded events per change type."""
+        return dict(self._coalesced)
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return queue statistics for diagnostics."""
+        diagnostics = super().diagnostics()
+
+        diagnostics["coalesced"] = self.coalesced
+        diagnostics["coalesced_total"] = sum(self._coalesced.values())
+
+        return diagnostics
+
+    def put_nowait(self, item: QueueItem) -> None:
+        """Put an event into the queue, superseding a pending event for the same entity and change type."""
+        if self._supersede(item):
+            return
+
+        super().put_nowait(item)
+
+    def _supersede(self, item: QueueItem) -> bool:
+        """Replace the pending event for the same entity and change type, returning True if one was found.
+
+        The queue makes room for any growth in the size of the event, and the put listeners are notified as
+        though the newer event had been added.
+        """
+        timestamp, state, reason = item
+
+        if reason == StateChangeType.STATE:
+            return False
+
+        event = self._pending_events.get((state.entity_id, reason))
+
+        if event is None:
+            return False
+
+        size = self.estimate_size(state)
+
+        if self.bounded:
+            # The newer event takes the place of the pending one, so only the growth in size needs room
+            self._make_room(state.entity_id, size - event.size, incoming_events=0)
+
+            if event.removed:
+                return False
+
+        self._estimated_bytes += size - event.size
+
+        event.timestamp = timestamp
+        event.state = state
+        event.size = size
+
+        self._coalesced[reason.value] += 1
+
+        for listener in self._put_listeners:
+            listener()
+
+        return True
+
+    def _append(self, event: QueuedEvent) -> None:
+        """Add an event to the end of the queue, making it the pending event for its entity and change type."""
+        super()._append(event)
+
+        if event.reason == StateChangeType.STATE:
+            for change_type in (StateChangeType.ATTRIBUTE, StateChangeType.NO_CHANGE):
+                self._pending_events.pop((event.state.entity_id, change_type), None)
+        else:
+            self._pending_events[(event.state.entity_id, event.reason)] = event
+
+    def _remove(self, event: QueuedEvent) -> None:
+        """Mark an event as removed and update the bookkeeping for it leaving the queue."""
+        super()._remove(event)
+
+        key = (event.state.entity_id, event.reason)
+
+        if self._pending_events.get(key) is event:
+            del self._pending_events[key]
 
 
 class PipelineSettings:
@@ -109,6 +503,26 @@ class PipelineSettings:
         tags: list[str],
         polling_frequency: int,
         publish_frequency: int,
+        queue_max_events: int = 0,
+        queue_max_bytes: int = 0,
+        queue_overflow_policy: QueueOverflowPolicy = QueueOverflowPolicy.DROP_OLDEST,
+        queue_coalesce: bool = False,
+        publish_max_events: int = 0,
+        publish_max_bytes: int = 0,
+        publish_max_age: int = 0,
+        spool_enabled: bool = False,
+        spool_max_bytes: int = 0,
+        spool_replay_rate: int = 0,
+        dead_letter_enabled: bool = False,
+        dead_letter_max_bytes: int = 0,
+        fast_serializer: bool = False,
+        format_workers: int = 0,
+        drain_batch_size: int = 0,
+        drain_budget: int = 0,
+        shutdown_flush_timeout: int = 0,
+        polling_slots: int = 1,
+        polling_schedule: list[str] | None = None,
+        polling_keyframe_interval: int = 0,
     ) -> None:
         """Initialize the settings."""
         self.publish_frequency: int = publish_frequency
@@ -126,6 +540,26 @@ class PipelineSettings:
         self.excluded_devices: list[str] = excluded_devices
         self.included_entities: list[str] = included_entities
         self.excluded_entities: list[str] = excluded_entities
+        self.queue_max_events: int = queue_max_events
+        self.queue_max_bytes: int = queue_max_bytes
+        self.queue_overflow_policy: QueueOverflowPolicy = queue_overflow_policy
+        self.queue_coalesce: bool = queue_coalesce
+        self.publish_max_events: int = publish_max_events
+        self.publish_max_bytes: int = publish_max_bytes
+        self.publish_max_age: int = publish_max_age
+        self.spool_enabled: bool = spool_enabled
+        self.spool_max_bytes: int = spool_max_bytes
+        self.spool_replay_rate: int = spool_replay_rate
+        self.dead_letter_enabled: bool = dead_letter_enabled
+        self.dead_letter_max_bytes: int = dead_letter_max_bytes
+        self.fast_serializer: bool = fast_serializer
+        self.format_workers: int = format_workers
+        self.drain_batch_size: int = drain_batch_size
+        self.drain_budget: int = drain_budget
+        self.shutdown_flush_timeout: int = shutdown_flush_timeout
+        self.polling_slots: int = polling_slots
+        self.polling_schedule: list[str] = polling_schedule if polling_schedule is not None else []
+        self.polling_keyframe_interval: int = polling_keyframe_interval
 
 
 class Pipeline:
@@ -152,7 +586,14 @@ class Pipeline:
 
             self._static_fields: dict[str, str | float | list[str] | list[float]] = {}
 
-            self._queue: EventQueue = EventQueue()
+            queue_class = CoalescingEventQueue if settings.queue_coalesce else EventQueue
+
+            self._queue: EventQueue = queue_class(
+                max_events=settings.queue_max_events,
+                max_bytes=settings.queue_max_bytes,
+                overflow_policy=settings.queue_overflow_policy,
+                log=self._logger,
+            )
 
             self._filterer: Pipeline.Filterer = Pipeline.Filterer(
                 hass=self._hass,
@@ -187,6 +628,13 @@ class Pipeline:
                 log=self._logger,
             )
 
+            self._executor: ThreadPoolExecutor | None = None
+
+            # Documents formatted in worker threads are serialized there too when the gateway can reuse the result
+            self._serializer: Serializer | None = None
+
+            self._loop_lag = LoopLagMonitor()
+
         @async_log_enter_exit_debug
         async def async_init(self, config_entry: ConfigEntry) -> None:
             """Initialize the manager."""
@@ -199,6 +647,17 @@ class Pipeline:
 
             await self._populate_static_fields()
 
+            await self._filterer.async_init()
+
+            polling = self._settings.polling_frequency > 0 or bool(self._settings.polling_schedule)
+
+            # Polled entities are only published if they changed since they were last published, including by
+            # the listener, or if their keyframe interval elapsed. States the queue drops to make room were never
+            # published, so they are polled again.
+            if polling and self._settings.polling_keyframe_interval > 0:
+                self._listener.add_queued_listener(self._poller.record_export)
+                self._queue.add_drop_listener(self._poller.forget_export)
+
             # Initialize listener if change detection type is configured
             if len(self._settings.change_detection_type) != 0:
                 await self._listener.async_init()
@@ -206,7 +665,7 @@ class Pipeline:
                 self._logger.warning("No change detection type set. Disabling change listener.")
 
             # We only need to initialize the poller if the user has configured a polling frequency
-            if self._settings.polling_frequency > 0:
+            if polling:
                 await self._poller.async_init(config_entry=config_entry)
             else:
                 self._logger.warning("No polling frequency set. Disabling polling.")
@@ -215,10 +674,34 @@ class Pipeline:
             await self._formatter.async_init(self._static_fields)
             await self._publisher.async_init(config_entry=config_entry)
 
-        async def sip_queue(self) -> AsyncGenerator[dict[str, Any], Any]:
-            """Sip an event off of the queue."""
+            if self._settings.format_workers > 0:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._settings.format_workers, thread_name_prefix="elasticsearch_format"
+                )
+
+                if self._gateway.settings.bulk_ndjson_writer:
+                    self._serializer = FastSerializer() if self._settings.fast_serializer else Serializer()
+
+        async def sip_queue(self, deadline: float | None = None) -> AsyncGenerator[dict[str, Any], Any]:
+            """Sip an event off of the queue, measuring the event loop lag while the queue is drained.
+
+            With a deadline on the event loop's clock, the drain stops once it has passed and leaves the remaining
+            events in the queue.
+            """
+            with self._loop_lag.sampling():
+                if self._executor is not None:
+                    async for document in self._sip_queue_in_executor(self._executor, deadline):
+                        yield document
+                    return
+
+                async for document in self._sip_queue_on_loop(deadline):
+                    yield document
 
-            while not self._queue.empty():
+        async def _sip_queue_on_loop(self, deadline: float | None) -> AsyncGenerator[dict[str, Any], Any]:
+            """Sip events off of the queue, formatting them on the event loop."""
+            budget = self._drain_budget()
+
+            while not self._queue.empty() and not self._expired(deadline):
                 timestamp: datetime | None = None
                 state: State | None = None
                 reason: StateChangeType | None = None
@@ -235,11 +718,95 @@ class Pipeline:
                         state.entity_id if state is not None else "Unknown",
                     )
 
+                await budget.checkpoint()
+
+        async def _sip_queue_in_executor(
+            self, executor: ThreadPoolExecutor, deadline: float | None
+        ) -> AsyncGenerator[dict[str, Any], Any]:
+            """Sip events off of the queue in batches, formatting each batch in a worker thread.
+
+            Entity fragments are resolved from the registries on the event loop, so that the worker threads only
+            read immutable data. One batch per worker is formatted at a time, and documents are yielded in order.
+            """
+            loop = asyncio.get_running_loop()
+            budget = self._drain_budget()
+
+            while not self._queue.empty() and not self._expired(deadline):
+                batches: list[list[tuple[datetime, State, StateChangeType, EntityFragment]]] = []
+
+                for _ in range(self._settings.format_workers):
+                    batch = self._take_batch(FORMAT_BATCH_SIZE)
+
+                    if batch:
+                        batches.append(batch)
+
+                results = await asyncio.gather(
+                    *[
+                        loop.run_in_executor(executor, self._formatter.format_batch, batch, self._serializer)
+                        for batch in batches
+                    ]
+                )
+
+                for documents in results:
+                    for document in documents:
+                        yield document
+
+                        await budget.checkpoint()
+
+        def _take_batch(self, size: int) -> list[tuple[datetime, State, StateChangeType, EntityFragment]]:
+            """Take up to size events off of the queue, along with the fragments of their entities."""
+            batch: list[tuple[datetime, State, StateChangeType, EntityFragment]] = []
+
+            while len(batch) < size and not self._queue.empty():
+                state: State | None = None
+
+                try:
+                    timestamp, state, reason = self._queue.get_nowait()
+
+                    batch.append((timestamp, state, reason, self._formatter.entity_fragment(state)))
+                except asyncio.QueueEmpty:
+                    pass
+                except Exception:
+                    self._logger.exception(
+                        "Error formatting document for entity [%s]. Skipping document.",
+                        state.entity_id if state is not None else "Unknown",
+                    )
+
+            return batch
+
+        async def format_events(self, items: list[QueueItem]) -> AsyncGenerator[dict[str, Any], Any]:
+            """Format events which left the queue without being drained, skipping those which cannot be formatted."""
+            for timestamp, state, reason in items:
+                try:
+                    yield self._formatter.format(timestamp, state, reason)
+                except Exception:
+                    self._logger.exception(
+                        "Error formatting document for entity [%s]. Skipping document.", state.entity_id
+                    )
+
+        @staticmethod
+        def _expired(deadline: float | None) -> bool:
+            """Determine if a drain deadline on the event loop's clock has passed."""
+            return deadline is not None and asyncio.get_running_loop().time() >= deadline
+
+        def _drain_budget(self) -> DrainBudget:
+            """Return a budget for yielding to the event loop while draining the queue."""
+            return DrainBudget(self._settings.drain_batch_size, self._settings.drain_budget / 1000)
+
         @property
         def queue(self) -> EventQueue:
             """Return the queue."""
             return self._queue
 
+        def diagnostics(self) -> dict[str, Any]:
+            """Return runtime statistics of the pipeline for diagnostics."""
+            return {
+                "queue": self._queue.diagnostics(),
+                "loop_lag": self._loop_lag.diagnostics(),
+                "poller": self._poller.diagnostics(),
+                **self._publisher.diagnostics(),
+            }
+
         async def _populate_static_fields(self) -> None:
             """Populate the static fields for generated documents."""
             system_info: SystemInfo = SystemInfo(hass=self._hass)
@@ -274,11 +841,30 @@ class Pipeline:
             else:
                 self._logger.warning("%s Config entry not found or not loaded.", msg)
 
+        async def async_shutdown(self) -> None:
+            """Stop collecting events, publish or persist the queued events, and stop the manager."""
+            self._listener.stop()
+            self._poller.stop()
+
+            if self._settings.shutdown_flush_timeout > 0:
+                await self._publisher.async_flush(timeout=self._settings.shutdown_flush_timeout)
+
+            self.stop()
+
         @log_enter_exit_debug
         def stop(self) -> None:
             """Stop the manager."""
 
             self._listener.stop()
+            self._filterer.stop()
+            self._formatter.stop()
+            self._publisher.stop()
+
+            self._loop_lag.stop()
+
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
 
     class Filterer:
         """Filters state changes for processing."""
@@ -307,11 +893,96 @@ class Pipeline:
             self._excluded_entities: list[str] = settings.excluded_entities
             self._change_detection_type: list[StateChangeType] = settings.change_detection_type
 
+            self._hass: HomeAssistant = hass
+
             self._entity_registry = entity_registry.async_get(hass)
             self._label_registry = label_registry.async_get(hass)
             self._area_registry = area_registry.async_get(hass)
             self._device_registry = device_registry.async_get(hass)
 
+            # Whether each entity passes the target filters, and the entities attached to each device so that
+            # their verdicts can be invalidated when the device changes
+            self._verdicts: dict[str, bool] = {}
+            self._device_entities: dict[str, set[str]] = {}
+
+            # The entities which pass the target filters in targeted mode, computed on first use after a change
+            self._targets: tuple[str, ...] | None = None
+            self._targets_listeners: list[Callable[[], None]] = []
+
+            self._cancel_listeners: list[CALLBACK_TYPE] = []
+
+        @property
+        def targeted(self) -> bool:
+            """Return True if only the included targets are exported, so that they can be tracked individually."""
+            return self._include_targets and not self._exclude_targets
+
+        def add_targets_listener(self, listener: Callable[[], None]) -> None:
+            """Register a callback that is called when the registries change, as the targets may have changed."""
+            self._targets_listeners.append(listener)
+
+        def targets(self) -> tuple[str, ...]:
+            """Return the registered entities which pass the target filters, in registry order."""
+            if self._targets is None:
+                self._targets = tuple(
+                    entity_id
+                    for entity_id in self._entity_registry.entities
+                    if self.passes_entity_filter(entity_id)
+                )
+
+            return self._targets
+
+        @async_log_enter_exit_debug
+        async def async_init(self) -> None:
+            """Compute the verdict for every registered entity and keep the verdicts up to date."""
+            self._cancel_listeners = [
+                self._hass.bus.async_listen(
+                    entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._handle_entity_registry_updated
+                ),
+                self._hass.bus.async_listen(
+                    device_registry.EVENT_DEVICE_REGISTRY_UPDATED, self._handle_device_registry_updated
+                ),
+            ]
+
+            for entity_id in self._entity_registry.entities:
+                self._verdicts[entity_id] = self._evaluate_entity(entity_id)
+
+        @log_enter_exit_debug
+        def stop(self) -> None:
+            """Stop keeping the verdicts up to date."""
+            for cancel_listener in self._cancel_listeners:
+                cancel_listener()
+
+            self._cancel_listeners = []
+
+        @callback
+        def _handle_entity_registry_updated(
+            self, event: Event[entity_registry.EventEntityRegistryUpdatedData]
+        ) -> None:
+            """Forget the verdict of an entity which was created, updated, renamed or removed."""
+            self._verdicts.pop(event.data["entity_id"], None)
+
+            if old_entity_id := event.data.get("old_entity_id"):
+                self._verdicts.pop(old_entity_id, None)
+
+            self._targets_changed()
+
+        @callback
+        def _handle_device_registry_updated(
+            self, event: Event[device_registry.EventDeviceRegistryUpdatedData]
+        ) -> None:
+            """Forget the verdicts of the entities attached to a device which was updated or removed."""
+            for entity_id in self._device_entities.pop(event.data["device_id"], set()):
+                self._verdicts.pop(entity_id, None)
+
+            self._targets_changed()
+
+        def _targets_changed(self) -> None:
+            """Forget the targets and let the listeners know that they may have changed."""
+            self._targets = None
+
+            for listener in self._targets_listeners:
+                listener()
+
         def _reject(self, base_message, message: str) -> bool:
             """Help handle logging for cases where a filter results in rejection of the entity state update."""
 
@@ -330,12 +1001,25 @@ class Pipeline:
 
         def passes_filter(self, state: State, reason: StateChangeType) -> bool:
             """Filter state changes for processing."""
-            base_msg = f"Processing filters for entity [{state.entity_id}]: "
-
             if not self._passes_change_detection_type_filter(reason):
                 return False
 
-            entity: RegistryEntry | None = self._entity_registry.async_get(state.entity_id)
+            return self.passes_entity_filter(state.entity_id)
+
+        def passes_entity_filter(self, entity_id: str) -> bool:
+            """Determine if an entity passes the target filters, using the cached verdict when there is one."""
+            verdict: bool | None = self._verdicts.get(entity_id)
+
+            if verdict is None:
+                verdict = self._verdicts[entity_id] = self._evaluate_entity(entity_id)
+
+            return verdict
+
+        def _evaluate_entity(self, entity_id: str) -> bool:
+            """Determine if an entity passes the target filters, based on the registries."""
+            base_msg = f"Processing filters for entity [{entity_id}]: "
+
+            entity: RegistryEntry | None = self._entity_registry.async_get(entity_id)
 
             if not entity:
                 return self._reject(base_msg, "Entity not found in registry.")
@@ -344,6 +1028,9 @@ class Pipeline:
                 self._device_registry.async_get(entity.device_id) if entity.device_id else None
             )
 
+            if device is not None:
+                self._device_entities.setdefault(device.id, set()).add(entity_id)
+
             if self._exclude_targets and not self._passes_exclude_targets(entity=entity, device=device):
                 return False
 
@@ -400,8 +1087,6 @@ class Pipeline:
 
         def _passes_change_detection_type_filter(self, reason: StateChangeType) -> bool:
             """Determine if a state change should be published."""
-            base_msg = f"Processing change detection type filter: Change type [{reason.value}]: "
-
             # If polling is enabled, we publish all polled events
             if reason.value == StateChangeType.NO_CHANGE.value:
                 return True
@@ -409,6 +1094,8 @@ class Pipeline:
             if reason.value in self._change_detection_type:
                 return True
 
+            base_msg = f"Processing change detection type filter: Change type [{reason.value}]: "
+
             return self._reject(base_msg, "is not in the change detection type list.")
 
     class Listener:
@@ -426,39 +1113,108 @@ class Pipeline:
             self._hass: HomeAssistant = hass
             self._filterer: Pipeline.Filterer = filterer
             self._queue: EventQueue = queue
-            self._cancel_listener = None
+            self._cancel_listener: CALLBACK_TYPE | None = None
+            self._retrack_pending: bool = False
+            self._queued_listeners: list[Callable[[State], None]] = []
 
         @async_log_enter_exit_debug
         async def async_init(self) -> None:
             """Initialize the listener."""
 
+            if self._filterer.targeted:
+                # Only the included entities can pass the filter, so subscribe to their state changes alone and
+                # resubscribe when registry changes may have added or removed some of them
+                self._filterer.add_targets_listener(self._schedule_retrack)
+                self._track_targets()
+                return
+
+            # The event filter runs synchronously on the bus, so events the filterer rejects are dropped before
+            # Home Assistant schedules the listener
             self._cancel_listener = self._hass.bus.async_listen(
                 EVENT_STATE_CHANGED,
                 self._handle_event,
+                event_filter=self._filter_event,
             )
 
         @callback
-        async def _handle_event(self, event: Event[EventStateChangedData]) -> None:
-            """Listen for new messages on the bus and queue them for send."""
-            new_state: State | None = event.data.get("new_state")
-            old_state: State | None = event.data.get("old_state")
+        def _track_targets(self) -> None:
+            """Subscribe to the state changes of the entities which pass the target filters."""
+            if self._cancel_listener:
+                self._cancel_listener()
 
-            if new_state is None:
+            self._cancel_listener = async_track_state_change_event(
+                self._hass, self._filterer.targets(), self._handle_targeted_event
+            )
+
+        @callback
+        def _schedule_retrack(self) -> None:
+            """Resubscribe once the current burst of registry updates has been processed."""
+            if self._cancel_listener is None or self._retrack_pending:
                 return
 
-            reason = (
+            self._retrack_pending = True
+            self._hass.loop.call_soon(self._retrack)
+
+        @callback
+        def _retrack(self) -> None:
+            """Resubscribe to the included entities, unless the listener was stopped in the meantime."""
+            if not self._retrack_pending:
+                return
+
+            self._retrack_pending = False
+            self._track_targets()
+
+        @callback
+        def _handle_targeted_event(self, event: Event[EventStateChangedData]) -> None:
+            """Queue a state change of a tracked entity if it passes the filter."""
+            if self._filter_event(event.data):
+                self._handle_event(event)
+
+        def add_queued_listener(self, listener: Callable[[State], None]) -> None:
+            """Register a callback that is called with each state change the listener queues."""
+            self._queued_listeners.append(listener)
+
+        @staticmethod
+        def _change_type(old_state: State | None, new_state: State) -> StateChangeType:
+            """Determine whether the state or only the attributes of the entity changed."""
+            return (
                 StateChangeType.STATE
                 if old_state is None or old_state.state != new_state.state
                 else StateChangeType.ATTRIBUTE
             )
 
-            # Ensure we only queue states that pass the filter
-            if self._filterer.passes_filter(new_state, reason):
-                self._queue.put_nowait((event.time_fired, new_state, reason))
+        @callback
+        def _filter_event(self, event_data: EventStateChangedData) -> bool:
+            """Determine if a state change passes the filter, using the verdicts cached by the filterer."""
+            new_state: State | None = event_data.get("new_state")
+
+            if new_state is None:
+                return False
+
+            return self._filterer.passes_filter(
+                new_state, self._change_type(event_data.get("old_state"), new_state)
+            )
+
+        @callback
+        def _handle_event(self, event: Event[EventStateChangedData]) -> None:
+            """Queue a state change which passed the event filter for send."""
+            new_state: State | None = event.data.get("new_state")
+
+            if new_state is None:
+                return
+
+            self._queue.put_nowait(
+                (event.time_fired, new_state, self._change_type(event.data.get("old_state"), new_state))
+            )
+
+            for listener in self._queued_listeners:
+                listener(new_state)
 
         @log_enter_exit_debug
         def stop(self) -> None:
             """Stop the listener."""
+            self._retrack_pending = False
+
             if self._cancel_listener:
                 self._cancel_listener()
                 self._cancel_listener = None
@@ -473,42 +1229,283 @@ class Pipeline:
             queue: EventQueue,
             settings: PipelineSettings,
             log: Logger = BASE_LOGGER,
+            clock: Clock | None = None,
         ) -> None:
             """Initialize the poller."""
             self._logger = log if log else BASE_LOGGER
             self._hass: HomeAssistant = hass
             self._queue: EventQueue = queue
             self._filterer: Pipeline.Filterer = filterer
+            self._clock: Clock | None = clock
             self._settings: PipelineSettings = settings
 
+            self._poll_loops: list[LoopHandler] = []
+
+            # Groups of entities can be polled at their own frequency, with the rest polled at the default frequency
+            self._schedule: PollingSchedule = PollingSchedule(
+                default=settings.polling_frequency, entries=self._valid_schedule_entries()
+            )
+            self._entity_frequencies: dict[str, int] = {}
+            self._entity_registry: entity_registry.EntityRegistry = entity_registry.async_get(hass)
+            self._cancel_registry_listener: CALLBACK_TYPE | None = None
+
+            # Staggered polling splits the entities into slots and polls one slot per sub-interval. Ticks count the
+            # sub-intervals since the first poll at each frequency, and the entities of each slot are bucketed once
+            # per polling interval
+            self._slots: int = max(1, settings.polling_slots)
+            self._entity_slots: dict[str, int] = {}
+            self._first_polls: dict[int, float] = {}
+            self._last_ticks: dict[int, int] = {}
+            self._slot_buckets: dict[int, tuple[int, list[list[str]]]] = {}
+
+            # In which version and when, on the clock of the event loop, each entity was last queued, for
+            # changed-or-keyframe polling
+            self._keyframe_interval: int = settings.polling_keyframe_interval
+            self._exported: dict[str, tuple[datetime, float]] = {}
+            self._skipped: int = 0
+
         @async_log_enter_exit_debug
         async def async_init(self, config_entry: ConfigEntry) -> None:
-            """Initialize the poller."""
-            state_poll_loop = LoopHandler(
-                name="es_state_poll_loop",
-                func=self.poll,
-                frequency=self._settings.polling_frequency,
-                log=self._logger,
-            )
+            """Initialize the poller, with a loop for each polling frequency."""
+            for frequency in sorted(self._schedule.frequencies):
+                default = frequency == self._settings.polling_frequency
+                suffix = "" if default else f"_{frequency}s"
+
+                state_poll_loop = LoopHandler(
+                    name=f"es_state_poll_loop{suffix}",
+                    func=self.poll if default else partial(self.poll, frequency),
+                    frequency=frequency / self._slots,
+                    log=self._logger,
+                    mode=LoopMode.FIXED_RATE,
+                )
+
+                self._poll_loops.append(state_poll_loop)
+
+                config_entry.async_create_background_task(
+                    self._hass,
+                    async_create_catching_coro(state_poll_loop.start()),
+                    f"es_state_poll_task{suffix}",
+                )
+
+            if self._schedule.has_entries or self._keyframe_interval > 0:
+                # Labels may be added to or removed from an entity, which changes its polling frequency, and the
+                # export history of removed entities is no longer needed
+                self._cancel_registry_listener = self._hass.bus.async_listen(
+                    entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._handle_entity_registry_updated
+                )
+
+            for state_poll_loop in self._poll_loops:
+                await state_poll_loop.wait_for_first_run()
 
-            config_entry.async_create_background_task(
-                self._hass,
-                async_create_catching_coro(state_poll_loop.start()),
-                "es_state_poll_task",
-            )
+        def stop(self) -> None:
+            """Stop polling."""
+            for state_poll_loop in self._poll_loops:
+                state_poll_loop.stop()
+
+            if self._cancel_registry_listener is not None:
+                self._cancel_registry_listener()
+                self._cancel_registry_listener = None
 
-            await state_poll_loop.wait_for_first_run()
+        async def poll(self, frequency: int | None = None) -> None:
+            """Poll the entities polled at the given frequency, by default the polling frequency, and queue them."""
+            frequency = self._settings.polling_frequency if frequency is None else frequency
 
-        async def poll(self) -> None:
-            """Poll for state changes and queue them for send."""
+            # Yield to the event loop now and then, as there may be thousands of entities
+            budget = DrainBudget(self._settings.drain_batch_size, self._settings.drain_budget / 1000)
+
+            if self._slots == 1:
+                await self._enqueue(
+                    self._scheduled_states(frequency), datetime.now(tz=UTC), frequency, budget
+                )
+                return
 
-            now: datetime = datetime.now(tz=UTC)
+            # Poll every slot which started since the previous run, so that a run which is a little early or late
+            # neither skips nor repeats a slot, but never poll an entity more than once per run. Runs are scheduled
+            # on the clock of the event loop, so ticks are counted on the same clock.
+            now = self._now()
+            wall_now = datetime.now(tz=UTC)
+            first_poll = self._first_polls.setdefault(frequency, now)
+            last_tick = self._last_ticks.get(frequency)
+
+            interval = frequency / self._slots
+            tick = round((now - first_poll) / interval)
+            first_tick = tick if last_tick is None else max(last_tick + 1, tick - self._slots + 1)
+
+            for slot_tick in range(first_tick, tick + 1):
+                states = (
+                    state
+                    for entity_id in self._slot_entities(frequency, slot_tick)
+                    if (state := self._hass.states.get(entity_id)) is not None
+                )
+
+                # Samples are stamped with the start of their slot rather than when they were read, so that the
+                # samples of an entity stay one polling interval apart
+                slot_start = first_poll + slot_tick * interval
+                timestamp = wall_now - timedelta(seconds=now - slot_start)
+
+                await self._enqueue(states, timestamp, frequency, budget)
+
+            if last_tick is None or tick > last_tick:
+                self._last_ticks[frequency] = tick
+
+        async def _enqueue(
+            self, states: Iterable[State], timestamp: datetime, frequency: int, budget: DrainBudget
+        ) -> None:
+            """Queue the polled states which pass the filter, and changed or are due a keyframe, for send."""
             reason = StateChangeType.NO_CHANGE
 
-            for state in self._hass.states.async_all():
+            for state in states:
                 # Ensure we only queue states that pass the filter
                 if self._filterer.passes_filter(state, reason):
-                    self._queue.put_nowait((now, state, reason))
+                    if self._keyframe_interval == 0:
+                        self._queue.put_nowait((timestamp, state, reason))
+                    elif self._changed_or_keyframe_due(state, frequency):
+                        self._queue.put_nowait((timestamp, state, reason))
+                        self.record_export(state)
+                    else:
+                        self._skipped += 1
+
+                await budget.checkpoint()
+
+        @callback
+        def record_export(self, state: State) -> None:
+            """Remember that a state was queued for send, by the poller or the listener."""
+            self._exported[state.entity_id] = (state.last_updated, self._now())
+
+        @callback
+        def forget_export(self, item: QueueItem) -> None:
+            """Forget that a state was queued for send once the queue drops it, so that the next poll queues it again.
+
+            A state which was queued again since, or which a newer state replaced, keeps its export.
+            """
+            _, state, _ = item
+
+            exported = self._exported.get(state.entity_id)
+
+            if exported is not None and exported[0] == state.last_updated:
+                del self._exported[state.entity_id]
+
+        def _changed_or_keyframe_due(self, state: State, frequency: int) -> bool:
+            """Determine if an entity changed since it was last queued, or its keyframe interval elapsed."""
+            exported = self._exported.get(state.entity_id)
+
+            if exported is None:
+                return True
+
+            last_updated, exported_at = exported
+
+            if state.last_updated != last_updated:
+                return True
+
+            # Polls run a polling interval apart, so allow half an interval of slack to avoid publishing the keyframe
+            # one poll late
+            return self._now() - exported_at + frequency / 2 >= self._keyframe_interval
+
+        def diagnostics(self) -> dict[str, Any]:
+            """Return polling statistics for diagnostics."""
+            return {
+                "frequencies": sorted(self._schedule.frequencies),
+                "slots": self._slots,
+                "keyframe_interval": self._keyframe_interval,
+                "skipped_unchanged": self._skipped,
+            }
+
+        def _now(self) -> float:
+            """Return the current time of the clock, defaulting to the running event loop."""
+            if self._clock is None:
+                self._clock = asyncio.get_running_loop()
+
+            return self._clock.time()
+
+        def _slot_entities(self, frequency: int, slot_tick: int) -> list[str]:
+            """Return the entities in the slot of a tick, bucketing the entities once per polling interval.
+
+            Entities which are added during a polling interval are polled from the next interval on.
+            """
+            interval = slot_tick // self._slots
+            bucketed = self._slot_buckets.get(frequency)
+
+            if bucketed is None or bucketed[0] != interval:
+                buckets: list[list[str]] = [[] for _ in range(self._slots)]
+
+                for state in self._scheduled_states(frequency):
+                    buckets[self._slot(state.entity_id)].append(state.entity_id)
+
+                bucketed = self._slot_buckets[frequency] = (interval, buckets)
+
+            return bucketed[1][slot_tick % self._slots]
+
+        def _slot(self, entity_id: str) -> int:
+            """Return the slot of an entity, which is stable across restarts as it is based on the entity id."""
+            slot: int | None = self._entity_slots.get(entity_id)
+
+            if slot is None:
+                slot = self._entity_slots[entity_id] = zlib.crc32(entity_id.encode()) % self._slots
+
+            return slot
+
+        def _valid_schedule_entries(self) -> list[str]:
+            """Return the polling schedule entries which can be parsed, warning about the others."""
+            entries: list[str] = []
+
+            for entry in self._settings.polling_schedule:
+                try:
+                    PollingSchedule.parse_entry(entry)
+                except ValueError as err:
+                    self._logger.warning("Ignoring invalid polling schedule entry. %s", err)
+                    continue
+
+                entries.append(entry)
+
+            return entries
+
+        @callback
+        def _handle_entity_registry_updated(
+            self, event: Event[entity_registry.EventEntityRegistryUpdatedData]
+        ) -> None:
+            """Forget the polling frequency of an entity which was created, updated, renamed or removed."""
+            self._entity_frequencies.pop(event.data["entity_id"], None)
+
+            # The entity may have moved to another polling frequency
+            self._slot_buckets.clear()
+
+            if event.data["action"] == "remove":
+                self._exported.pop(event.data["entity_id"], None)
+
+            if old_entity_id := event.data.get("old_entity_id"):
+                self._entity_frequencies.pop(old_entity_id, None)
+                self._exported.pop(old_entity_id, None)
+
+        def _frequency(self, state: State) -> int:
+            """Return the polling frequency of an entity."""
+            frequency: int | None = self._entity_frequencies.get(state.entity_id)
+
+            if frequency is None:
+                frequency = self._entity_frequencies[state.entity_id] = self._schedule.frequency(
+                    state, self._entity_registry.async_get(state.entity_id)
+                )
+
+            return frequency
+
+        def _scheduled_states(self, frequency: int) -> Iterator[State]:
+            """Return the states of the entities polled at the given frequency."""
+            if not self._schedule.has_entries:
+                yield from self._states()
+                return
+
+            for state in self._states():
+                if self._frequency(state) == frequency:
+                    yield state
+
+        def _states(self) -> Iterator[State]:
+            """Return the states to poll, looking up only the included entities in targeted mode."""
+            if not self._filterer.targeted:
+                yield from self._hass.states.async_all()
+                return
+
+            for entity_id in self._filterer.targets():
+                if (state := self._hass.states.get(entity_id)) is not None:
+                    yield state
 
     class Formatter:
         """Formats state changes into documents."""
@@ -525,47 +1522,169 @@ class Pipeline:
 
             self._debug_attribute_filtering: bool = settings.debug_attribute_filtering
 
+            self._hass: HomeAssistant = hass
+
             self._extended_entity_details = ExtendedEntityDetails(hass, self._logger)
 
+            # The flattened registry details and datastream fields of each entity, which only change when the
+            # registries do, and the entities attached to each device so that they can be invalidated
+            self._fragments: dict[str, EntityFragment] = {}
+            self._device_entities: dict[str, set[str]] = {}
+
+            self._cancel_listeners: list[CALLBACK_TYPE] = []
+
         @async_log_enter_exit_debug
         async def async_init(self, static_fields: dict[str, Any]) -> None:
             """Initialize the formatter."""
-            self._static_fields = static_fields
+            self._static_fields = utils.prepare_dict(static_fields)
+
+            self._cancel_listeners = [
+                self._hass.bus.async_listen(
+                    entity_registry.EVENT_ENTITY_REGISTRY_UPDATED, self._handle_entity_registry_updated
+                ),
+                self._hass.bus.async_listen(
+                    device_registry.EVENT_DEVICE_REGISTRY_UPDATED, self._handle_device_registry_updated
+                ),
+                *[
+                    self._hass.bus.async_listen(event_type, self._handle_registry_updated)
+                    for event_type in (
+                        area_registry.EVENT_AREA_REGISTRY_UPDATED,
+                        floor_registry.EVENT_FLOOR_REGISTRY_UPDATED,
+                        label_registry.EVENT_LABEL_REGISTRY_UPDATED,
+                    )
+                ],
+            ]
+
+        @log_enter_exit_debug
+        def stop(self) -> None:
+            """Stop keeping the cached entity fragments up to date."""
+            for cancel_listener in self._cancel_listeners:
+                cancel_listener()
+
+            self._cancel_listeners = []
+
+        @callback
+        def _handle_entity_registry_updated(
+            self, event: Event[entity_registry.EventEntityRegistryUpdatedData]
+        ) -> None:
+            """Forget the fragment of an entity which was created, updated, renamed or removed."""
+            self._fragments.pop(event.data["entity_id"], None)
+
+            if old_entity_id := event.data.get("old_entity_id"):
+                self._fragments.pop(old_entity_id, None)
+
+        @callback
+        def _handle_device_registry_updated(
+            self, event: Event[device_registry.EventDeviceRegistryUpdatedData]
+        ) -> None:
+            """Forget the fragments of the entities attached to a device which was updated or removed."""
+            for entity_id in self._device_entities.pop(event.data["device_id"], set()):
+                self._fragments.pop(entity_id, None)
+
+        @callback
+        def _handle_registry_updated(self, event: Event) -> None:
+            """Forget all fragments when an area, floor or label changes, as any entity may refer to it."""
+            self._fragments.clear()
+            self._device_entities.clear()
 
         def format(self, time: datetime, state: State, reason: StateChangeType) -> dict[str, Any]:
             """Format the state change into a document."""
+            return self.format_with_fragment(time, state, reason, self.entity_fragment(state))
+
+        def format_batch(
+            self,
+            batch: list[tuple[datetime, State, StateChangeType, EntityFragment]],
+            serializer: Serializer | None = None,
+        ) -> list[dict[str, Any]]:
+            """Format a batch of state changes whose entity fragments were already resolved, skipping failures.
+
+            Runs in a worker thread. When a serializer is provided, each document also carries its serialized form.
+            """
+            documents: list[dict[str, Any]] = []
+
+            for timestamp, state, reason, fragment in batch:
+                try:
+                    document = self.format_with_fragment(timestamp, state, reason, fragment)
+
+                    if serializer is not None:
+                        document = EncodedDocument(document, serializer.json_dumps(document))
+
+                    documents.append(document)
+                except Exception:
+                    self._logger.exception(
+                        "Error formatting document for entity [%s]. Skipping document.", state.entity_id
+                    )
+
+            return documents
+
+        def format_with_fragment(
+            self, time: datetime, state: State, reason: StateChangeType, fragment: EntityFragment
+        ) -> dict[str, Any]:
+            """Format the state change into a document, using the provided entity fragment.
+
+            Does not use the registries, so it is safe to call from a worker thread.
+            """
+
+            entity_fields, datastream_fields = fragment
 
             document = {
                 "@timestamp": time.isoformat(),
                 "event.action": reason.to_publish_reason(),
                 "event.kind": "event",
                 "event.type": "info" if reason == StateChangeType.NO_CHANGE else "change",
-                "hass.entity": {**self._state_to_extended_details(state)},
-                "hass.entity.attributes": self._state_to_attributes(state),
-                "hass.entity.value": state.state,
-                "hass.entity.valueas": self._state_to_coerced_value(state),
-                "hass.entity.object.id": state.object_id,
-                **Pipeline.Formatter.domain_to_datastream(state.domain),
-                **self._static_fields,
+                **entity_fields,
             }
 
-            return utils.prepare_dict(document)
+            utils.flatten_dict_into(
+                target=document,
+                d={
+                    "hass.entity.friendly_name": state.name,
+                    "hass.entity.location": self._state_to_location(state),
+                    "hass.entity.attributes": self._state_to_attributes(state),
+                    "hass.entity.value": state.state,
+                    "hass.entity.valueas": self._state_to_coerced_value(state),
+                    "hass.entity.object.id": state.object_id,
+                },
+            )
+
+            document.update(datastream_fields)
+            document.update(self._static_fields)
+
+            return document
+
+        def entity_fragment(self, state: State) -> EntityFragment:
+            """Return the flattened registry details and datastream fields of the entity, building them on first use.
+
+            Fragments are read-only, so that they can be shared with worker threads.
+            """
+            fragment = self._fragments.get(state.entity_id)
+
+            if fragment is None:
+                details = self._entity_to_extended_details(state.entity_id)
 
-        def _state_to_extended_details(self, state: State) -> dict:
-            """Gather entity details from the state object and return a mapped dictionary ready to be put in an elasticsearch document."""
+                fragment = self._fragments[state.entity_id] = (
+                    MappingProxyType(utils.prepare_dict({"hass.entity": details})),
+                    MappingProxyType(Pipeline.Formatter.domain_to_datastream(state.domain)),
+                )
 
-            document = self._extended_entity_details.async_get(state.entity_id).to_dict()
+                if details.get("device"):
+                    self._device_entities.setdefault(details["device"]["id"], set()).add(state.entity_id)
 
-            # The logic for friendly name is in the state for some reason
-            document["friendly_name"] = state.name
+            return fragment
 
+        def _entity_to_extended_details(self, entity_id: str) -> dict:
+            """Gather the registry details of an entity, including its device, area, floor and labels."""
+            return self._extended_entity_details.async_get(entity_id).to_dict()
+
+        def _state_to_location(self, state: State) -> list[float] | None:
+            """Return the location of the entity as a [longitude, latitude] pair, if it has one."""
             if state.attributes.get("longitude") and state.attributes.get("latitude"):
-                document["location"] = [
+                return [
                     state.attributes.get("longitude"),
                     state.attributes.get("latitude"),
                 ]
 
-            return document
+            return None
 
         def _state_to_attributes(self, state: State) -> dict:
             """Convert the attributes of a State object into a dictionary compatible with Elasticsearch mappings."""
@@ -753,15 +1872,46 @@ class Pipeline:
             settings: PipelineSettings,
             manager: Pipeline.Manager,
             log: Logger = BASE_LOGGER,
+            clock: Clock | None = None,
         ) -> None:
             """Initialize the publisher."""
             self._logger = log
+            self._clock: Clock | None = clock
             self._gateway = gateway
             self._manager = manager
             self._settings = settings
             self._hass = hass
             self._queue: EventQueue = manager.queue
 
+            self._publish_loop: LoopHandler | None = None
+            self._age_timer: asyncio.TimerHandle | None = None
+
+            # Early flushes are disarmed after waking the loop until a publish completes, so a burst does
+            # not wake the loop over and over while Elasticsearch is unavailable
+            self._flush_armed: bool = True
+
+            self._spool: Spool | None = None
+            self._serializer: Serializer = FastSerializer() if settings.fast_serializer else Serializer()
+            self._last_replay: float | None = None
+
+            self._dead_letter: DeadLetterFile | None = None
+
+            # Documents which Elasticsearch could not handle at the time are sent again by the first publish after
+            # their backoff has passed
+            self._retries: deque[RetryAction] = deque()
+            self._retries_exhausted: int = 0
+
+            # Events which the event queue dropped to make room, held until the next publish spools them
+            self._overflow: list[QueueItem] = []
+
+            # The index of each spooled action being replayed, by identity, and how many of them were published
+            # before the first one handed back to be retried
+            self._replaying: dict[int, int] = {}
+            self._replay_acknowledged: int = 0
+
+            # Held while publishing, so that the shutdown flush does not run alongside a publish in progress
+            self._publish_lock: asyncio.Lock = asyncio.Lock()
+
         @async_log_enter_exit_debug
         async def async_init(self, config_entry: ConfigEntry) -> None:
             """Initialize the publisher."""
@@ -770,8 +1920,39 @@ class Pipeline:
                 func=self.publish,
                 frequency=self._settings.publish_frequency,
                 log=self._logger,
+                mode=LoopMode.FIXED_DELAY,
             )
 
+            self._publish_loop = filter_format_publish
+
+            # The spool also holds the events which could not be published before shutting down
+            if self._settings.spool_enabled or self._settings.shutdown_flush_timeout > 0:
+                self._spool = Spool(
+                    path=Path(self._hass.config.path(STORAGE_DIR, DOMAIN, "spool", config_entry.entry_id)),
+                    max_bytes=self._settings.spool_max_bytes,
+                    log=self._logger,
+                )
+                await self._hass.async_add_executor_job(self._spool.open)
+
+            if self._settings.spool_enabled and self._queue.bounded:
+                self._queue.add_drop_listener(self._on_event_dropped)
+
+            if self._settings.dead_letter_enabled:
+                self._dead_letter = DeadLetterFile(
+                    path=Path(
+                        self._hass.config.path(STORAGE_DIR, DOMAIN, "deadletter", config_entry.entry_id)
+                    ),
+                    max_bytes=self._settings.dead_letter_max_bytes,
+                    log=self._logger,
+                )
+                self._gateway.add_rejection_listener(self._dead_letter.add)
+
+            self._gateway.add_retry_listener(self._retry_later)
+            self._gateway.add_requeue_listener(self._requeue)
+
+            if self._has_flush_triggers():
+                self._queue.add_put_listener(self._on_event_queued)
+
             config_entry.async_create_background_task(
                 self._hass,
                 async_create_catching_coro(filter_format_publish.start()),
@@ -780,6 +1961,160 @@ class Pipeline:
 
             await filter_format_publish.wait_for_first_run()
 
+        def stop(self) -> None:
+            """Stop the publisher."""
+            self._cancel_age_timer()
+
+        async def async_flush(self, timeout: float) -> None:
+            """Publish the queued events before shutting down, persisting those left once the timeout has passed.
+
+            Events are sent in fixed batches and only counted as sent once their batch completes, so a batch cut
+            short by the timeout is persisted in full and may be published twice rather than lost. Documents which
+            Elasticsearch hands back are persisted rather than counted as published.
+            """
+            if self._publish_loop is None:
+                return
+
+            self._publish_loop.stop()
+            self._cancel_age_timer()
+
+            if self._queue.empty() and not self._retries and not self._overflow:
+                return
+
+            actions: list[dict[str, Any]] = self._take_retries()
+            sent = 0
+            published = 0
+            locked = False
+
+            deadline = asyncio.get_running_loop().time() + timeout
+
+            try:
+                async with asyncio.timeout_at(deadline):
+                    await self._publish_lock.acquire()
+
+                locked = True
+
+                # The drain stops between events once the deadline has passed rather than being cancelled, as
+                # events taken off the queue by a cancelled drain would be neither published nor persisted. Actions
+                # are appended one at a time so that those drained before an error are kept.
+                drained = self._manager.sip_queue(deadline=deadline)
+                async for action in self._add_action_and_meta_data(iterable=drained):
+                    actions.append(action)  # noqa: PERF401
+
+                async with asyncio.timeout_at(deadline):
+                    if await self._gateway.check_connection():
+                        while sent < len(actions):
+                            batch = actions[sent : sent + SHUTDOWN_FLUSH_BATCH_SIZE]
+                            retries, exhausted = len(self._retries), self._retries_exhausted
+
+                            await self._gateway.bulk(actions=self._iterate_actions(batch))
+
+                            # Documents handed back are persisted below, or dropped once they used up their attempts
+                            handed_back = len(self._retries) - retries + self._retries_exhausted - exhausted
+
+                            sent += len(batch)
+                            published += len(batch) - handed_back
+            except TimeoutError:
+                self._logger.warning("Publishing the queued events did not complete within %ss.", timeout)
+            except Exception:  # noqa: BLE001
+                self._logger.warning("Error publishing the queued events on shutdown.")
+                self._logger.debug("Error publishing the queued events on shutdown.", exc_info=True)
+            finally:
+                if locked:
+                    self._publish_lock.release()
+
+            # Events which were not published, including those the flush did not reach or handed back to be retried
+            actions = actions[sent:] + self._take_retries()
+            async for action in self._add_action_and_meta_data(iterable=self._manager.sip_queue()):
+                actions.append(action)
+            async for action in self._take_overflow():
+                actions.append(action)
+
+            persisted = await self._spool_actions(actions)
+
+            self._logger.info(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.",
+                published,
+                persisted,
+                len(actions) - persisted,
+            )
+
+        def diagnostics(self) -> dict[str, Any]:
+            """Return runtime statistics of the publisher for diagnostics."""
+            diagnostics: dict[str, Any] = {
+                "pending_retries": len(self._retries),
+            }
+
+            if self._spool is not None:
+                diagnostics["spool"] = self._spool.diagnostics()
+
+            if self._dead_letter is not None:
+                diagnostics["dead_letter"] = self._dead_letter.diagnostics()
+
+            return diagnostics
+
+        def _has_flush_triggers(self) -> bool:
+            """Determine if any flush trigger besides the publish frequency is configured."""
+            return (
+                self._settings.publish_max_events > 0
+                or self._settings.publish_max_bytes > 0
+                or self._settings.publish_max_age > 0
+            )
+
+        def _flush_threshold_crossed(self) -> bool:
+            """Determine if the queue has reached the configured depth or estimated size."""
+            max_events = self._settings.publish_max_events
+            max_bytes = self._settings.publish_max_bytes
+
+            if max_events > 0 and self._queue.qsize() >= max_events:
+                return True
+
+            return max_bytes > 0 and self._queue.estimated_bytes >= max_bytes
+
+        @callback
+        def _on_event_queued(self) -> None:
+            """Wake the publishing loop early when a flush threshold is crossed."""
+            if not self._flush_armed:
+                return
+
+            if self._flush_threshold_crossed():
+                self._flush_now("Queue reached its flush threshold.")
+                return
+
+            if self._settings.publish_max_age > 0 and self._age_timer is None:
+                self._age_timer = self._hass.loop.call_later(
+                    self._settings.publish_max_age, self._on_max_age_reached
+                )
+
+        @callback
+        def _on_max_age_reached(self) -> None:
+            """Wake the publishing loop early when the oldest pending event reaches the maximum age."""
+            self._age_timer = None
+
+            if self._flush_armed and not self._queue.empty():
+                self._flush_now("Oldest queued event reached its maximum age.")
+
+        @callback
+        def _on_event_dropped(self, item: QueueItem) -> None:
+            """Hold an event which the event queue dropped to make room, so that the next publish spools it."""
+            self._overflow.append(item)
+
+        def _flush_now(self, reason: str) -> None:
+            """Wake the publishing loop ahead of its schedule."""
+            if self._publish_loop is None:
+                return
+
+            self._logger.debug("%s Publishing early.", reason)
+
+            self._flush_armed = False
+            self._publish_loop.wake_now()
+
+        def _cancel_age_timer(self) -> None:
+            """Cancel the pending maximum age timer."""
+            if self._age_timer is not None:
+                self._age_timer.cancel()
+                self._age_timer = None
+
         @staticmethod
         @lru_cache(maxsize=128)
         def _format_datastream_name(
@@ -806,18 +2141,201 @@ class Pipeline:
                     "_source": document,
                 }
 
+        @staticmethod
+        async def _iterate_actions(actions: list[dict[str, Any]]) -> AsyncGenerator[dict[str, Any], Any]:
+            """Yield previously prepared actions."""
+            for action in actions:
+                yield action
+
+        async def _spool_queue(self) -> None:
+            """Move the pending retries and queued events to the spool while the connection is not available."""
+            if self._spool is None or (self._queue.empty() and not self._retries):
+                return
+
+            actions = self._add_action_and_meta_data(iterable=self._manager.sip_queue())
+
+            spooled = await self._spool_actions(self._take_retries() + [action async for action in actions])
+
+            self._logger.debug("Connection is not available. Spooled %s event(s) to disk.", spooled)
+
+        def _take_overflow(self) -> AsyncGenerator[dict[str, Any], Any]:
+            """Remove the events which the event queue dropped to make room, returning them as actions."""
+            items, self._overflow = self._overflow, []
+
+            return self._add_action_and_meta_data(iterable=self._manager.format_events(items))
+
+        async def _spool_overflow(self) -> None:
+            """Move the events which the event queue dropped to make room to the spool."""
+            if not self._overflow:
+                return
+
+            spooled = await self._spool_actions([action async for action in self._take_overflow()])
+
+            self._logger.debug("Spooled %s event(s) dropped by the full event queue.", spooled)
+
+        async def _with_retries(
+            self, actions: AsyncIterable[dict[str, Any]]
+        ) -> AsyncGenerator[dict[str, Any], Any]:
+            """Yield the pending retries whose backoff has passed, then the actions.
+
+            Retries are taken one at a time, so those which are not reached stay pending, and documents handed back
+            while publishing are left for a later publish.
+            """
+            now = self._now()
+
+            for _ in range(len(self._retries)):
+                retry = self._retries.popleft()
+
+                if retry.retry_at > now:
+                    self._retries.append(retry)
+                    continue
+
+                yield retry
+
+            async for action in actions:
+                yield action
+
+        def _take_retries(self) -> list[dict[str, Any]]:
+            """Remove and return the pending retries, whether or not their backoff has passed."""
+            actions: list[dict[str, Any]] = list(self._retries)
+
+            self._retries.clear()
+
+            return actions
+
+        @callback
+        def _retry_later(self, action: dict[str, Any]) -> None:
+            """Hold an action which Elasticsearch could not handle at the time, to send it again after a backoff.
+
+            The backoff doubles with each attempt, and the action is dropped once it used up its attempts.
+            """
+            if self._keep_in_spool(action):
+                return
+
+            attempts = (action.attempts if type(action) is RetryAction else 0) + 1
+
+            if attempts > self._gateway.settings.bulk_max_retries:
+                self._retries_exhausted += 1
+                return
+
+            backoff = min(RETRY_MAX_BACKOFF, RETRY_INITIAL_BACKOFF * 2 ** (attempts - 1))
+
+            self._retries.append(RetryAction(action, attempts=attempts, retry_at=self._now() + backoff))
+
+        @callback
+        def _requeue(self, action: dict[str, Any]) -> None:
+            """Hold an action which was never sent, to send it with the next publish without using up an attempt."""
+            if self._keep_in_spool(action):
+                return
+
+            attempts = action.attempts if type(action) is RetryAction else 0
+
+            self._retries.append(RetryAction(action, attempts=attempts, retry_at=self._now()))
+
+        def _keep_in_spool(self, action: dict[str, Any]) -> bool:
+            """Determine if an action handed back is being replayed from the spool, where it stays until published."""
+            index = self._replaying.get(id(action))
+
+            if index is None:
+                return False
+
+            self._replay_acknowledged = min(self._replay_acknowledged, index)
+
+            return True
+
+        def _now(self) -> float:
+            """Return the current time of the clock, defaulting to the running event loop."""
+            if self._clock is None:
+                self._clock = asyncio.get_running_loop()
+
+            return self._clock.time()
+
+        async def _spool_actions(self, actions: list[dict[str, Any]]) -> int:
+            """Write the actions to the spool, returning the number of actions written."""
+            if self._spool is None or not actions:
+                return 0
+
+            lines = [self._serializer.json_dumps(action) for action in actions]
+
+            return await self._hass.async_add_executor_job(self._spool.append, lines)
+
+        async def _replay_spool(self) -> None:
+            """Publish spooled events in order, no faster than the configured replay rate."""
+            # The spool keeps count of its pending bytes in memory, so an empty spool costs no executor job and
+            # checking it never waits on a write in progress
+            if self._spool is None or self._spool.empty:
+                return
+
+            now = self._now()
+
+            # Replay the events accumulated since the previous replay, capped at one publish cycle's worth
+            elapsed: float = self._settings.publish_frequency
+            if self._last_replay is not None:
+                elapsed = min(elapsed, now - self._last_replay)
+
+            max_actions = max(1, int(self._settings.spool_replay_rate * elapsed))
+
+            batch = await self._hass.async_add_executor_job(self._spool.read, max_actions)
+
+            if not batch.actions:
+                return
+
+            self._last_replay = now
+
+            self._replaying = {id(action): index for index, action in enumerate(batch.actions)}
+            self._replay_acknowledged = len(batch.actions)
+
+            try:
+                await self._gateway.bulk(actions=self._iterate_actions(batch.actions))
+            finally:
+                self._replaying = {}
+
+            # Only the actions ahead of the first one handed back to be retried are committed, so the others are
+            # replayed again rather than held in memory, where a crash would lose them
+            acknowledged = self._replay_acknowledged
+
+            if acknowledged == 0:
+                self._logger.debug("Replaying spooled events will be retried on the next publish.")
+                return
+
+            await self._hass.async_add_executor_job(
+                self._spool.commit, batch.position_after(acknowledged), acknowledged
+            )
+
+            self._logger.info("Replayed %s spooled event(s).", acknowledged)
+
         async def publish(self) -> None:
             """Publish the document to Elasticsearch."""
+            async with self._publish_lock:
+                await self._publish()
+
+        async def _publish(self) -> None:
+            """Publish the document to Elasticsearch, while holding the publish lock."""
+
+            self._cancel_age_timer()
 
             try:
+                await self._spool_overflow()
+
                 if not await self._gateway.check_connection():
-                    self._logger.debug("Skipping publishing as connection is not available.")
+                    if self._settings.spool_enabled:
+                        await self._spool_queue()
+                    else:
+                        self._logger.debug("Skipping publishing as connection is not available.")
                     return
 
+                if self._spool is not None:
+                    await self._replay_spool()
+
                 actions = self._add_action_and_meta_data(iterable=self._manager.sip_queue())
 
+                if self._retries:
+                    actions = self._with_retries(actions)
+
                 await self._gateway.bulk(actions=actions)
 
+                self._flush_armed = True
+
             except AuthenticationRequired:
                 msg = "Authentication issue in publishing loop."
                 self._manager.reload_config_entry(msg)
@@ -836,3 +2354,19 @@ class Pipeline:
 
                 self._logger.error(msg)
                 self._logger.debug(msg, exc_info=True)
+
+            if self._retries_exhausted > 0:
+                self._logger.error(
+                    "Failed to publish %d documents after %d attempts",
+                    self._retries_exhausted,
+                    self._gateway.settings.bulk_max_retries + 1,
+                )
+                self._retries_exhausted = 0
+
+            if self._dead_letter is not None and self._dead_letter.pending:
+                try:
+                    await self._hass.async_add_executor_job(self._dead_letter.flush)
+                except OSError:
+                    msg = "Error writing rejected documents to the dead letter file, will retry on the next publish."
+                    self._logger.error(msg)
+                    self._logger.debug(msg, exc_info=True)
@@ -1,67 +1,145 @@
-"""Implements a loop handler."""
+"""Implements a loop handler, and helpers to share the event loop fairly."""
 
 import asyncio
 import time
 import typing
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import UTC, datetime, timedelta
+from enum import Enum
 from logging import Logger
 
 from .logger import LOGGER as BASE_LOGGER
 
 
+class LoopMode(Enum):
+    """How a loop handler schedules its next run."""
+
+    # Runs start a fixed interval apart, skipping the runs missed while a slow run was in progress
+    FIXED_RATE = "fixed_rate"
+    # Each run starts a fixed interval after the previous run finished
+    FIXED_DELAY = "fixed_delay"
+
+
+class Timer(typing.Protocol):
+    """A scheduled callback which can be cancelled."""
+
+    def cancel(self) -> None:
+        """Cancel the callback."""
+
+
+class Clock(typing.Protocol):
+    """Source of time and timers for a loop handler, implemented by the asyncio event loop."""
+
+    def time(self) -> float:
+        """Return the current time in seconds."""
+
+    def call_at(self, when: float, callback: typing.Callable[[], typing.Any]) -> Timer:
+        """Run the callback once the clock reaches the given time."""
+
+
 class LoopHandler:
-    """Handle a loop for a given function."""
+    """Handle a loop for a given function.
 
-    def __init__(self, func: typing.Callable, name: str, frequency: int, log: Logger = BASE_LOGGER) -> None:
+    The loop sleeps on a timer until its next run is due, or until it is woken early, rather than polling the clock.
+    Time is read from the running event loop unless another clock is provided, e.g. to simulate schedules in tests.
+    """
+
+    def __init__(
+        self,
+        func: typing.Callable,
+        name: str,
+        frequency: float,
+        log: Logger = BASE_LOGGER,
+        mode: LoopMode = LoopMode.FIXED_RATE,
+        clock: Clock | None = None,
+    ) -> None:
         """Initialize the loop handler."""
         self._func: typing.Callable = func
 
         self._name = name
 
-        self._frequency: int = frequency
+        self._frequency: float = frequency
+        self._mode: LoopMode = mode
         self._running: bool = False
         self._should_stop: bool = False
         self._run_count: int = 0
 
         self._log: Logger = log
-        self._next_run_time: float = time.monotonic()
+        self._clock: Clock | None = clock
+        self._next_run_time: float | None = None
+        self._wake: asyncio.Event = asyncio.Event()
+        self._first_run: asyncio.Event = asyncio.Event()
 
     def get_run_count(self) -> int:
         """Return the number of times the loop has run."""
         return self._run_count
 
+    def wake_now(self) -> None:
+        """Run the loop as soon as possible instead of waiting for the next scheduled run."""
+        self._next_run_time = None
+        self._wake.set()
+
     async def wait_for_first_run(self) -> None:
         """Wait for the first run of the loop."""
-        while self._run_count == 0:
-            await asyncio.sleep(0.1)
+        await self._first_run.wait()
+
+    def _get_clock(self) -> Clock:
+        """Return the clock, defaulting to the running event loop."""
+        if self._clock is None:
+            self._clock = asyncio.get_running_loop()
+
+        return self._clock
+
+    def _now(self) -> float:
+        """Return the current time of the clock."""
+        return self._get_clock().time()
 
     def _time_to_run(self) -> bool:
-        """Determine if now is a good time to poll for state changes."""
-        return self._next_run_time <= time.monotonic()
+        """Determine if the next run is due."""
+        return self._next_run_time is None or self._next_run_time <= self._now()
 
-    def _time_until_next_run(self) -> int:
-        """Return the time until the next run."""
+    def _time_until_next_run(self) -> float:
+        """Return the number of seconds until the next run, or zero if it is due."""
+        if self._next_run_time is None:
+            return 0.0
 
-        # If the next run time is in the past, return 0
-        # Otherwise, return the time until the next run, round up to the nearest second
-        return max(0, int(self._next_run_time - time.monotonic()))
+        return max(0.0, self._next_run_time - self._now())
 
     async def _wait_for_next_run(self) -> None:
-        """Wait for the next poll time."""
-        while not self._time_to_run():
-            if self._should_stop_running():
-                msg = "Stopping the loop handler."
-                raise RuntimeError(msg)
-            await self._spin()
-            continue
+        """Sleep until the next run is due, the loop is woken, or the loop is stopped."""
+        while not self._should_stop_running() and self._next_run_time is not None and not self._time_to_run():
+            self._wake.clear()
+
+            timer = self._get_clock().call_at(self._next_run_time, self._wake.set)
+
+            try:
+                await self._wake.wait()
+            finally:
+                timer.cancel()
+
+    def _schedule_next_run(self, started: float) -> None:
+        """Schedule the next run, given when the current run started."""
+        now = self._now()
+
+        if self._mode is LoopMode.FIXED_DELAY:
+            self._next_run_time = now + self._frequency
+        else:
+            next_run_time = started + self._frequency
+
+            # Skip the runs that were missed while the previous run was in progress, staying on the same phase
+            if next_run_time <= now and self._frequency > 0:
+                next_run_time += ((now - next_run_time) // self._frequency + 1) * self._frequency
+
+            self._next_run_time = next_run_time
+
+        delay = self._next_run_time - now
 
-    def _schedule_next_run(self) -> None:
-        self._next_run_time = time.monotonic() + self._frequency
         self._log.debug(
             "Next run of loop: %s scheduled for roughly %s (UTC) -- %ss from now",
             self._name,
-            datetime.now(tz=UTC) + timedelta(0, self._frequency),
-            self._frequency,
+            datetime.now(tz=UTC) + timedelta(seconds=delay),
+            round(delay, 3),
         )
 
     def _should_keep_running(self) -> bool:
@@ -72,14 +150,11 @@ class LoopHandler:
         """Determine if the runner should stop."""
         return self._should_stop
 
-    async def _spin(self, duration: int = 1) -> None:
-        """Spin the event loop."""
-        await asyncio.sleep(duration)
-
     def stop(self) -> None:
-        """Stop the loop."""
+        """Stop the loop, waking it if it is waiting for its next run."""
         self._should_stop = True
         self._running = False
+        self._wake.set()
 
     async def start(self) -> None:
         """Start the loop."""
@@ -87,9 +162,21 @@ class LoopHandler:
 
         while self._should_keep_running():
             await self._wait_for_next_run()
-            self._schedule_next_run()
+
+            if self._should_stop_running():
+                break
+
+            # The first run, and runs that were woken early, start the schedule afresh
+            started = self._now() if self._next_run_time is None else self._next_run_time
+
+            self._wake.clear()
+
+            if self._mode is LoopMode.FIXED_RATE:
+                self._schedule_next_run(started)
 
             self._run_count += 1
+            self._first_run.set()
+
             try:
                 await self._func()
             except Exception:
@@ -97,3 +184,125 @@ class LoopHandler:
                 self._log.error("Unexpected error in loop handler: %s", self._name)
                 self.stop()
                 raise
+
+            # Woken while running, so the next run starts straight away
+            if self._mode is LoopMode.FIXED_DELAY and not self._wake.is_set():
+                self._schedule_next_run(started)
+
+
+class DrainBudget:
+    """Yield to the event loop while draining a long run of work on it.
+
+    A checkpoint is taken after each item. Once the given number of items has been handled, or the given time has
+    passed, since the last yield, the next checkpoint sleeps for zero seconds so that other tasks can run. A limit of
+    zero disables it.
+    """
+
+    def __init__(self, max_items: int, max_time: float) -> None:
+        """Initialize the drain budget, with max_time in seconds."""
+        self._max_items: int = max_items
+        self._max_time: float = max_time
+
+        self._items: int = 0
+        self._started: float = time.monotonic()
+
+        self.yields: int = 0
+
+    async def checkpoint(self) -> None:
+        """Record a handled item, yielding to the event loop once the budget is spent."""
+        self._items += 1
+
+        if (self._max_items and self._items >= self._max_items) or (
+            self._max_time and time.monotonic() - self._started >= self._max_time
+        ):
+            await asyncio.sleep(0)
+
+            self.yields += 1
+            self._items = 0
+            self._started = time.monotonic()
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop runs a periodic callback.
+
+    The lag is the time between when the callback was due and when it ran, which grows when a task holds the event
+    loop for too long. Sampling is meant to run only while work that could hold the loop is in progress, so that an
+    idle integration does not wake the loop up.
+    """
+
+    def __init__(self, interval: float = 0.1) -> None:
+        """Initialize the monitor, sampling every interval seconds."""
+        self._interval: float = interval
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._due: float = 0.0
+
+        self._samples: int = 0
+        self._total_lag: float = 0.0
+        self._max_lag: float = 0.0
+        self._last_lag: float = 0.0
+
+        self._active: int = 0
+
+    @contextmanager
+    def sampling(self) -> Iterator[None]:
+        """Sample the lag of the running event loop while the context is active, allowing nested contexts."""
+        self._active += 1
+
+        if self._active == 1:
+            self.start()
+
+        try:
+            yield
+        finally:
+            self._active -= 1
+
+            if self._active == 0:
+                self.stop()
+
+    def start(self) -> None:
+        """Start sampling the lag of the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._schedule()
+
+    def stop(self) -> None:
+        """Stop sampling, recording the lag of a sample which is overdue."""
+        if self._handle is None:
+            return
+
+        self._handle.cancel()
+        self._handle = None
+
+        if self._loop is not None and (lag := self._loop.time() - self._due) > 0:
+            self.record(lag)
+
+    def _schedule(self) -> None:
+        if self._loop is None:
+            return
+
+        self._due = self._loop.time() + self._interval
+        self._handle = self._loop.call_at(self._due, self._sample)
+
+    def _sample(self) -> None:
+        if self._loop is None:
+            return
+
+        self.record(max(0.0, self._loop.time() - self._due))
+        self._schedule()
+
+    def record(self, lag: float) -> None:
+        """Record a lag sample in seconds."""
+        self._samples += 1
+        self._total_lag += lag
+        self._last_lag = lag
+        self._max_lag = max(self._max_lag, lag)
+
+    def diagnostics(self) -> dict[str, typing.Any]:
+        """Return the loop lag statistics, in milliseconds, for diagnostics."""
+        return {
+            "samples": self._samples,
+            "last_ms": round(self._last_lag * 1000, 2),
+            "max_ms": round(self._max_lag * 1000, 2),
+            "mean_ms": round(self._total_lag / self._samples * 1000, 2) if self._samples else None,
+        }
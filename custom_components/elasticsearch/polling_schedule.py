@@ -0,0 +1,113 @@
+"""Polling frequencies for groups of entities, keyed by label, device class or domain."""
+
+from collections.abc import Iterable
+from enum import Enum
+
+from homeassistant.const import ATTR_DEVICE_CLASS
+from homeassistant.core import State
+from homeassistant.helpers.entity_registry import RegistryEntry
+
+
+class PollingScheduleKey(Enum):
+    """The kinds of entity group a polling frequency can be set for, from the most to the least specific."""
+
+    LABEL = "label"
+    DEVICE_CLASS = "device_class"
+    DOMAIN = "domain"
+
+
+class PollingSchedule:
+    """Determine how often each entity is polled.
+
+    Entries take the form `<label|device_class|domain>:<value>=<seconds>`, e.g. `domain:sun=3600` or
+    `device_class:temperature=60`. An entity is polled at the frequency of its most specific matching entry. Entities
+    without a matching entry are polled at the default frequency. A frequency of zero disables polling for the matching
+    entities.
+
+    When several entries of the same kind match, e.g. an entity with two labels, the entity is polled at the shortest
+    of their frequencies. Polling is only disabled when every one of them has a frequency of zero, so an entry which
+    disables polling never overrides one which enables it.
+    """
+
+    def __init__(self, default: int, entries: Iterable[str] = ()) -> None:
+        """Initialize the schedule, raising a ValueError if an entry cannot be parsed."""
+        self.default: int = default
+
+        self._frequencies: dict[PollingScheduleKey, dict[str, int]] = {key: {} for key in PollingScheduleKey}
+
+        for entry in entries:
+            key, value, frequency = self.parse_entry(entry)
+
+            current = self._frequencies[key].get(value)
+            self._frequencies[key][value] = (
+                frequency if current is None else self._combine([current, frequency])
+            )
+
+    @staticmethod
+    def _combine(frequencies: list[int]) -> int:
+        """Return the shortest frequency other than zero, or zero if every frequency is zero."""
+        return min((frequency for frequency in frequencies if frequency > 0), default=0)
+
+    @staticmethod
+    def parse_entry(entry: str) -> tuple[PollingScheduleKey, str, int]:
+        """Parse an entry into its key, value and frequency, raising a ValueError if it is invalid."""
+        group, separator, frequency = entry.strip().rpartition("=")
+        key, _, value = group.partition(":")
+
+        if not separator or not value.strip():
+            msg = f"Polling schedule entry [{entry}] is not in the form <label|device_class|domain>:<value>=<seconds>"
+            raise ValueError(msg)
+
+        try:
+            seconds = int(frequency)
+        except ValueError:
+            msg = f"Polling schedule entry [{entry}] has an invalid frequency [{frequency}]"
+            raise ValueError(msg) from None
+
+        if seconds < 0:
+            msg = f"Polling schedule entry [{entry}] has a negative frequency [{frequency}]"
+            raise ValueError(msg)
+
+        try:
+            schedule_key = PollingScheduleKey(key.strip())
+        except ValueError:
+            msg = f"Polling schedule entry [{entry}] has an unknown key [{key}]"
+            raise ValueError(msg) from None
+
+        return schedule_key, value.strip(), seconds
+
+    @property
+    def has_entries(self) -> bool:
+        """Return True if any group of entities has its own polling frequency."""
+        return any(self._frequencies.values())
+
+    @property
+    def frequencies(self) -> set[int]:
+        """Return the distinct polling frequencies, excluding zero."""
+        frequencies = {self.default}
+
+        for values in self._frequencies.values():
+            frequencies.update(values.values())
+
+        frequencies.discard(0)
+
+        return frequencies
+
+    def frequency(self, state: State, entity: RegistryEntry | None) -> int:
+        """Return the polling frequency of an entity."""
+        if entity is not None and entity.labels:
+            matches = [
+                self._frequencies[PollingScheduleKey.LABEL][label]
+                for label in entity.labels
+                if label in self._frequencies[PollingScheduleKey.LABEL]
+            ]
+
+            if matches:
+                return self._combine(matches)
+
+        device_class = state.attributes.get(ATTR_DEVICE_CLASS)
+
+        if device_class is not None and device_class in self._frequencies[PollingScheduleKey.DEVICE_CLASS]:
+            return self._frequencies[PollingScheduleKey.DEVICE_CLASS][device_class]
+
+        return self._frequencies[PollingScheduleKey.DOMAIN].get(state.domain, self.default)
@@ -0,0 +1,312 @@
+"""Append-only on-disk spool for bulk actions that could not be published."""
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from logging import Logger
+from pathlib import Path
+from typing import Any
+
+from .logger import LOGGER as BASE_LOGGER
+
+SEGMENT_SUFFIX = ".ndjson"
+CHECKPOINT_FILE = "checkpoint.json"
+
+DEFAULT_SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+
+
+@dataclass(frozen=True, order=True)
+class SpoolPosition:
+    """A position in the spool, expressed as a segment number and a byte offset into that segment."""
+
+    segment: int = 0
+    offset: int = 0
+
+
+@dataclass
+class SpoolBatch:
+    """A batch of spooled actions and the position to commit once they have been published."""
+
+    actions: list[dict[str, Any]] = field(default_factory=list)
+    position: SpoolPosition = field(default_factory=SpoolPosition)
+
+    # The position following each action, so that part of the batch can be committed
+    positions: list[SpoolPosition] = field(default_factory=list)
+
+    def position_after(self, count: int) -> SpoolPosition:
+        """Return the position to commit once the first count actions, at least one, have been published."""
+        if count >= len(self.actions):
+            return self.position
+
+        return self.positions[count - 1]
+
+
+class Spool:
+    """Append-only spool of bulk actions stored as newline-delimited JSON segment files.
+
+    Actions are appended in batches with a single sequential write to the newest segment, and segments roll over
+    once they reach their maximum size. Replay reads from a checkpoint which is only advanced, atomically, once a
+    batch has been published, and segments are removed once the checkpoint has moved past them. A crash during
+    replay therefore re-sends at most the batch that was in flight.
+
+    All methods perform blocking file I/O and must be run in an executor, except for the empty property which
+    only reads the number of pending bytes kept in memory.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int,
+        segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        log: Logger = BASE_LOGGER,
+    ) -> None:
+        """Initialize the spool."""
+        self._logger = log if log else BASE_LOGGER
+
+        self._path: Path = path
+        self._max_bytes: int = max_bytes
+        self._segment_max_bytes: int = segment_max_bytes
+
+        self._lock = threading.Lock()
+
+        self._segments: list[int] = []
+        self._checkpoint: SpoolPosition = SpoolPosition()
+        self._write_segment: int | None = None
+
+        # Bytes appended after the checkpoint, updated under the lock and read without it
+        self._pending_bytes: int = 0
+
+        self._spooled: int = 0
+        self._replayed: int = 0
+        self._rejected: int = 0
+
+    def open(self) -> None:
+        """Create the spool directory and load the existing segments and checkpoint."""
+        with self._lock:
+            self._path.mkdir(parents=True, exist_ok=True)
+
+            self._segments = sorted(
+                int(segment.stem)
+                for segment in self._path.glob(f"*{SEGMENT_SUFFIX}")
+                if segment.stem.isdigit()
+            )
+
+            self._checkpoint = self._read_checkpoint()
+
+            # Segments before the checkpoint were fully replayed before a crash prevented their removal
+            self._remove_segments_before(self._checkpoint.segment)
+
+            # Never append to a segment written by a previous run, it may end with a partially written line
+            self._write_segment = None
+
+            self._pending_bytes = self._pending_size()
+
+            if self._segments:
+                self._logger.info(
+                    "Found %s spooled segment(s) (%s bytes) to replay.", len(self._segments), self._size()
+                )
+
+    @property
+    def empty(self) -> bool:
+        """Return True if there is nothing left to replay, without touching the disk or waiting for the lock."""
+        return self._pending_bytes <= 0
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return spool statistics for diagnostics."""
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "bytes": self._size(),
+                "pending_bytes": self._pending_bytes,
+                "max_bytes": self._max_bytes,
+                "checkpoint": {"segment": self._checkpoint.segment, "offset": self._checkpoint.offset},
+                "spooled": self._spooled,
+                "replayed": self._replayed,
+                "rejected": self._rejected,
+            }
+
+    def append(self, lines: list[bytes]) -> int:
+        """Append serialized actions to the spool in a single write, returning the number of actions written."""
+        if not lines:
+            return 0
+
+        data = b"".join(line + b"\n" for line in lines)
+
+        with self._lock:
+            if self._max_bytes > 0 and self._size() + len(data) > self._max_bytes:
+                self._rejected += len(lines)
+                self._logger.warning(
+                    "Spool is full (%s bytes). Dropping %s event(s).",
+                    self._size(),
+                    len(lines),
+                )
+                return 0
+
+            segment = self._segment_for_write()
+
+            with self._segment_path(segment).open("ab") as segment_file:
+                segment_file.write(data)
+                segment_file.flush()
+                os.fsync(segment_file.fileno())
+
+            self._spooled += len(lines)
+            self._pending_bytes += len(data)
+
+        return len(lines)
+
+    def read(self, max_actions: int) -> SpoolBatch:
+        """Read up to the requested number of actions, starting at the checkpoint."""
+        batch = SpoolBatch()
+
+        with self._lock:
+            position = self._checkpoint
+
+            for segment in self._segments:
+                if segment < position.segment:
+                    continue
+
+                if segment > position.segment:
+                    position = SpoolPosition(segment=segment)
+
+                offset = self._read_segment(segment, position.offset, max_actions, batch)
+                position = SpoolPosition(segment=segment, offset=offset)
+
+                if len(batch.actions) >= max_actions or segment == self._write_segment:
+                    break
+
+            batch.position = position
+
+        return batch
+
+    def commit(self, position: SpoolPosition, count: int) -> None:
+        """Advance the checkpoint past a batch that has been published and remove fully replayed segments."""
+        with self._lock:
+            if position <= self._checkpoint:
+                return
+
+            # A segment is fully replayed once the checkpoint reaches its end and nothing more can be appended to it
+            if position.segment != self._write_segment and position.offset >= self._segment_size(
+                position.segment
+            ):
+                later_segments = [segment for segment in self._segments if segment > position.segment]
+                if later_segments:
+                    position = SpoolPosition(segment=later_segments[0])
+
+            self._write_checkpoint(position)
+            self._checkpoint = position
+            self._replayed += count
+
+            self._remove_segments_before(position.segment)
+
+            self._pending_bytes = self._pending_size()
+
+            if self._is_empty():
+                self._reset()
+
+    # Helpers, expected to be called while holding the lock
+
+    def _is_empty(self) -> bool:
+        return self._pending_bytes <= 0
+
+    def _size(self) -> int:
+        return sum(self._segment_size(segment) for segment in self._segments)
+
+    def _pending_size(self) -> int:
+        """Return the size of the segments after the checkpoint, as found on disk."""
+        size = sum(
+            self._segment_size(segment) for segment in self._segments if segment >= self._checkpoint.segment
+        )
+
+        return max(0, size - self._checkpoint.offset)
+
+    def _segment_path(self, segment: int) -> Path:
+        return self._path / f"{segment:010d}{SEGMENT_SUFFIX}"
+
+    def _segment_size(self, segment: int) -> int:
+        try:
+            return self._segment_path(segment).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _segment_for_write(self) -> int:
+        """Return the segment to append to, rolling over to a new segment when needed."""
+        if (
+            self._write_segment is not None
+            and self._segment_size(self._write_segment) < self._segment_max_bytes
+        ):
+            return self._write_segment
+
+        segment = self._segments[-1] + 1 if self._segments else max(1, self._checkpoint.segment)
+
+        self._segments.append(segment)
+        self._write_segment = segment
+
+        return segment
+
+    def _read_segment(self, segment: int, offset: int, max_actions: int, batch: SpoolBatch) -> int:
+        """Read complete lines from a segment into a batch, returning the offset after the last line consumed."""
+        with self._segment_path(segment).open("rb") as segment_file:
+            segment_file.seek(offset)
+
+            while len(batch.actions) < max_actions:
+                line = segment_file.readline()
+
+                # Stop at the end of the segment, or at a line that was only partially written
+                if not line.endswith(b"\n"):
+                    if line and segment != self._write_segment:
+                        self._logger.warning(
+                            "Skipping a partially written event at the end of spool segment [%s].", segment
+                        )
+                        offset += len(line)
+                    break
+
+                offset += len(line)
+
+                try:
+                    batch.actions.append(json.loads(line))
+                    batch.positions.append(SpoolPosition(segment=segment, offset=offset))
+                except ValueError:
+                    self._logger.warning("Skipping an unreadable event in spool segment [%s].", segment)
+
+        return offset
+
+    def _read_checkpoint(self) -> SpoolPosition:
+        checkpoint_path = self._path / CHECKPOINT_FILE
+
+        try:
+            checkpoint = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+            return SpoolPosition(segment=int(checkpoint["segment"]), offset=int(checkpoint["offset"]))
+        except FileNotFoundError:
+            return SpoolPosition(segment=self._segments[0] if self._segments else 0)
+        except (ValueError, KeyError, TypeError):
+            self._logger.warning("Spool checkpoint is unreadable. Replaying from the oldest segment.")
+            return SpoolPosition(segment=self._segments[0] if self._segments else 0)
+
+    def _write_checkpoint(self, position: SpoolPosition) -> None:
+        """Atomically replace the checkpoint file."""
+        checkpoint_path = self._path / CHECKPOINT_FILE
+        temporary_path = checkpoint_path.with_suffix(".tmp")
+
+        with temporary_path.open("w", encoding="utf-8") as checkpoint_file:
+            json.dump({"segment": position.segment, "offset": position.offset}, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+
+        temporary_path.replace(checkpoint_path)
+
+    def _remove_segments_before(self, segment: int) -> None:
+        for old_segment in [old_segment for old_segment in self._segments if old_segment < segment]:
+            self._segment_path(old_segment).unlink(missing_ok=True)
+            self._segments.remove(old_segment)
+
+    def _reset(self) -> None:
+        """Remove the replayed segments so that the spool starts over with a fresh segment."""
+        next_segment = self._segments[-1] + 1 if self._segments else self._checkpoint.segment + 1
+
+        self._write_checkpoint(SpoolPosition(segment=next_segment))
+        self._checkpoint = SpoolPosition(segment=next_segment)
+
+        self._remove_segments_before(next_segment)
+        self._write_segment = None
+        self._pending_bytes = 0
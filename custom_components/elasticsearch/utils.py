@@ -62,3 +62,20 @@ def flatten_dict(d: dict, parent_key: str = "", sep: str = ".") -> dict:
             flattened_dict[new_key] = v
 
     return flattened_dict
+
+
+def flatten_dict_into(target: dict, d: dict, parent_key: str = "", sep: str = ".") -> dict:
+    """Add an n-level nested dictionary to target under period-separated keys, skipping empty values as it goes.
+
+    Equivalent to updating target with prepare_dict(d), but in a single pass and without intermediate dicts.
+    """
+
+    for k, v in d.items():
+        new_key = f"{parent_key}{sep}{k}" if parent_key != "" else k
+
+        if isinstance(v, dict):
+            flatten_dict_into(target=target, d=v, parent_key=new_key, sep=sep)
+        elif v is not None and not (isinstance(v, list) and len(v) == 0):
+            target[new_key] = v
+
+    return target
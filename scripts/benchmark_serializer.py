@@ -0,0 +1,107 @@
+# ruff: noqa: INP001
+"""Compare the throughput of the standard and fast JSON serializers on formatter-like documents.
+
+Run from the repository root:
+
+    python scripts/benchmark_serializer.py --documents 5000 --rounds 5
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.elasticsearch.encoder import FastSerializer, Serializer  # noqa: E402
+
+DOMAINS = ["sensor", "binary_sensor", "light", "switch", "climate", "device_tracker"]
+
+
+def build_documents(count: int, seed: int = 42) -> list[dict]:
+    """Build bulk actions shaped like the documents the formatter produces."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+
+    documents = []
+
+    for index in range(count):
+        domain = rng.choice(DOMAINS)
+        value = round(rng.uniform(-20, 40), 2)
+
+        source = {
+            "@timestamp": (start + timedelta(seconds=index)).isoformat(),
+            "event.action": rng.choice(["State change", "Attribute change", "Polling"]),
+            "event.kind": "event",
+            "event.type": "change",
+            "hass.entity.id": f"{domain}.entity_{index % 500}",
+            "hass.entity.name": f"Entity {index % 500}",
+            "hass.entity.domain": domain,
+            "hass.entity.area.id": "living_room",
+            "hass.entity.area.name": "Living Room",
+            "hass.entity.device.id": f"{rng.getrandbits(128):032x}",
+            "hass.entity.device.name": "Multisensor",
+            "hass.entity.device.labels": ["downstairs", "climate"],
+            "hass.entity.platform": "zha",
+            "hass.entity.friendly_name": f"Température {index % 500}",
+            "hass.entity.attributes.unit_of_measurement": "°C",
+            "hass.entity.attributes.state_class": "measurement",
+            "hass.entity.attributes.rgb_color": [255, rng.randint(0, 255), 0],
+            "hass.entity.value": str(value),
+            "hass.entity.valueas.float": value,
+            "hass.entity.object.id": f"entity_{index % 500}",
+            "data_stream.type": "metrics",
+            "data_stream.dataset": f"homeassistant.{domain}",
+            "data_stream.namespace": "default",
+            "agent.version": "2024.2.5",
+            "host.location": [4.895168, 52.370216],
+        }
+
+        documents.append(
+            {"_op_type": "create", "_index": f"metrics-homeassistant.{domain}-default", "_source": source}
+        )
+
+    return documents
+
+
+def measure(serializer: Serializer, documents: list[dict], rounds: int) -> tuple[float, int]:
+    """Return the best throughput in MB/s over the rounds, and the number of bytes produced per round."""
+    best = 0.0
+    size = 0
+
+    for _ in range(rounds):
+        started = time.perf_counter()
+        size = sum(len(serializer.json_dumps(document)) for document in documents)
+        elapsed = time.perf_counter() - started
+
+        best = max(best, size / elapsed / 1024 / 1024)
+
+    return best, size
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = build_documents(args.documents)
+
+    for document in documents:
+        if FastSerializer().json_dumps(document) != Serializer().json_dumps(document):
+            msg = f"Serializers disagree on {document}"
+            raise SystemExit(msg)
+
+    standard, size = measure(Serializer(), documents, args.rounds)
+    fast, _ = measure(FastSerializer(), documents, args.rounds)
+
+    print(f"{args.documents} documents, {size / 1024 / 1024:.2f} MB per round, best of {args.rounds} rounds")  # noqa: T201
+    print(f"Serializer:     {standard:8.1f} MB/s")  # noqa: T201
+    print(f"FastSerializer: {fast:8.1f} MB/s ({fast / standard:.1f}x)")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -190,6 +190,8 @@ def mock_loop_handler_fixture():
         patch("custom_components.elasticsearch.es_publish_pipeline.LoopHandler") as loop_handler,
     ):
         loop_handler.start = AsyncMock()
+        loop_handler.return_value.start = AsyncMock()
+        loop_handler.return_value.wait_for_first_run = AsyncMock()
 
         yield loop_handler
 
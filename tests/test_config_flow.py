@@ -441,3 +441,106 @@ class Test_Options_Flow:
 
         # The options should be updated, but they are stored under data
         assert "data" in result and result["data"] == {**testconst.CONFIG_ENTRY_DEFAULT_OPTIONS}
+
+    async def test_options_flow_advanced(
+        self,
+        hass: HomeAssistant,
+    ):
+        """Test the options flow exposes the event queue options in advanced mode."""
+
+        config_entry = MockConfigEntry(
+            domain=compconst.DOMAIN,
+            unique_id="config_entry_id",
+            data={
+                **testconst.CONFIG_ENTRY_DEFAULT_DATA,
+            },
+            options=testconst.CONFIG_ENTRY_BASE_OPTIONS,
+            title="config_entry_title",
+        )
+
+        await add_config_entry_to_hass(hass, config_entry)
+
+        result = await hass.config_entries.options.async_init(
+            config_entry.entry_id, context={"show_advanced_options": True}
+        )
+
+        assert "type" in result and result["type"] is FlowResultType.FORM
+        assert "data_schema" in result and result["data_schema"] is not None
+        assert compconst.CONF_QUEUE_MAX_EVENTS in result["data_schema"].schema
+        assert compconst.CONF_QUEUE_OVERFLOW_POLICY in result["data_schema"].schema
+
+        user_input = {
+            **testconst.CONFIG_ENTRY_DEFAULT_OPTIONS,
+            compconst.CONF_QUEUE_MAX_EVENTS: 10000,
+            compconst.CONF_QUEUE_MAX_BYTES: 0,
+            compconst.CONF_QUEUE_OVERFLOW_POLICY: compconst.QueueOverflowPolicy.DROP_POLLED_FIRST.value,
+            compconst.CONF_QUEUE_COALESCE: True,
+            compconst.CONF_PUBLISH_MAX_EVENTS: 500,
+            compconst.CONF_PUBLISH_MAX_BYTES: 0,
+            compconst.CONF_PUBLISH_MAX_AGE: 10,
+            compconst.CONF_SPOOL_ENABLED: True,
+            compconst.CONF_SPOOL_MAX_BYTES: 1048576,
+            compconst.CONF_SPOOL_REPLAY_RATE: 100,
+            compconst.CONF_DEAD_LETTER_ENABLED: True,
+            compconst.CONF_DEAD_LETTER_MAX_BYTES: 1048576,
+            compconst.CONF_BULK_CONCURRENCY: 4,
+            compconst.CONF_BULK_CHUNK_SIZE: 1000,
+            compconst.CONF_BULK_MAX_CHUNK_BYTES: 10485760,
+            compconst.CONF_BULK_ADAPTIVE: True,
+            compconst.CONF_BULK_TARGET_LATENCY: 0.5,
+            compconst.CONF_BULK_MAX_RETRIES: 5,
+            compconst.CONF_HTTP_COMPRESS: True,
+            compconst.CONF_PASSIVE_HEALTH_CHECK: True,
+            compconst.CONF_HEALTH_CHECK_INTERVAL: 120,
+            compconst.CONF_CIRCUIT_BREAKER: True,
+            compconst.CONF_CIRCUIT_BREAKER_MAX_BACKOFF: 600,
+            compconst.CONF_FAST_SERIALIZER: True,
+            compconst.CONF_BULK_NDJSON_WRITER: True,
+            compconst.CONF_FORMAT_WORKERS: 2,
+            compconst.CONF_DRAIN_BATCH_SIZE: 500,
+            compconst.CONF_DRAIN_BUDGET: 10,
+            compconst.CONF_SHUTDOWN_FLUSH_TIMEOUT: 30,
+            compconst.CONF_POLLING_SLOTS: 6,
+            compconst.CONF_POLLING_SCHEDULE: ["domain:sun=3600", "device_class:temperature=60"],
+            compconst.CONF_POLLING_KEYFRAME_INTERVAL: 900,
+        }
+
+        result = await hass.config_entries.options.async_configure(result["flow_id"], user_input=user_input)
+
+        assert "type" in result and result["type"] is FlowResultType.CREATE_ENTRY
+        assert "data" in result and result["data"] == user_input
+
+    async def test_options_flow_invalid_polling_schedule(
+        self,
+        hass: HomeAssistant,
+    ):
+        """Test the options flow rejects polling schedule entries which cannot be parsed."""
+
+        config_entry = MockConfigEntry(
+            domain=compconst.DOMAIN,
+            unique_id="config_entry_id",
+            data={
+                **testconst.CONFIG_ENTRY_DEFAULT_DATA,
+            },
+            options=testconst.CONFIG_ENTRY_BASE_OPTIONS,
+            title="config_entry_title",
+        )
+
+        await add_config_entry_to_hass(hass, config_entry)
+
+        result = await hass.config_entries.options.async_init(
+            config_entry.entry_id, context={"show_advanced_options": True}
+        )
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            user_input={
+                **testconst.CONFIG_ENTRY_DEFAULT_OPTIONS,
+                compconst.CONF_POLLING_SCHEDULE: ["domain:sun=hourly"],
+            },
+        )
+
+        assert "type" in result and result["type"] is FlowResultType.FORM
+        assert "errors" in result and result["errors"] == {
+            compconst.CONF_POLLING_SCHEDULE: "invalid_polling_schedule"
+        }
@@ -0,0 +1,137 @@
+"""Tests for the deadletter module."""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from custom_components.elasticsearch.deadletter import DEAD_LETTER_FILE, DeadLetterFile
+from custom_components.elasticsearch.es_gateway import RejectedDocument
+
+
+def _rejected(
+    entity_id: str, reason: str = "failed to parse field [hass.entity.attributes.foo]"
+) -> RejectedDocument:
+    return RejectedDocument(
+        action={
+            "_op_type": "create",
+            "_index": "metrics-homeassistant.sensor-default",
+            "_source": {"hass.entity.id": entity_id, "hass.entity.attributes.foo": {"bar": 1}},
+        },
+        operation="create",
+        status=400,
+        error_type="document_parsing_exception",
+        error_reason=reason,
+    )
+
+
+def _entries(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.fixture(name="dead_letter")
+def dead_letter_fixture(tmp_path: Path) -> DeadLetterFile:
+    """Return a dead letter file which is never rotated."""
+    return DeadLetterFile(path=tmp_path / "deadletter", max_bytes=0)
+
+
+class Test_DeadLetterFile:
+    """Test the DeadLetterFile class."""
+
+    def test_flush_nothing(self, dead_letter: DeadLetterFile):
+        """Test that flushing without rejected documents does not create the file."""
+        assert not dead_letter.pending
+        assert dead_letter.flush() == 0
+        assert not dead_letter.file.exists()
+
+    def test_pending(self, dead_letter: DeadLetterFile):
+        """Test that rejected documents are pending until they are flushed."""
+        dead_letter.add(_rejected("sensor.bad"))
+
+        assert dead_letter.pending
+
+        dead_letter.flush()
+
+        assert not dead_letter.pending
+
+    def test_entries(self, dead_letter: DeadLetterFile):
+        """Test that entries keep the original source, the error and a running count per entity."""
+        dead_letter.add(_rejected("sensor.bad"))
+        dead_letter.add(_rejected("sensor.bad"))
+        dead_letter.add(_rejected("sensor.other"))
+
+        assert dead_letter.flush() == 3
+
+        entries = _entries(dead_letter.file)
+
+        assert [entry["entity_id"] for entry in entries] == ["sensor.bad", "sensor.bad", "sensor.other"]
+        assert [entry["entity_rejections"] for entry in entries] == [1, 2, 1]
+        assert entries[0]["index"] == "metrics-homeassistant.sensor-default"
+        assert entries[0]["error"] == {
+            "type": "document_parsing_exception",
+            "reason": "failed to parse field [hass.entity.attributes.foo]",
+        }
+        assert entries[0]["source"]["hass.entity.attributes.foo"] == {"bar": 1}
+
+        diagnostics = dead_letter.diagnostics()
+        assert diagnostics["written"] == 3
+        assert diagnostics["entities"] == {"sensor.bad": 2, "sensor.other": 1}
+
+    def test_flush_appends(self, dead_letter: DeadLetterFile):
+        """Test that later flushes append to the file."""
+        dead_letter.add(_rejected("sensor.bad"))
+        dead_letter.flush()
+
+        dead_letter.add(_rejected("sensor.bad"))
+        dead_letter.flush()
+
+        assert [entry["entity_rejections"] for entry in _entries(dead_letter.file)] == [1, 2]
+
+    def test_rotation(self, tmp_path: Path):
+        """Test that the file is rotated once it reaches its maximum size, keeping the configured backups."""
+        dead_letter = DeadLetterFile(path=tmp_path / "deadletter", max_bytes=100, backup_count=2)
+
+        for _ in range(4):
+            dead_letter.add(_rejected("sensor.bad"))
+            dead_letter.flush()
+
+        assert sorted(path.name for path in (tmp_path / "deadletter").iterdir()) == [
+            DEAD_LETTER_FILE,
+            f"{DEAD_LETTER_FILE}.1",
+            f"{DEAD_LETTER_FILE}.2",
+        ]
+        assert [entry["entity_rejections"] for entry in _entries(dead_letter.file)] == [4]
+        assert dead_letter.diagnostics()["rotations"] == 3
+
+    def test_max_buffered(self, tmp_path: Path):
+        """Test that documents beyond the buffer limit are counted but not written."""
+        dead_letter = DeadLetterFile(path=tmp_path / "deadletter", max_bytes=0, max_buffered=2)
+
+        for _ in range(3):
+            dead_letter.add(_rejected("sensor.bad"))
+
+        assert dead_letter.flush() == 2
+
+        diagnostics = dead_letter.diagnostics()
+        assert diagnostics["dropped"] == 1
+        assert diagnostics["entities"] == {"sensor.bad": 3}
+
+    def test_flush_error_keeps_entries(self, dead_letter: DeadLetterFile):
+        """Test that entries are kept for the next flush when the file cannot be written."""
+        dead_letter.add(_rejected("sensor.first"))
+
+        with (
+            patch.object(Path, "open", side_effect=OSError("No space left on device")),
+            pytest.raises(OSError, match="No space left on device"),
+        ):
+            dead_letter.flush()
+
+        dead_letter.add(_rejected("sensor.second"))
+
+        assert dead_letter.diagnostics()["buffered"] == 2
+        assert dead_letter.flush() == 2
+        assert [entry["entity_id"] for entry in _entries(dead_letter.file)] == [
+            "sensor.first",
+            "sensor.second",
+        ]
+        assert dead_letter.diagnostics()["written"] == 2
@@ -1,7 +1,10 @@
 """Tests for the Elasticsearch integration diagnostics."""
 
+from unittest.mock import MagicMock
+
 import pytest
 from custom_components.elasticsearch.diagnostics import async_get_config_entry_diagnostics
+from custom_components.elasticsearch.es_integration import ElasticIntegration
 from homeassistant.const import (
     CONF_API_KEY,
     CONF_PASSWORD,
@@ -36,3 +39,16 @@ async def test_async_get_config_entry_diagnostics(hass, config_entry, data, opti
     result = await async_get_config_entry_diagnostics(hass, config_entry)
 
     assert result == snapshot
+
+
+@pytest.mark.parametrize("options", [{}])
+async def test_async_get_config_entry_diagnostics_runtime(hass, config_entry, data, options):
+    """Test that runtime statistics of a loaded integration are included."""
+
+    integration = MagicMock(spec=ElasticIntegration)
+    integration.diagnostics.return_value = {"gateway": {"bulk_chunk_sizer": {"chunk_size": 500}}}
+    config_entry.runtime_data = integration
+
+    result = await async_get_config_entry_diagnostics(hass, config_entry)
+
+    assert result["runtime"] == {"gateway": {"bulk_chunk_sizer": {"chunk_size": 500}}}
@@ -1,9 +1,73 @@
 """Tests for the encoder module."""
 
 import json
-from datetime import UTC, datetime
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import UUID
 
-from custom_components.elasticsearch.encoder import convert_set_to_list
+import pytest
+from custom_components.elasticsearch.encoder import FastSerializer, Serializer, convert_set_to_list
+
+# Documents as produced by the formatter, including values which orjson and json encode differently
+SERIALIZER_CORPUS = [
+    {
+        "_op_type": "create",
+        "_index": "metrics-homeassistant.sensor-default",
+        "_source": {
+            "@timestamp": "2024-02-29T12:00:00.123456+00:00",
+            "event.action": "State change",
+            "event.kind": "event",
+            "event.type": "change",
+            "hass.entity.id": "sensor.living_room_temperature",
+            "hass.entity.domain": "sensor",
+            "hass.entity.device.id": "4f2e9a1bc08d4e2f9e1d3c6b5a7f8e90",
+            "hass.entity.device.labels": ["climate", "downstairs"],
+            "hass.entity.attributes.unit_of_measurement": "°C",
+            "hass.entity.attributes.friendly_name": "Wohnzimmer Température 🌡",
+            "hass.entity.value": "21.5",
+            "hass.entity.valueas.float": 21.5,
+            "hass.entity.location": [4.895168, 52.370216],
+            "agent.version": "2024.2.5",
+            "tags": ["home", "prod"],
+        },
+    },
+    {
+        "hass.entity.attributes.brightness": 255,
+        "hass.entity.attributes.rgb_color": (255, 180, 0),
+        "hass.entity.attributes.effect_list": ["colorloop", "random", "None"],
+        "hass.entity.attributes.supported_features": 44,
+        "hass.entity.attributes.is_on": True,
+        "hass.entity.attributes.off": False,
+        "hass.entity.attributes.empty": "",
+        "hass.entity.attributes.quote": 'She said "hi"\n\tand\\left',
+        "hass.entity.attributes.control": "\x00\x1f\x7f\u2028",
+    },
+    {
+        "hass.entity.valueas.datetime": datetime(2024, 2, 29, 12, 0, tzinfo=UTC),
+        "hass.entity.valueas.date": date(2024, 2, 29),
+        "hass.entity.attributes.device_uuid": UUID("12345678-1234-5678-1234-567812345678"),
+        "hass.entity.attributes.ratio": 0.1 + 0.2,
+        "hass.entity.attributes.negative": -0.0,
+    },
+    {
+        "hass.entity.attributes.energy": 1.2345678901234568e16,
+        "hass.entity.attributes.tiny": 1e-05,
+        "hass.entity.attributes.small": [0.0001, -0.00001, 5e-324],
+        "hass.entity.attributes.hex": "1e5",
+        "hass.entity.attributes.decimals": [Decimal("12.5"), Decimal("0.00001")],
+    },
+    {
+        "hass.entity.attributes.nan": float("nan"),
+        "hass.entity.attributes.inf": [float("inf"), float("-inf")],
+        "hass.entity.attributes.values": [None, 1, "null"],
+    },
+    {
+        "hass.entity.attributes.big": 2**70,
+        "hass.entity.attributes.surrogate": "\ud800",
+        "hass.entity.attributes.keys": {1: "one", None: "none"},
+    },
+]
 
 
 def test_convert_set_to_list_dict_with_datetime_values() -> None:
@@ -39,3 +103,17 @@ def test_convert_set_to_list_list_of_dicts_with_datetime_values() -> None:
 def test_convert_set_to_list_set_sorted() -> None:
     """Sets are converted to sorted lists."""
     assert convert_set_to_list({3, 1, 2}) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("data", SERIALIZER_CORPUS)
+def test_fast_serializer_matches_serializer(data: dict) -> None:
+    """The fast serializer produces the same bytes as the standard serializer."""
+    assert FastSerializer().json_dumps(data) == Serializer().json_dumps(data)
+
+
+def test_fast_serializer_uses_orjson() -> None:
+    """Documents without values that orjson encodes differently are not serialized twice."""
+    with patch.object(Serializer, "json_dumps") as json_dumps:
+        FastSerializer().json_dumps(SERIALIZER_CORPUS[0])
+
+    json_dumps.assert_not_called()
@@ -1,6 +1,9 @@
 """Tests for the Elasticsearch Gateway."""
 # noqa: F401 # pylint: disable=redefined-outer-name
 
+import asyncio
+import gzip
+import json
 import os
 import ssl
 from typing import Any
@@ -13,6 +16,7 @@ import pytest
 from aiohttp import client_exceptions
 from custom_components.elasticsearch.const import ES_CHECK_PERMISSIONS_DATASTREAM
 from custom_components.elasticsearch.datastreams.index_template import index_template_definition
+from custom_components.elasticsearch.encoder import FastSerializer, Serializer
 from custom_components.elasticsearch.errors import (
     AuthenticationRequired,
     CannotConnect,
@@ -22,9 +26,19 @@ from custom_components.elasticsearch.errors import (
     UntrustedCertificate,
 )
 from custom_components.elasticsearch.es_gateway import (
+    BulkChunkSizer,
+    CircuitBreaker,
+    CircuitState,
     ElasticsearchGateway,
+    RejectedDocument,
+)
+from custom_components.elasticsearch.es_gateway_8 import (
+    BulkBody,
+    BulkBodyWriter,
+    CompressingHttpNode,
+    Elasticsearch8Gateway,
+    Gateway8Settings,
 )
-from custom_components.elasticsearch.es_gateway_8 import Elasticsearch8Gateway, Gateway8Settings
 from elastic_transport import ApiResponseMeta, BaseNode, ObjectApiResponse
 from elasticsearch8._async.client import AsyncElasticsearch
 
@@ -208,6 +222,62 @@ class Test_Initialization:
 
         assert gateway._client._headers.get("Authorization", None) is None
 
+    async def test_init_http_compress(self) -> None:
+        """Test that a gateway with compression gzips request bodies and records the bytes saved."""
+        gateway = Elasticsearch8Gateway(
+            gateway_settings=Gateway8Settings(url=testconst.CONFIG_ENTRY_DATA_URL, http_compress=True)
+        )
+
+        node = gateway._client.transport.node_pool.get()
+        assert isinstance(node, CompressingHttpNode)
+        assert node.headers["accept-encoding"] == "gzip"
+
+        body = b'{"create":{"_index":"metrics-homeassistant.sensor-default"}}\n' * 100
+
+        with patch.object(
+            elastic_transport.AiohttpHttpNode, "perform_request", new_callable=AsyncMock
+        ) as mock_perform_request:
+            await node.perform_request("PUT", "/_bulk", body=body)
+
+        sent_body = mock_perform_request.call_args.kwargs["body"]
+        assert gzip.decompress(sent_body) == body
+        assert mock_perform_request.call_args.kwargs["headers"]["content-encoding"] == "gzip"
+
+        compression = gateway.diagnostics()["compression"]
+        assert compression["requests"] == 1
+        assert compression["raw_bytes"] == len(body)
+        assert compression["compressed_bytes"] == len(sent_body)
+        assert compression["saved_bytes"] == len(body) - len(sent_body)
+
+        await gateway.stop()
+
+    async def test_init_no_http_compress(self) -> None:
+        """Test that a gateway without compression uses the default node class."""
+        gateway = Elasticsearch8Gateway(
+            gateway_settings=Gateway8Settings(url=testconst.CONFIG_ENTRY_DATA_URL)
+        )
+
+        assert not isinstance(gateway._client.transport.node_pool.get(), CompressingHttpNode)
+        assert "compression" not in gateway.diagnostics()
+
+        await gateway.stop()
+
+    @pytest.mark.parametrize(
+        ("fast_serializer", "expected_serializer"), [(True, FastSerializer), (False, Serializer)]
+    )
+    async def test_init_fast_serializer(self, fast_serializer: bool, expected_serializer: type) -> None:
+        """Test that the client serializes requests with the configured serializer."""
+        gateway = Elasticsearch8Gateway(
+            gateway_settings=Gateway8Settings(
+                url=testconst.CONFIG_ENTRY_DATA_URL, fast_serializer=fast_serializer
+            )
+        )
+
+        serializer = gateway._client.transport.serializers.get_serializer("application/json")
+        assert type(serializer) is expected_serializer
+
+        await gateway.stop()
+
     @pytest.mark.parametrize(
         ("verify_certs", "verify_hostname", "expected_verify_mode", "expected_verify_hostname"),
         [
@@ -445,7 +515,8 @@ class Test_Public_Functions:
             yield AsyncMock()
             yield AsyncMock()
 
-        async def yield_response():
+        async def yield_response(actions, **kwargs):
+            await anext(actions)
             yield (
                 True,  # OK
                 {
@@ -466,7 +537,7 @@ class Test_Public_Functions:
         with patch(
             "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk"
         ) as mock_streaming_bulk:
-            mock_streaming_bulk.side_effect = [yield_response()]
+            mock_streaming_bulk.side_effect = yield_response
 
             await gateway_mock_stateful.bulk(actions=yield_doc())
 
@@ -488,6 +559,531 @@ class Test_Public_Functions:
                 "Publish skipped, no new events to publish."
             )
 
+    async def test_bulk_concurrently(self, gateway_mock_stateful):
+        """Test that chunks are sent concurrently and their outcomes are aggregated."""
+        gateway_mock_stateful._settings.bulk_chunk_size = 2
+        gateway_mock_stateful._settings.bulk_concurrency = 2
+
+        async def yield_doc():
+            for i in range(5):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def streaming_bulk(actions, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            async for action in actions:
+                ok = action["_source"]["id"] != 3
+                yield ok, {"create": {"status": 201 if ok else 400}}
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk", side_effect=streaming_bulk
+        ) as mock_streaming_bulk:
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert mock_streaming_bulk.call_count == 3
+        assert max_in_flight == 2
+        gateway_mock_stateful._logger.error.assert_called_with("Failed to publish %d of %d documents", 1, 5)
+
+    async def test_bulk_concurrently_error(self, gateway_mock_stateful):
+        """Test that a failed chunk stops reading actions and is converted to an integration error."""
+        gateway_mock_stateful._settings.bulk_chunk_size = 1
+        gateway_mock_stateful._settings.bulk_concurrency = 2
+
+        consumed = 0
+
+        async def yield_doc():
+            nonlocal consumed
+            for i in range(10):
+                consumed += 1
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        async def streaming_bulk(actions, **kwargs):
+            raise elasticsearch8.ConnectionError(message="Connection refused")
+            yield  # pragma: no cover
+
+        with (
+            patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=streaming_bulk,
+            ),
+            pytest.raises(CannotConnect),
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert consumed < 10
+
+    async def test_bulk_concurrently_error_in_flight(self, gateway_mock_stateful):
+        """Test that a failed chunk lets the chunks in flight complete and requeues the chunk not yet sent."""
+        gateway_mock_stateful._settings.bulk_chunk_size = 1
+        gateway_mock_stateful._settings.bulk_concurrency = 2
+
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        requeued = []
+        gateway_mock_stateful.add_requeue_listener(requeued.append)
+
+        async def yield_doc():
+            for i in range(4):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        completed: list[int] = []
+
+        async def streaming_bulk(actions, **kwargs):
+            async for action in actions:
+                if action["_source"]["id"] == 1:
+                    raise elasticsearch8.ConnectionError(message="Connection refused")
+
+                await asyncio.sleep(0.01)
+                completed.append(action["_source"]["id"])
+                yield True, {"create": {"status": 201}}
+
+        with (
+            patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=streaming_bulk,
+            ),
+            pytest.raises(CannotConnect),
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        # The chunk in flight completed, the chunk read after the failure was requeued, and the last was not read
+        assert completed == [0]
+        assert retried == []
+        assert [action["_source"]["id"] for action in requeued] == [2]
+
+    async def test_bulk_concurrently_unsent_without_requeue_listener(self, gateway_mock_stateful):
+        """Test that the chunk not yet sent is handed back to be retried when nothing requeues it."""
+        gateway_mock_stateful._settings.bulk_chunk_size = 1
+        gateway_mock_stateful._settings.bulk_concurrency = 2
+
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        async def yield_doc():
+            for i in range(3):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        async def streaming_bulk(actions, **kwargs):
+            raise elasticsearch8.ConnectionError(message="Connection refused")
+            yield  # pragma: no cover
+
+        with (
+            patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=streaming_bulk,
+            ),
+            pytest.raises(CannotConnect),
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert [action["_source"]["id"] for action in retried] == [2]
+
+    async def test_bulk_adaptive(self, gateway_settings):
+        """Test that the adaptive chunk size follows the observed bulk outcomes."""
+        gateway_settings.bulk_adaptive = True
+        gateway_settings.bulk_chunk_size = 100
+        gateway_settings.to_client = MagicMock(return_value=MagicMock(AsyncElasticsearch))
+
+        gateway = Elasticsearch8Gateway(gateway_settings=gateway_settings)
+
+        async def yield_doc():
+            for i in range(100):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        async def streaming_bulk(actions, **kwargs):
+            async for _ in actions:
+                yield True, {"create": {"status": 201}}
+
+        async def throttled_bulk(actions, **kwargs):
+            async for _ in actions:
+                yield False, {"create": {"status": 429}}
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk", side_effect=streaming_bulk
+        ) as mock_streaming_bulk:
+            await gateway.bulk(actions=yield_doc())
+
+        assert (
+            mock_streaming_bulk.call_args.kwargs["max_chunk_bytes"] == gateway_settings.bulk_max_chunk_bytes
+        )
+        assert gateway.diagnostics()["bulk_chunk_sizer"]["chunk_size"] == 126
+
+        with (
+            patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=throttled_bulk,
+            ),
+            patch("custom_components.elasticsearch.es_gateway_8.asyncio.sleep"),
+        ):
+            await gateway.bulk(actions=yield_doc())
+
+        assert gateway.diagnostics()["bulk_chunk_sizer"]["chunk_size"] == 63
+
+    async def test_bulk_item_classification(self, gateway_mock_stateful):
+        """Test that only retryable documents are handed back, and that duplicates count as successes."""
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        async def yield_doc():
+            for i in range(6):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        outcomes = {
+            0: [(True, {"status": 201})],
+            1: [(False, {"status": 409, "error": {"type": "version_conflict_engine_exception"}})],
+            2: [(False, {"status": 400, "error": {"type": "document_parsing_exception"}})],
+            3: [(False, {"status": 429})],
+            4: [(False, {"status": 500, "error": {"type": "timeout_exception"}})],
+            5: [(False, {"status": 503})],
+        }
+
+        sent: list[list[int]] = []
+
+        async def streaming_bulk(actions, **kwargs):
+            assert kwargs["max_retries"] == 0
+
+            ids = []
+            async for action in actions:
+                document = action["_source"]["id"]
+                ids.append(document)
+                ok, outcome = outcomes[document].pop(0)
+                yield ok, {"create": outcome}
+            sent.append(ids)
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+            side_effect=streaming_bulk,
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        # Retryable documents are sent once and handed back, rather than retried within the bulk operation
+        assert sent == [[0, 1, 2, 3, 4, 5]]
+        assert [action["_source"]["id"] for action in retried] == [3, 4, 5]
+
+        gateway_mock_stateful._logger.error.assert_called_with("Failed to publish %d of %d documents", 1, 3)
+
+    async def test_bulk_retryable_without_retry_listener(self, gateway_mock_stateful):
+        """Test that retryable documents are counted as failed when nothing retries them."""
+
+        async def yield_doc():
+            for i in range(2):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        async def streaming_bulk(actions, **kwargs):
+            async for action in actions:
+                if action["_source"]["id"] == 0:
+                    yield True, {"create": {"status": 201}}
+                else:
+                    yield False, {"create": {"status": 429}}
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+            side_effect=streaming_bulk,
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        gateway_mock_stateful._logger.error.assert_any_call(
+            "Failed to publish %d documents which can be retried", 1
+        )
+        gateway_mock_stateful._logger.error.assert_called_with("Failed to publish %d of %d documents", 1, 2)
+
+    async def test_bulk_ndjson_writer(self, gateway_mock_stateful):
+        """Test that the NDJSON writer sends chunks directly, and records and hands back items like the bulk helper."""
+        gateway_mock_stateful._settings.bulk_ndjson_writer = True
+        gateway_mock_stateful._settings.bulk_chunk_size = 4
+
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        rejected = []
+        gateway_mock_stateful.add_rejection_listener(rejected.append)
+
+        async def yield_doc():
+            for i in range(6):
+                yield {"_op_type": "create", "_index": "metrics-test", "_source": {"id": i}}
+
+        outcomes = {
+            0: [{"status": 201}],
+            1: [{"status": 409, "error": {"type": "version_conflict_engine_exception"}}],
+            2: [{"status": 400, "error": {"type": "document_parsing_exception"}}],
+            3: [{"status": 429}],
+            4: [{"status": 500, "error": {"type": "timeout_exception"}}],
+            5: [{"status": 201}],
+        }
+
+        sent: list[list[int]] = []
+
+        async def perform_request(method: str, path: str, body: bytes, headers: dict[str, str], **kwargs):
+            assert (method, path) == ("PUT", "/_bulk")
+            assert headers["content-type"] == "application/x-ndjson"
+
+            lines = body.decode().splitlines()
+
+            assert set(lines[0::2]) == {'{"create":{"_index":"metrics-test"}}'}
+
+            ids = [json.loads(line)["id"] for line in lines[1::2]]
+            sent.append(ids)
+
+            return ObjectApiResponse(
+                meta={}, body={"items": [{"create": outcomes[document].pop(0)} for document in ids]}
+            )
+
+        gateway_mock_stateful._client.perform_request = AsyncMock(side_effect=perform_request)
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert sent == [[0, 1, 2, 3], [4, 5]]
+        assert [action["_source"]["id"] for action in retried] == [3, 4]
+
+        assert [document.action["_source"]["id"] for document in rejected] == [2]
+
+        gateway_mock_stateful._logger.error.assert_called_with("Failed to publish %d of %d documents", 1, 4)
+
+    async def test_bulk_ndjson_writer_request_rejected(self, gateway_mock_stateful):
+        """Test that the documents of a chunk rejected as a whole by the NDJSON writer are handed back."""
+        gateway_mock_stateful._settings.bulk_ndjson_writer = True
+
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        async def yield_doc():
+            for i in range(3):
+                yield {"_op_type": "create", "_index": "metrics-test", "_source": {"id": i}}
+
+        gateway_mock_stateful._client.perform_request = AsyncMock(
+            side_effect=[
+                elasticsearch8.ApiError(
+                    message="Service Unavailable",
+                    meta=ApiResponseMeta(
+                        status=503, http_version="1.1", headers={}, duration=0, node=MagicMock()
+                    ),
+                    body={},
+                ),
+            ]
+        )
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert gateway_mock_stateful._client.perform_request.await_count == 1
+        assert [action["_source"]["id"] for action in retried] == [0, 1, 2]
+        gateway_mock_stateful._logger.debug.assert_any_call("Handing back %d documents to be retried", 3)
+
+    async def test_bulk_ndjson_writer_request_rejected_read_ahead(self, gateway_mock_stateful):
+        """Test that the action read ahead of a chunk rejected as a whole is handed back with the chunk."""
+        gateway_mock_stateful._settings.bulk_ndjson_writer = True
+        gateway_mock_stateful._settings.bulk_chunk_size = 2
+
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        read = []
+
+        async def yield_doc():
+            for i in range(5):
+                read.append(i)
+                yield {"_op_type": "create", "_index": "metrics-test", "_source": {"id": i}}
+
+        gateway_mock_stateful._client.perform_request = AsyncMock(
+            side_effect=[
+                elasticsearch8.ApiError(
+                    message="Too Many Requests",
+                    meta=ApiResponseMeta(
+                        status=429, http_version="1.1", headers={}, duration=0, node=MagicMock()
+                    ),
+                    body={},
+                ),
+            ]
+        )
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert gateway_mock_stateful._client.perform_request.await_count == 1
+        assert read == [0, 1, 2]
+        assert [action["_source"]["id"] for action in retried] == [0, 1, 2]
+
+    async def test_bulk_ndjson_writer_reused(self, gateway_mock_stateful):
+        """Test that the encoded action lines are kept by the gateway from one bulk operation to the next."""
+        gateway_mock_stateful._settings.bulk_ndjson_writer = True
+
+        async def yield_doc():
+            yield {"_op_type": "create", "_index": "metrics-test", "_source": {"id": 0}}
+
+        gateway_mock_stateful._client.perform_request = AsyncMock(
+            side_effect=lambda *args, **kwargs: ObjectApiResponse(
+                meta={}, body={"items": [{"create": {"status": 201}}]}
+            )
+        )
+
+        writer = gateway_mock_stateful._body_writer
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+        action_line = writer._action_lines[("create", "metrics-test")]
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert gateway_mock_stateful._body_writer is writer
+        assert writer._action_lines[("create", "metrics-test")] is action_line
+
+    async def test_bulk_ndjson_writer_malformed_item(self, gateway_mock_stateful):
+        """Test that an empty response item is recorded as failed, and the response is left unchanged."""
+        gateway_mock_stateful._settings.bulk_ndjson_writer = True
+
+        async def yield_doc():
+            for i in range(2):
+                yield {"_op_type": "create", "_index": "metrics-test", "_source": {"id": i}}
+
+        items = [{"create": {"status": 201}}, {}]
+
+        gateway_mock_stateful._client.perform_request = AsyncMock(
+            return_value=ObjectApiResponse(meta={}, body={"items": items})
+        )
+
+        await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert items == [{"create": {"status": 201}}, {}]
+        gateway_mock_stateful._logger.error.assert_any_call(
+            "failed to %s, error information: %s", "unknown", {}
+        )
+        gateway_mock_stateful._logger.error.assert_called_with("Failed to publish %d of %d documents", 1, 2)
+
+    async def test_bulk_rejection_listener(self, gateway_mock_stateful):
+        """Test that permanently rejected documents are reported to the rejection listeners instead of logged."""
+        rejected = []
+        gateway_mock_stateful.add_rejection_listener(rejected.append)
+
+        async def yield_doc():
+            yield {"_index": "metrics-test", "_source": {"hass.entity.id": "sensor.bad"}}
+
+        async def streaming_bulk(actions, **kwargs):
+            async for _ in actions:
+                yield (
+                    False,
+                    {
+                        "create": {
+                            "status": 400,
+                            "error": {"type": "document_parsing_exception", "reason": "failed to parse"},
+                        }
+                    },
+                )
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk", side_effect=streaming_bulk
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        assert rejected == [
+            RejectedDocument(
+                action={"_index": "metrics-test", "_source": {"hass.entity.id": "sensor.bad"}},
+                operation="create",
+                status=400,
+                error_type="document_parsing_exception",
+                error_reason="failed to parse",
+            )
+        ]
+        gateway_mock_stateful._logger.error.assert_called_once_with(
+            "Failed to publish %d of %d documents", 1, 1
+        )
+
+    async def test_bulk_request_rejected_is_retried(self, gateway_mock_stateful):
+        """Test that the documents of a request rejected as a whole with a retryable status are handed back."""
+        retried = []
+        gateway_mock_stateful.add_retry_listener(retried.append)
+
+        async def yield_doc():
+            for i in range(3):
+                yield {"_index": "metrics-test", "_source": {"id": i}}
+
+        async def streaming_bulk(actions, **kwargs):
+            await anext(actions)
+            await anext(actions)
+            raise elasticsearch8.ApiError(message="Busy", meta=mock_api_response_meta(429), body=None)
+            yield  # pragma: no cover
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+            side_effect=streaming_bulk,
+        ):
+            await gateway_mock_stateful.bulk(actions=yield_doc())
+
+        # The documents read before the request was rejected are handed back, and the unread one is left alone
+        assert [action["_source"]["id"] for action in retried] == [0, 1]
+
+    async def test_bulk_adaptive_request_too_large(self, gateway_settings):
+        """Test that a request rejected as too large shrinks the chunk size."""
+        gateway_settings.bulk_adaptive = True
+        gateway_settings.bulk_chunk_size = 100
+        gateway_settings.to_client = MagicMock(return_value=MagicMock(AsyncElasticsearch))
+
+        gateway = Elasticsearch8Gateway(gateway_settings=gateway_settings)
+
+        async def yield_doc():
+            yield {"_index": "metrics-test", "_source": {"id": 0}}
+
+        async def streaming_bulk(actions, **kwargs):
+            raise elasticsearch8.ApiError(message="Too large", meta=mock_api_response_meta(413), body=None)
+            yield  # pragma: no cover
+
+        with (
+            patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=streaming_bulk,
+            ),
+            pytest.raises(ServerError),
+        ):
+            await gateway.bulk(actions=yield_doc())
+
+        assert gateway.diagnostics()["bulk_chunk_sizer"]["chunk_size"] == 50
+
+    async def test_bulk_compression_per_cycle(self, gateway_settings):
+        """Test that the bytes saved by compression are measured per publish cycle."""
+        gateway_settings.http_compress = True
+        gateway_settings.to_client = MagicMock(return_value=MagicMock(AsyncElasticsearch))
+
+        gateway = Elasticsearch8Gateway(gateway_settings=gateway_settings)
+
+        stats = gateway_settings.to_client.call_args.kwargs["compression_stats"]
+
+        async def yield_doc():
+            yield {"_index": "metrics-test", "_source": {"id": 0}}
+
+        def bulk_sending(raw_bytes, compressed_bytes):
+            async def streaming_bulk(actions, **kwargs):
+                async for _ in actions:
+                    stats.record(raw_bytes=raw_bytes, compressed_bytes=compressed_bytes)
+                    yield True, {"create": {"status": 201}}
+
+            return streaming_bulk
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+            side_effect=bulk_sending(1000, 100),
+        ):
+            await gateway.bulk(actions=yield_doc())
+
+        with patch(
+            "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+            side_effect=bulk_sending(500, 100),
+        ):
+            await gateway.bulk(actions=yield_doc())
+
+        compression = gateway.diagnostics()["compression"]
+        assert compression["saved_bytes"] == 1300
+        assert compression["last_cycle_raw_bytes"] == 500
+        assert compression["last_cycle_saved_bytes"] == 400
+        assert compression["ratio"] == 7.5
+
+    async def test_diagnostics_not_adaptive(self, gateway_mock_stateful):
+        """Test that the gateway has no diagnostics when the chunk size is not adaptive."""
+        assert gateway_mock_stateful.diagnostics() == {}
+
     class Test_Check_Connection:
         """Tests for the check_connection method."""
 
@@ -566,6 +1162,357 @@ class Test_Public_Functions:
                 "Connection to Elasticsearch has been reestablished."
             )
 
+        async def test_check_connection_passive_skips_ping(self, gateway) -> None:
+            """Test that passive health tracking skips the ping after a recent successful request."""
+            gateway._passive_health_check = True
+            gateway._previous_ping = True
+            gateway.ping = AsyncMock(return_value=True)
+
+            gateway.record_success()
+
+            assert await gateway.check_connection() is True
+            gateway.ping.assert_not_called()
+
+        async def test_check_connection_passive_pings_after_failure(self, gateway) -> None:
+            """Test that passive health tracking pings after a failed request."""
+            gateway._passive_health_check = True
+            gateway._previous_ping = True
+            gateway.ping = AsyncMock(return_value=False)
+
+            gateway.record_success()
+            gateway.record_failure()
+
+            assert await gateway.check_connection() is False
+            gateway.ping.assert_awaited_once()
+            gateway._logger.error.assert_called_once_with("Connection to Elasticsearch has been lost.")
+
+        async def test_check_connection_passive_pings_when_idle(self, gateway) -> None:
+            """Test that passive health tracking pings once there has been no traffic for the interval."""
+            gateway._passive_health_check = True
+            gateway._health_check_interval = 60
+            gateway._previous_ping = True
+            gateway.ping = AsyncMock(return_value=True)
+
+            with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=1000.0):
+                gateway.record_success()
+
+            with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=1061.0):
+                assert await gateway.check_connection() is True
+
+            gateway.ping.assert_awaited_once()
+
+        async def test_check_connection_not_passive(self, gateway) -> None:
+            """Test that the connection is always pinged when not tracking its health passively."""
+            gateway._previous_ping = True
+            gateway.ping = AsyncMock(return_value=True)
+
+            gateway.record_success()
+
+            assert await gateway.check_connection() is True
+            gateway.ping.assert_awaited_once()
+
+        async def test_check_connection_circuit_breaker(self, gateway) -> None:
+            """Test that an open circuit breaker skips the ping and that a successful probe closes it."""
+            gateway._circuit_breaker = CircuitBreaker(initial_backoff=10)
+            gateway._previous_ping = True
+
+            async def failed_ping() -> bool:
+                gateway.record_failure()
+                return False
+
+            async def successful_ping() -> bool:
+                gateway.record_success()
+                return True
+
+            gateway.ping = AsyncMock(side_effect=failed_ping)
+
+            assert await gateway.check_connection() is False
+            assert await gateway.check_connection() is False
+            gateway.ping.assert_awaited_once()
+
+            assert gateway.diagnostics()["circuit_breaker"]["state"] == "open"
+
+            gateway._circuit_breaker._retry_at = 0.0
+            gateway.ping = AsyncMock(side_effect=successful_ping)
+
+            assert await gateway.check_connection() is True
+            gateway.ping.assert_awaited_once()
+
+            assert gateway.diagnostics()["circuit_breaker"]["state"] == "closed"
+            assert gateway.diagnostics()["circuit_breaker"]["transitions"]["half_open_to_closed"] == 1
+
+        async def test_bulk_updates_connection_state(self, gateway) -> None:
+            """Test that bulk outcomes are recorded for passive health tracking."""
+            gateway._passive_health_check = True
+            gateway._previous_ping = True
+            gateway.ping = AsyncMock(return_value=True)
+
+            async def yield_doc():
+                yield {"_index": "metrics-test", "_source": {"id": 0}}
+
+            async def streaming_bulk(actions, **kwargs):
+                async for _ in actions:
+                    yield True, {"create": {"status": 201}}
+
+            async def failing_bulk(actions, **kwargs):
+                raise elasticsearch8.ConnectionError(message="Connection refused")
+                yield  # pragma: no cover
+
+            with patch(
+                "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                side_effect=streaming_bulk,
+            ):
+                await gateway.bulk(actions=yield_doc())
+
+            assert await gateway.check_connection() is True
+            gateway.ping.assert_not_called()
+
+            with (
+                patch(
+                    "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                    side_effect=failing_bulk,
+                ),
+                pytest.raises(CannotConnect),
+            ):
+                await gateway.bulk(actions=yield_doc())
+
+            assert await gateway.check_connection() is True
+            gateway.ping.assert_awaited_once()
+
+        @pytest.mark.parametrize(
+            ("error", "expected_error", "failure_recorded"),
+            [
+                (elasticsearch8.ConnectionError(message="Connection refused"), CannotConnect, True),
+                (TimeoutError(), TimeoutError, True),
+                (
+                    elasticsearch8.ApiError(message="Error", meta=mock_api_response_meta(500), body=None),
+                    ServerError,
+                    True,
+                ),
+                (
+                    elasticsearch8.ApiError(
+                        message="Bad request", meta=mock_api_response_meta(400), body=None
+                    ),
+                    ServerError,
+                    False,
+                ),
+                (TypeError("Not serializable"), TypeError, False),
+            ],
+            ids=["connection", "timeout", "server_error", "bad_request", "bug"],
+        )
+        async def test_bulk_records_connection_failures_only(
+            self, gateway, error, expected_error, failure_recorded
+        ) -> None:
+            """Test that only the bulk errors which come from the connection or the cluster are recorded."""
+            gateway.record_failure = MagicMock()
+
+            async def yield_doc():
+                yield {"_index": "metrics-test", "_source": {"id": 0}}
+
+            async def failing_bulk(actions, **kwargs):
+                raise error
+                yield  # pragma: no cover
+
+            with (
+                patch(
+                    "custom_components.elasticsearch.es_gateway_8.async_streaming_bulk",
+                    side_effect=failing_bulk,
+                ),
+                pytest.raises(expected_error),
+            ):
+                await gateway.bulk(actions=yield_doc())
+
+            assert gateway.record_failure.called is failure_recorded
+
+
+class Test_Circuit_Breaker:
+    """Test the CircuitBreaker class."""
+
+    def test_opens_on_failure(self):
+        """Test that a failure opens the breaker and blocks requests until the backoff expires."""
+        breaker = CircuitBreaker(initial_backoff=10, max_backoff=300)
+
+        assert breaker.allow_request()
+
+        with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+
+        assert breaker.state is CircuitState.OPEN
+
+        with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=104.0):
+            assert not breaker.allow_request()
+
+        with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=110.0):
+            assert breaker.allow_request()
+
+        assert breaker.state is CircuitState.HALF_OPEN
+
+    def test_half_open_allows_single_probe(self):
+        """Test that only one probe is allowed while half-open, and that a successful probe closes the breaker."""
+        breaker = CircuitBreaker(initial_backoff=0, max_backoff=0)
+        breaker.record_failure()
+
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.diagnostics()["transitions"] == {
+            "closed_to_open": 1,
+            "open_to_half_open": 1,
+            "half_open_to_closed": 1,
+        }
+
+    def test_backoff_doubles_with_jitter(self):
+        """Test that failed probes double the backoff, up to the maximum, with jitter."""
+        breaker = CircuitBreaker(initial_backoff=10, max_backoff=50)
+
+        backoffs = []
+        retry_in = []
+
+        with patch("custom_components.elasticsearch.es_gateway.time.monotonic", return_value=0.0):
+            for _ in range(4):
+                breaker.record_failure()
+                backoffs.append(breaker.backoff)
+                retry_in.append(breaker.diagnostics()["retry_in"])
+
+                # Let the probe through and fail it
+                breaker._retry_at = 0.0
+                assert breaker.allow_request()
+
+        assert backoffs == [10, 20, 40, 50]
+        assert all(
+            backoff * (1 - CircuitBreaker.JITTER) <= wait <= backoff
+            for backoff, wait in zip(backoffs, retry_in, strict=True)
+        )
+
+
+class Test_Bulk_Chunk_Sizer:
+    """Test the BulkChunkSizer class."""
+
+    def test_grows_under_target(self):
+        """Test that the chunk size grows after full chunks under the target latency."""
+        sizer = BulkChunkSizer(initial_size=100, maximum_size=150, target_latency=1.0)
+
+        sizer.record(documents=100, latency=0.5)
+        assert sizer.chunk_size == 126
+
+        sizer.record(documents=126, latency=0.5)
+        assert sizer.chunk_size == 150
+
+        sizer.record(documents=150, latency=0.5)
+        assert sizer.chunk_size == 150
+        assert sizer.diagnostics()["grown"] == 2
+
+    def test_partial_chunk_does_not_grow(self):
+        """Test that a partial chunk does not change the chunk size."""
+        sizer = BulkChunkSizer(initial_size=100)
+
+        sizer.record(documents=10, latency=0.1)
+
+        assert sizer.chunk_size == 100
+
+    @pytest.mark.parametrize(
+        ("latency", "throttled"),
+        [(2.0, False), (0.1, True)],
+        ids=["slow response", "throttled"],
+    )
+    def test_shrinks(self, latency, throttled):
+        """Test that the chunk size shrinks after slow or throttled chunks, down to the minimum."""
+        sizer = BulkChunkSizer(initial_size=100, minimum_size=30, target_latency=1.0)
+
+        sizer.record(documents=100, latency=latency, throttled=throttled)
+        assert sizer.chunk_size == 50
+
+        sizer.record(documents=50, latency=latency, throttled=throttled)
+        assert sizer.chunk_size == 30
+
+        sizer.record(documents=30, latency=latency, throttled=throttled)
+        assert sizer.chunk_size == 30
+        assert sizer.diagnostics()["shrunk"] == 2
+        assert sizer.diagnostics()["last_latency"] == latency
+
+
+class Test_Bulk_Body_Writer:
+    """Test the BulkBodyWriter class."""
+
+    def test_encode(self):
+        """Test that actions are encoded as newline-delimited JSON, reusing the encoded action line."""
+        writer = BulkBodyWriter(serializer=Serializer())
+
+        actions = [
+            {"_op_type": "create", "_index": "metrics-homeassistant.sensor-default", "_source": {"id": i}}
+            for i in range(2)
+        ]
+
+        encoded = [writer.encode(action) for action in actions]
+
+        assert encoded[0][0] is encoded[1][0]
+        assert encoded == [
+            (b'{"create":{"_index":"metrics-homeassistant.sensor-default"}}\n', b'{"id":0}\n'),
+            (b'{"create":{"_index":"metrics-homeassistant.sensor-default"}}\n', b'{"id":1}\n'),
+        ]
+
+    def test_encode_other_metadata(self):
+        """Test that actions with other metadata are encoded like the bulk helper would."""
+        writer = BulkBodyWriter(serializer=Serializer())
+
+        assert writer.encode({"_index": "metrics-test", "_id": "1", "_source": {"id": 1}}) == (
+            b'{"index":{"_id":"1","_index":"metrics-test"}}\n',
+            b'{"id":1}\n',
+        )
+
+
+class Test_Bulk_Body:
+    """Test the BulkBody class."""
+
+    def test_take(self):
+        """Test that the encoded actions of a chunk are joined into its body, and a new chunk is started."""
+        writer = BulkBodyWriter(serializer=Serializer())
+        chunk = BulkBody(max_chunk_size=10, max_chunk_bytes=1024)
+
+        actions = [
+            {"_op_type": "create", "_index": "metrics-homeassistant.sensor-default", "_source": {"id": i}}
+            for i in range(2)
+        ]
+
+        for action in actions:
+            chunk.add(action, *writer.encode(action))
+
+        assert len(chunk) == 2
+
+        body, written = chunk.take()
+
+        assert body == (
+            b'{"create":{"_index":"metrics-homeassistant.sensor-default"}}\n{"id":0}\n'
+            b'{"create":{"_index":"metrics-homeassistant.sensor-default"}}\n{"id":1}\n'
+        )
+        assert written == actions
+
+        assert len(chunk) == 0
+        assert chunk.take() == (b"", [])
+
+    def test_is_full(self):
+        """Test that a chunk is full at the maximum number of actions or when the next action would not fit."""
+        action = {"_op_type": "create", "_index": "metrics-test", "_source": {"id": 1}}
+        lines = BulkBodyWriter(serializer=Serializer()).encode(action)
+
+        chunk = BulkBody(max_chunk_size=2, max_chunk_bytes=1024)
+
+        assert not chunk.is_full(*lines)
+        chunk.add(action, *lines)
+        assert not chunk.is_full(*lines)
+        chunk.add(action, *lines)
+        assert chunk.is_full(*lines)
+
+        chunk = BulkBody(max_chunk_size=10, max_chunk_bytes=50)
+
+        # An action which does not fit on its own is still sent, in a chunk of its own
+        assert not chunk.is_full(*lines)
+        chunk.add(action, *lines)
+        assert chunk.is_full(*lines)
+
 
 class Test_Exception_Conversion:
     """Test the conversion of Elasticsearch exceptions to custom exceptions."""
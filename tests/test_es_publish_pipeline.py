@@ -1,23 +1,36 @@
 """Tests for the es_publish_pipeline module."""
 
-from datetime import UTC, datetime
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from custom_components.elasticsearch import utils
+from custom_components.elasticsearch.const import DEFAULT_BULK_MAX_RETRIES, QueueOverflowPolicy
+from custom_components.elasticsearch.deadletter import DeadLetterFile
+from custom_components.elasticsearch.encoder import EncodedDocument, Serializer
 from custom_components.elasticsearch.errors import AuthenticationRequired, CannotConnect
-from custom_components.elasticsearch.es_gateway import ElasticsearchGateway
+from custom_components.elasticsearch.es_gateway import ElasticsearchGateway, RejectedDocument
 from custom_components.elasticsearch.es_publish_pipeline import (
+    FORMAT_BATCH_SIZE,
+    CoalescingEventQueue,
     EventQueue,
     Pipeline,
     PipelineSettings,
     StateChangeType,
 )
+from custom_components.elasticsearch.loop import LoopMode
+from custom_components.elasticsearch.spool import Spool
 from elastic_transport import ApiResponseMeta
 from freezegun.api import FrozenDateTimeFactory
 from homeassistant.config_entries import ConfigEntryState
 from homeassistant.core import Event, HomeAssistant, State
 from homeassistant.helpers.entity_registry import RegistryEntry
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
 from syrupy.assertion import SnapshotAssertion
 
 import tests.const as testconst
@@ -71,7 +84,9 @@ def queue_fixture():
 @pytest.fixture(name="mock_gateway")
 def mock_gateway_fixture():
     """Return a mock ElasticsearchGateway instance."""
-    return MagicMock(spec=ElasticsearchGateway)
+    gateway = MagicMock(spec=ElasticsearchGateway)
+    gateway.settings.bulk_max_retries = DEFAULT_BULK_MAX_RETRIES
+    return gateway
 
 
 @pytest.fixture(name="mock_listener")
@@ -113,7 +128,9 @@ async def poller_fixture(
 @pytest.fixture(name="mock_filterer")
 def mock_filterer_fixture():
     """Return a mock Filterer instance."""
-    return AsyncMock(spec=Pipeline.Filterer)
+    filterer = AsyncMock(spec=Pipeline.Filterer)
+    filterer.targeted = False
+    return filterer
 
 
 @pytest.fixture(name="filterer")
@@ -140,16 +157,100 @@ def mock_publisher_fixture():
     return AsyncMock(spec=Pipeline.Publisher)
 
 
+@pytest.fixture(name="mock_document")
+def mock_document_fixture():
+    """Return a mock entity document without ES action metadata."""
+    return {
+        "data_stream.type": "metrics",
+        "data_stream.dataset": "homeassistant.light",
+        "data_stream.namespace": "default",
+        "event": {
+            "action": "State change",
+        },
+        "hass.entity": {
+            "attributes": {"brightness": 255},
+            "domain": "light",
+            "id": "light.living_room",
+            "value": "on",
+            "valueas": {"boolean": True},
+            "object.id": "living_room",
+        },
+    }
+
+
+@pytest.fixture(name="publisher_settings")
+def publisher_settings_fixture() -> dict:
+    """Return the pipeline settings applied by the publisher, parametrized by the tests which need others."""
+    return {}
+
+
 @pytest.fixture(name="publisher")
-def publisher_fixture(hass, mock_gateway, mock_manager, pipeline_settings, mock_logger):
-    """Return a Publisher instance."""
-    return Pipeline.Publisher(
+async def publisher_fixture(
+    hass,
+    mock_gateway,
+    mock_manager,
+    pipeline_settings,
+    publisher_settings,
+    mock_logger,
+    mock_document,
+    tmp_path,
+):
+    """Return a Publisher instance with a real queue and spool, a connected gateway and a mock publishing loop.
+
+    Each queued state change is drained as the mock document of its entity, and the early flush triggers are
+    checked as each event is queued.
+    """
+    for key, value in publisher_settings.items():
+        setattr(pipeline_settings, key, value)
+
+    mock_gateway.check_connection.return_value = True
+    mock_manager.queue = EventQueue()
+
+    async def sip_queue(deadline=None):
+        while not mock_manager.queue.empty():
+            if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+                return
+
+            _, state, _ = mock_manager.queue.get_nowait()
+            yield {**mock_document, "hass.entity.id": state.entity_id}
+
+    async def format_events(items):
+        for _, state, _ in items:
+            yield {**mock_document, "hass.entity.id": state.entity_id}
+
+    mock_manager.sip_queue = sip_queue
+    mock_manager.format_events = format_events
+
+    publisher = Pipeline.Publisher(
         hass=hass,
         gateway=mock_gateway,
         manager=mock_manager,
         settings=pipeline_settings,
         log=mock_logger,
     )
+    publisher._publish_loop = MagicMock()
+    publisher._queue.add_put_listener(publisher._on_event_queued)
+
+    publisher._spool = Spool(path=tmp_path / "spool", max_bytes=0, log=mock_logger)
+    publisher._spool.open()
+
+    try:
+        yield publisher
+    finally:
+        publisher.stop()
+
+
+@pytest.fixture(name="put")
+def put_fixture(publisher):
+    """Return a function which queues a state change for each of light.entity_0 to light.entity_<count - 1>."""
+
+    def put(count: int) -> None:
+        for i in range(count):
+            publisher._queue.put_nowait(
+                (datetime.now(tz=UTC), State(f"light.entity_{i}", "on"), StateChangeType.STATE)
+            )
+
+    return put
 
 
 @pytest.fixture(name="manager")
@@ -204,6 +305,102 @@ class Test_Filterer:
 
         assert filterer.passes_filter(entity_state, StateChangeType.STATE) is False
 
+    async def test_verdict_is_cached(self, entity, entity_state, filterer):
+        """Test that the registries are only consulted the first time an entity is filtered."""
+        filterer._change_detection_type = [StateChangeType.STATE.value]
+
+        await filterer.async_init()
+
+        with patch.object(filterer, "_evaluate_entity", wraps=filterer._evaluate_entity) as evaluate_entity:
+            assert filterer.passes_filter(entity_state, StateChangeType.STATE) is True
+            assert filterer.passes_filter(entity_state, StateChangeType.STATE) is True
+
+        evaluate_entity.assert_not_called()
+
+        filterer.stop()
+
+    async def test_verdict_invalidated_on_entity_registry_update(
+        self, hass, entity, entity_state, entity_registry, filterer
+    ):
+        """Test that updating an entity in the registry recomputes its verdict."""
+        filterer._change_detection_type = [StateChangeType.STATE.value]
+        filterer._include_targets = True
+        filterer._included_labels = ["new_label"]
+
+        await filterer.async_init()
+
+        assert filterer.passes_filter(entity_state, StateChangeType.STATE) is False
+
+        entity_registry.async_update_entity(entity.entity_id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        assert filterer.passes_filter(entity_state, StateChangeType.STATE) is True
+
+        filterer.stop()
+
+    async def test_verdict_invalidated_on_device_registry_update(
+        self, hass, entity, device, entity_state, device_registry, filterer
+    ):
+        """Test that updating a device in the registry recomputes the verdicts of its entities."""
+        filterer._change_detection_type = [StateChangeType.STATE.value]
+        filterer._exclude_targets = True
+        filterer._excluded_labels = ["new_label"]
+
+        await filterer.async_init()
+
+        assert filterer.passes_filter(entity_state, StateChangeType.STATE) is True
+
+        device_registry.async_update_device(device.id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        assert filterer.passes_filter(entity_state, StateChangeType.STATE) is False
+
+        filterer.stop()
+
+    async def test_verdict_kept_after_stop(self, hass, entity, entity_state, entity_registry, filterer):
+        """Test that registry updates are no longer tracked once the filterer is stopped."""
+        filterer._change_detection_type = [StateChangeType.STATE.value]
+
+        await filterer.async_init()
+        filterer.stop()
+
+        entity_registry.async_update_entity(entity.entity_id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        assert entity.entity_id in filterer._verdicts
+
+    @pytest.mark.parametrize(
+        ("include_targets", "exclude_targets", "targeted"),
+        [(True, False, True), (True, True, False), (False, False, False), (False, True, False)],
+        ids=["inclusions only", "inclusions and exclusions", "no targets", "exclusions only"],
+    )
+    async def test_targeted(self, filterer, include_targets, exclude_targets, targeted):
+        """Test that only the included targets are tracked individually, and only when nothing is excluded."""
+        filterer._include_targets = include_targets
+        filterer._exclude_targets = exclude_targets
+
+        assert filterer.targeted is targeted
+
+    async def test_targets_recomputed_on_registry_update(self, hass, entity, entity_registry, filterer):
+        """Test that the targets are recomputed, and the listeners called, when the registries change."""
+        filterer._include_targets = True
+        filterer._included_labels = ["new_label"]
+
+        targets_listener = MagicMock()
+        filterer.add_targets_listener(targets_listener)
+
+        await filterer.async_init()
+
+        assert filterer.targets() == ()
+
+        entity_registry.async_update_entity(entity.entity_id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        targets_listener.assert_called()
+        assert filterer.targets() == (entity.entity_id,)
+
+        filterer.stop()
+
     async def test_filter_with_excluded_change_type(self, config_entry, entity_id, entity_state, filterer):
         """Test receiving an entity that we have not added to HomeAssistant by not including the entity fixture."""
         filterer._change_detection_type = [StateChangeType.ATTRIBUTE.value]
@@ -435,6 +632,285 @@ class Test_Filterer:
         assert filterer._passes_change_detection_type_filter(StateChangeType.STATE) is False
 
 
+class Test_EventQueue:
+    """Test the EventQueue class."""
+
+    def _event(self, entity_id: str, change_type: StateChangeType = StateChangeType.STATE, **attributes):
+        return (
+            datetime.now(tz=UTC),
+            State(entity_id, "on", attributes),
+            change_type,
+        )
+
+    async def test_unbounded_by_default(self, queue: EventQueue):
+        """Test that the queue does not drop events when no capacity is configured."""
+        assert not queue.bounded
+
+        for i in range(100):
+            queue.put_nowait(self._event(f"switch.entity_{i}"))
+
+        assert queue.qsize() == 100
+        assert queue.dropped == {"state": 0, "attribute": 0, "polling": 0}
+
+    async def test_drop_oldest(self):
+        """Test that the oldest event is dropped when the queue is full."""
+        queue = EventQueue(max_events=2, overflow_policy=QueueOverflowPolicy.DROP_OLDEST)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two"))
+        queue.put_nowait(self._event("switch.three"))
+
+        assert [queue.get_nowait()[1].entity_id for _ in range(queue.qsize())] == [
+            "switch.two",
+            "switch.three",
+        ]
+        assert queue.dropped["state"] == 1
+
+    async def test_drop_polled_first(self):
+        """Test that polled events are dropped before state changes."""
+        queue = EventQueue(max_events=2, overflow_policy=QueueOverflowPolicy.DROP_POLLED_FIRST)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two", StateChangeType.NO_CHANGE))
+        queue.put_nowait(self._event("switch.three"))
+
+        assert [queue.get_nowait()[1].entity_id for _ in range(queue.qsize())] == [
+            "switch.one",
+            "switch.three",
+        ]
+        assert queue.dropped == {"state": 0, "attribute": 0, "polling": 1}
+
+    async def test_drop_polled_first_without_polled_events(self):
+        """Test that the oldest event is dropped when no polled events are pending."""
+        queue = EventQueue(max_events=2, overflow_policy=QueueOverflowPolicy.DROP_POLLED_FIRST)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two"))
+        queue.put_nowait(self._event("switch.three", StateChangeType.NO_CHANGE))
+
+        assert [queue.get_nowait()[1].entity_id for _ in range(queue.qsize())] == [
+            "switch.two",
+            "switch.three",
+        ]
+
+    async def test_drop_polled_first_burst(self):
+        """Test that a burst of state changes drops the polled events in order and keeps the rest in order."""
+        queue = EventQueue(max_events=100, overflow_policy=QueueOverflowPolicy.DROP_POLLED_FIRST)
+
+        for i in range(100):
+            change_type = StateChangeType.NO_CHANGE if i % 2 else StateChangeType.STATE
+            queue.put_nowait(self._event(f"switch.entity_{i}", change_type))
+
+        for i in range(100, 150):
+            queue.put_nowait(self._event(f"switch.entity_{i}"))
+
+        assert queue.dropped == {"state": 0, "attribute": 0, "polling": 50}
+        assert queue.qsize() == 100
+        assert [queue.get_nowait()[1].entity_id for _ in range(queue.qsize())] == [
+            f"switch.entity_{i}" for i in [*range(0, 100, 2), *range(100, 150)]
+        ]
+        assert queue.estimated_bytes == 0
+
+        with pytest.raises(asyncio.QueueEmpty):
+            queue.get_nowait()
+
+    async def test_coalesce_per_entity(self):
+        """Test that an older event for the same entity is dropped when the queue is full."""
+        queue = EventQueue(max_events=2, overflow_policy=QueueOverflowPolicy.COALESCE_PER_ENTITY)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two"))
+        queue.put_nowait(self._event("switch.two", StateChangeType.ATTRIBUTE))
+
+        assert queue.dropped == {"state": 1, "attribute": 0, "polling": 0}
+
+        # Without a pending event for the same entity, the oldest event is dropped
+        queue.put_nowait(self._event("switch.three"))
+
+        assert [
+            (item[1].entity_id, item[2]) for item in [queue.get_nowait() for _ in range(queue.qsize())]
+        ] == [
+            ("switch.two", StateChangeType.ATTRIBUTE),
+            ("switch.three", StateChangeType.STATE),
+        ]
+        assert queue.dropped == {"state": 2, "attribute": 0, "polling": 0}
+
+    async def test_max_bytes(self):
+        """Test that events are dropped when the estimated size exceeds the limit."""
+        event_size = EventQueue.estimate_size(self._event("switch.one")[1])
+        queue = EventQueue(max_bytes=event_size * 2)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two"))
+        assert queue.estimated_bytes == event_size * 2
+
+        queue.put_nowait(self._event("switch.six", attribute="value"))
+
+        assert queue.qsize() == 1
+        assert queue.dropped["state"] == 2
+        assert queue.get_nowait()[1].entity_id == "switch.six"
+        assert queue.estimated_bytes == 0
+
+    async def test_drop_listener(self):
+        """Test that the drop listeners are handed each event dropped to make room."""
+        queue = EventQueue(max_events=1)
+        listener = MagicMock()
+        queue.add_drop_listener(listener)
+
+        first = self._event("switch.one")
+        queue.put_nowait(first)
+        queue.put_nowait(self._event("switch.two"))
+
+        listener.assert_called_once_with(first)
+
+    async def test_overflow_warning_logged_once(self, mock_logger):
+        """Test that the overflow warning is logged once per overflow episode."""
+        queue = EventQueue(max_events=1, log=mock_logger)
+
+        queue.put_nowait(self._event("switch.one"))
+        queue.put_nowait(self._event("switch.two"))
+        queue.put_nowait(self._event("switch.three"))
+
+        assert mock_logger.warning.call_count == 1
+
+        queue.get_nowait()
+        queue.put_nowait(self._event("switch.four"))
+        queue.put_nowait(self._event("switch.five"))
+
+        assert mock_logger.warning.call_count == 2
+
+    async def test_diagnostics(self, snapshot: SnapshotAssertion):
+        """Test the diagnostics of the queue."""
+        queue = EventQueue(
+            max_events=1, max_bytes=4096, overflow_policy=QueueOverflowPolicy.DROP_POLLED_FIRST
+        )
+
+        queue.put_nowait(self._event("switch.one", StateChangeType.NO_CHANGE))
+        queue.put_nowait(self._event("switch.two"))
+
+        assert queue.diagnostics() == snapshot
+
+
+class Test_CoalescingEventQueue:
+    """Test the CoalescingEventQueue class."""
+
+    def _event(self, entity_id: str, change_type: StateChangeType, state: str = "on"):
+        return (datetime.now(tz=UTC), State(entity_id, state), change_type)
+
+    def _drain(self, queue: EventQueue) -> list[tuple[str, str, StateChangeType]]:
+        items = [queue.get_nowait() for _ in range(queue.qsize())]
+        return [(state.entity_id, state.state, reason) for _, state, reason in items]
+
+    async def test_attribute_changes_are_coalesced(self):
+        """Test that a newer attribute change supersedes the pending one for the same entity."""
+        queue = CoalescingEventQueue()
+
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.other", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "2"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "3"))
+
+        assert self._drain(queue) == [
+            ("sensor.power", "3", StateChangeType.ATTRIBUTE),
+            ("sensor.other", "1", StateChangeType.ATTRIBUTE),
+        ]
+        assert queue.coalesced == {"state": 0, "attribute": 2, "polling": 0}
+
+    async def test_state_changes_keep_full_fidelity(self):
+        """Test that state changes are never coalesced."""
+        queue = CoalescingEventQueue()
+
+        queue.put_nowait(self._event("switch.one", StateChangeType.STATE, "on"))
+        queue.put_nowait(self._event("switch.one", StateChangeType.STATE, "off"))
+
+        assert self._drain(queue) == [
+            ("switch.one", "on", StateChangeType.STATE),
+            ("switch.one", "off", StateChangeType.STATE),
+        ]
+
+    async def test_state_change_closes_pending_events(self):
+        """Test that an attribute change after a state change is not published ahead of it."""
+        queue = CoalescingEventQueue()
+
+        queue.put_nowait(self._event("media_player.tv", StateChangeType.ATTRIBUTE, "playing"))
+        queue.put_nowait(self._event("media_player.tv", StateChangeType.STATE, "paused"))
+        queue.put_nowait(self._event("media_player.tv", StateChangeType.ATTRIBUTE, "paused"))
+        queue.put_nowait(self._event("media_player.tv", StateChangeType.ATTRIBUTE, "paused"))
+
+        assert self._drain(queue) == [
+            ("media_player.tv", "playing", StateChangeType.ATTRIBUTE),
+            ("media_player.tv", "paused", StateChangeType.STATE),
+            ("media_player.tv", "paused", StateChangeType.ATTRIBUTE),
+        ]
+
+    async def test_events_after_get_are_not_coalesced(self):
+        """Test that an event is not superseded once it has left the queue."""
+        queue = CoalescingEventQueue()
+
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1"))
+        queue.get_nowait()
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "2"))
+
+        assert self._drain(queue) == [("sensor.power", "2", StateChangeType.ATTRIBUTE)]
+
+    async def test_bounded(self):
+        """Test that dropping a pending event stops it from being superseded."""
+        queue = CoalescingEventQueue(max_events=1)
+
+        queue.put_nowait(self._event("sensor.power", StateChangeType.NO_CHANGE, "1"))
+        queue.put_nowait(self._event("sensor.other", StateChangeType.NO_CHANGE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.NO_CHANGE, "2"))
+
+        assert self._drain(queue) == [("sensor.power", "2", StateChangeType.NO_CHANGE)]
+        assert queue.dropped["polling"] == 2
+        assert queue.coalesced["polling"] == 0
+        assert queue.estimated_bytes == 0
+
+    async def test_supersede_at_max_bytes(self):
+        """Test that a superseding event which grows the queue past its size limit makes room and notifies."""
+        max_bytes = 2 * EventQueue.estimate_size(State("sensor.power", "1")) + 5
+        queue = CoalescingEventQueue(max_bytes=max_bytes)
+        listener = MagicMock()
+        queue.add_put_listener(listener)
+
+        queue.put_nowait(self._event("sensor.other", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1234567890"))
+
+        assert listener.call_count == 3
+        assert queue.estimated_bytes <= max_bytes
+        assert queue.dropped["attribute"] == 1
+        assert queue.coalesced["attribute"] == 1
+        assert self._drain(queue) == [("sensor.power", "1234567890", StateChangeType.ATTRIBUTE)]
+
+    async def test_supersede_drops_the_pending_event(self):
+        """Test that an event is added in its own right when making room drops the event it would supersede."""
+        max_bytes = 2 * EventQueue.estimate_size(State("sensor.power", "1")) + 5
+        queue = CoalescingEventQueue(max_bytes=max_bytes)
+
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.other", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1234567890"))
+
+        assert queue.estimated_bytes <= max_bytes
+        assert queue.dropped["attribute"] == 2
+        assert queue.coalesced["attribute"] == 0
+        assert self._drain(queue) == [("sensor.power", "1234567890", StateChangeType.ATTRIBUTE)]
+
+    async def test_diagnostics(self):
+        """Test that the diagnostics include coalesced counts."""
+        queue = CoalescingEventQueue()
+
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "1"))
+        queue.put_nowait(self._event("sensor.power", StateChangeType.ATTRIBUTE, "22"))
+
+        diagnostics = queue.diagnostics()
+
+        assert diagnostics["size"] == 1
+        assert diagnostics["coalesced_total"] == 1
+        assert diagnostics["estimated_bytes"] == EventQueue.estimate_size(State("sensor.power", "22"))
+
+
 class Test_Manager:
     """Test the Pipeline.Manager class."""
 
@@ -453,6 +929,18 @@ class Test_Manager:
         assert manager._settings == pipeline_settings
         assert manager._static_fields == {}
 
+        assert type(manager._queue) is EventQueue
+
+    async def test_init_coalescing_queue(self, hass, mock_gateway, pipeline_settings, mock_logger):
+        """Test that the manager uses a coalescing queue when configured."""
+        pipeline_settings.queue_coalesce = True
+
+        manager = Pipeline.Manager(
+            hass=hass, gateway=mock_gateway, settings=pipeline_settings, log=mock_logger
+        )
+
+        assert isinstance(manager._queue, CoalescingEventQueue)
+
     async def test_async_init(self, manager, config_entry, mock_loop_handler):
         """Test initialization of the manager and pipeline components."""
         manager._settings.tags = ["tag1", "tag2"]
@@ -516,6 +1004,27 @@ class Test_Manager:
         manager._formatter.async_init.assert_awaited_once_with(manager._static_fields)
         manager._logger.warning.assert_called_once_with("No polling frequency set. Disabling polling.")
 
+    @pytest.mark.parametrize(
+        ("keyframe_interval", "polling_frequency", "wired"),
+        [(900, 60, True), (0, 60, False), (900, 0, False)],
+        ids=["keyframes", "no keyframes", "no polling"],
+    )
+    async def test_async_init_keyframes(
+        self, manager, config_entry, keyframe_interval, polling_frequency, wired
+    ):
+        """Test that the poller learns about the states queued by the listener in changed-or-keyframe mode."""
+        manager._settings.polling_keyframe_interval = keyframe_interval
+        manager._settings.polling_frequency = polling_frequency
+
+        await manager.async_init(config_entry)
+
+        if wired:
+            manager._listener.add_queued_listener.assert_called_once_with(manager._poller.record_export)
+            assert manager._queue._drop_listeners == [manager._poller.forget_export]
+        else:
+            manager._listener.add_queued_listener.assert_not_called()
+            assert manager._queue._drop_listeners == []
+
     async def test_sip_queue(self, manager):
         """Test the sip_queue method of the Pipeline.Manager class."""
 
@@ -543,6 +1052,16 @@ class Test_Manager:
         # Assert that the formatter was called
         manager._formatter.format.assert_called_once_with(event.time_fired, new_state, reason)
 
+    async def test_sip_queue_deadline(self, manager):
+        """Test that a drain whose deadline has passed leaves the events in the queue."""
+        manager._queue.put_nowait((datetime.now(tz=UTC), State("light.light_1", "on"), StateChangeType.STATE))
+
+        result = [doc async for doc in manager.sip_queue(deadline=asyncio.get_running_loop().time())]
+
+        assert result == []
+        assert manager._queue.qsize() == 1
+        manager._formatter.format.assert_not_called()
+
     async def test_sip_queue_and_format(self, manager, formatter):
         """Test the sip_queue method of the Pipeline.Manager class."""
 
@@ -550,7 +1069,7 @@ class Test_Manager:
         manager._formatter = formatter
         manager._formatter.format = MagicMock(wraps=manager._formatter.format)
         # We dont want to fully setup the entity for this test so we'll skip pulling in extended details
-        manager._formatter._state_to_extended_details = MagicMock(return_value={})
+        manager._formatter._entity_to_extended_details = MagicMock(return_value={})
 
         # Build a bus event to put onto the queue
         timestamp = testconst.MOCK_NOON_APRIL_12TH_2023
@@ -577,6 +1096,7 @@ class Test_Manager:
                 "event.action": "State change",
                 "event.kind": "event",
                 "event.type": "change",
+                "hass.entity.friendly_name": "light 1",
                 "hass.entity.object.id": "light_1",
                 "hass.entity.value": "on",
                 "hass.entity.valueas.boolean": True,
@@ -616,6 +1136,110 @@ class Test_Manager:
             "light.light_1",
         )
 
+    async def test_sip_queue_in_executor(self, manager, formatter):
+        """Test that events formatted in worker threads are yielded in the order they were queued."""
+        manager._settings.format_workers = 2
+        manager._executor = ThreadPoolExecutor(max_workers=2)
+
+        manager._formatter = formatter
+        manager._formatter._entity_to_extended_details = MagicMock(return_value={})
+
+        timestamp = testconst.MOCK_NOON_APRIL_12TH_2023
+        states = [State(f"sensor.sensor_{i}", str(i)) for i in range(FORMAT_BATCH_SIZE * 3)]
+
+        for state in states:
+            manager._queue.put_nowait((timestamp, state, StateChangeType.STATE))
+
+        result = [doc async for doc in manager.sip_queue()]
+
+        assert result == [formatter.format(timestamp, state, StateChangeType.STATE) for state in states]
+        assert all(type(document) is dict for document in result)
+
+    async def test_sip_queue_in_executor_encoded(self, manager, formatter):
+        """Test that documents formatted in worker threads carry their serialized form when requested."""
+        manager._settings.format_workers = 1
+        manager._executor = ThreadPoolExecutor(max_workers=1)
+        manager._serializer = Serializer()
+
+        manager._formatter = formatter
+        manager._formatter._entity_to_extended_details = MagicMock(return_value={})
+
+        manager._queue.put_nowait(
+            (testconst.MOCK_NOON_APRIL_12TH_2023, State("light.light_1", "on"), StateChangeType.STATE)
+        )
+
+        result = [doc async for doc in manager.sip_queue()]
+
+        assert len(result) == 1
+        assert type(result[0]) is EncodedDocument
+        assert json.loads(result[0].encoded) == result[0]
+
+    async def test_sip_queue_in_executor_error(self, manager, formatter):
+        """Test that a document which fails to format in a worker thread is skipped."""
+        manager._settings.format_workers = 1
+        manager._executor = ThreadPoolExecutor(max_workers=1)
+
+        manager._formatter = formatter
+        manager._formatter._entity_to_extended_details = MagicMock(return_value={})
+        manager._formatter._state_to_coerced_value = MagicMock(side_effect=[Exception, {}])
+
+        timestamp = testconst.MOCK_NOON_APRIL_12TH_2023
+        manager._queue.put_nowait((timestamp, State("light.light_1", "on"), StateChangeType.STATE))
+        manager._queue.put_nowait((timestamp, State("light.light_2", "on"), StateChangeType.STATE))
+
+        result = [doc async for doc in manager.sip_queue()]
+
+        assert [doc["hass.entity.object.id"] for doc in result] == ["light_2"]
+        formatter._logger.exception.assert_called_once_with(
+            "Error formatting document for entity [%s]. Skipping document.", "light.light_1"
+        )
+
+    async def test_async_init_format_workers(self, manager, config_entry, mock_loop_handler):
+        """Test that the manager creates a worker pool, and reuses serialization with the NDJSON writer."""
+        manager._settings.format_workers = 2
+        manager._gateway.settings.bulk_ndjson_writer = True
+
+        await manager.async_init(config_entry)
+
+        assert manager._executor is not None
+        assert type(manager._serializer) is Serializer
+
+        manager.stop()
+
+        assert manager._executor is None
+
+    async def test_sip_queue_yields_to_event_loop(self, manager):
+        """Test that draining a large queue yields to the event loop every drain_batch_size events."""
+        manager._settings.drain_batch_size = 10
+        manager._settings.drain_budget = 0
+
+        for i in range(25):
+            manager._queue.put_nowait(
+                (datetime.now(tz=UTC), State(f"sensor.{i}", "1"), StateChangeType.STATE)
+            )
+
+        with patch("custom_components.elasticsearch.loop.asyncio.sleep", AsyncMock()) as sleep:
+            result = [doc async for doc in manager.sip_queue()]
+
+        assert len(result) == 25
+        assert sleep.await_count == 2
+
+    async def test_loop_lag_sampled_while_draining(self, manager, config_entry, mock_loop_handler):
+        """Test that the manager only measures the event loop lag while it drains the queue."""
+        await manager.async_init(config_entry)
+
+        assert manager._loop_lag._handle is None
+        assert manager.diagnostics()["loop_lag"]["samples"] == 0
+
+        manager._queue.put_nowait((datetime.now(tz=UTC), State("light.light_1", "on"), StateChangeType.STATE))
+
+        async for _ in manager.sip_queue():
+            assert manager._loop_lag._handle is not None
+
+        assert manager._loop_lag._handle is None
+
+        manager.stop()
+
     async def test_reload_config_entry(self, hass, config_entry, manager, mock_loop_handler):
         """Test the reload_config_entry method of the Pipeline.Manager class."""
 
@@ -648,6 +1272,26 @@ class Test_Manager:
 
         manager._hass.config_entries.async_schedule_reload.assert_not_called()
 
+    async def test_async_shutdown(self, manager):
+        """Test that shutting down stops collecting events and flushes the queue before stopping."""
+        manager._settings.shutdown_flush_timeout = 10
+
+        await manager.async_shutdown()
+
+        manager._listener.stop.assert_called()
+        manager._poller.stop.assert_called_once()
+        manager._publisher.async_flush.assert_awaited_once_with(timeout=10)
+        manager._publisher.stop.assert_called_once()
+
+    async def test_async_shutdown_without_flush(self, manager):
+        """Test that the queue is not flushed when the shutdown flush is disabled."""
+        manager._settings.shutdown_flush_timeout = 0
+
+        await manager.async_shutdown()
+
+        manager._publisher.async_flush.assert_not_awaited()
+        manager._publisher.stop.assert_called_once()
+
     async def test_stop(self, manager):
         """Ensure that stopping the manager stops active listeners."""
         manager.stop()
@@ -685,64 +1329,342 @@ class Test_Poller:
                     func=poller.poll,
                     frequency=poller._settings.polling_frequency,
                     log=poller._logger,
+                    mode=LoopMode.FIXED_RATE,
                 )
 
                 loop_handler_instance.start.assert_called_once()
 
-    class Test_Integration_Tests:
-        """Run the integration tests of the Poller class."""
-
-        @pytest.mark.parametrize(
-            "states",
-            [
-                [],
-                [State("light.living_room", "on")],
-                [State("light.living_room", "on"), State("switch.living_room", "off")],
-            ],
-            ids=["No states", "One state", "Multiple states"],
-        )
-        async def test_poll(
+        async def test_async_init_polling_schedule(
             self,
-            queue,
-            poller: Pipeline.Poller,
-            states: list[State],
-            freeze_time: FrozenDateTimeFactory,
-            snapshot: SnapshotAssertion,
+            hass,
+            pipeline_settings,
+            mock_filterer,
+            mock_queue,
+            mock_logger,
+            config_entry,
+            mock_loop_handler,
         ):
-            """Test polling for different quantities of states."""
-            freeze_time.tick()  # use the fixture so it doesnt show type errors
+            """Test that the Poller runs a loop for each polling frequency in the schedule."""
+            pipeline_settings.polling_schedule = ["domain:sun=3600", "device_class:energy=10", "invalid"]
+
+            poller = Pipeline.Poller(
+                hass=hass,
+                settings=pipeline_settings,
+                filterer=mock_filterer,
+                queue=mock_queue,
+                log=mock_logger,
+            )
 
-            # Replace the mock queue with a real queue
-            poller._queue = queue
+            mock_logger.warning.assert_called_once()
 
-            with patch.object(poller._hass, "states") as states_mock:
-                states_mock.async_all = MagicMock(return_value=states)
+            await poller.async_init(config_entry=config_entry)
 
-                await poller.poll()
+            assert [call.kwargs["name"] for call in mock_loop_handler.call_args_list] == [
+                "es_state_poll_loop_10s",
+                "es_state_poll_loop",
+                "es_state_poll_loop_3600s",
+            ]
+            assert [call.kwargs["frequency"] for call in mock_loop_handler.call_args_list] == [10, 60, 3600]
 
-                states_mock.async_all.assert_called_once()
+            poller.stop()
 
-                if len(states) > 0:
-                    assert not poller._queue.empty()
+            assert mock_loop_handler.return_value.stop.call_count == 3
+            assert poller._cancel_registry_listener is None
 
-                queued_states: list[dict] = []
+        async def test_stop(self, poller: Pipeline.Poller):
+            """Test that stopping the Poller stops its loops."""
+            poll_loop = MagicMock()
+            poller._poll_loops = [poll_loop]
 
-                while not poller._queue.empty():
-                    timestamp, state, change_type = await poller._queue.get()
-                    queued_states.append(
-                        {
-                            "timestamp": timestamp,
-                            "state": state.state,
-                            "entity_id": state.entity_id,
-                            "change type": change_type.value,
-                        },
-                    )
+            poller.stop()
 
-                assert poller._queue.empty()
+            poll_loop.stop.assert_called_once()
 
-                assert len(queued_states) == len(states)
+        async def test_poll_polling_schedule(
+            self, hass, pipeline_settings, mock_filterer, queue, mock_logger, entity_registry
+        ):
+            """Test that each poll only queues the entities polled at its frequency."""
+            pipeline_settings.polling_schedule = ["domain:sun=3600", "device_class:energy=10"]
+            mock_filterer.passes_filter = MagicMock(return_value=True)
 
-                assert queued_states == snapshot
+            poller = Pipeline.Poller(
+                hass=hass, settings=pipeline_settings, filterer=mock_filterer, queue=queue, log=mock_logger
+            )
+
+            hass.states.async_set("sun.sun", "above_horizon")
+            hass.states.async_set("sensor.energy", "1", {"device_class": "energy"})
+            hass.states.async_set("sensor.temperature", "1", {"device_class": "temperature"})
+
+            for frequency, entity_ids in (
+                (3600, ["sun.sun"]),
+                (10, ["sensor.energy"]),
+                (None, ["sensor.temperature"]),
+            ):
+                await poller.poll(frequency)
+
+                polled = []
+                while not queue.empty():
+                    polled.append(queue.get_nowait()[1].entity_id)
+
+                assert polled == entity_ids
+
+        async def test_poll_yields_to_event_loop(self, queue, poller: Pipeline.Poller):
+            """Test that polling many entities yields to the event loop every drain_batch_size entities."""
+            poller._queue = queue
+            poller._settings.drain_batch_size = 10
+            poller._settings.drain_budget = 0
+
+            states = [State(f"sensor.{i}", "1") for i in range(30)]
+
+            with (
+                patch.object(poller._hass, "states") as states_mock,
+                patch("custom_components.elasticsearch.loop.asyncio.sleep", AsyncMock()) as sleep,
+            ):
+                states_mock.async_all = MagicMock(return_value=states)
+
+                await poller.poll()
+
+            assert queue.qsize() == 30
+            assert sleep.await_count == 3
+
+        @pytest.fixture(name="staggered_poller")
+        def staggered_poller_fixture(self, hass, pipeline_settings, mock_filterer, queue, mock_logger):
+            """Return a Poller which spreads a 30 second polling frequency over 3 slots."""
+            pipeline_settings.polling_frequency = 30
+            pipeline_settings.polling_slots = 3
+
+            mock_filterer.passes_filter = MagicMock(return_value=True)
+
+            for i in range(30):
+                hass.states.async_set(f"sensor.sensor_{i}", "1")
+
+            return Pipeline.Poller(
+                hass=hass,
+                settings=pipeline_settings,
+                filterer=mock_filterer,
+                queue=queue,
+                log=mock_logger,
+                clock=MagicMock(time=MagicMock(return_value=0.0)),
+            )
+
+        async def _poll_at(self, poller: Pipeline.Poller, queue, offset: float) -> list:
+            poller._clock.time.return_value = offset
+
+            await poller.poll()
+
+            polled = []
+            while not queue.empty():
+                timestamp, state, _ = queue.get_nowait()
+                polled.append((timestamp, state.entity_id))
+
+            return polled
+
+        async def test_poll_staggered(self, hass, queue, staggered_poller: Pipeline.Poller, freezer):
+            """Test that each entity is polled once per polling frequency, stamped with the start of its slot."""
+            start = datetime(2024, 1, 1, tzinfo=UTC)
+
+            # Runs are a little late, which must not show in the timestamps
+            offsets = (0, 10.2, 20.4)
+
+            with patch.object(
+                staggered_poller, "_scheduled_states", wraps=staggered_poller._scheduled_states
+            ) as scheduled_states:
+                polled = []
+                for offset in offsets:
+                    freezer.move_to(start + timedelta(seconds=offset))
+                    polled.extend(await self._poll_at(staggered_poller, queue, offset))
+
+            entity_ids = [state.entity_id for state in hass.states.async_all()]
+            assert sorted(entity_id for _, entity_id in polled) == sorted(entity_ids)
+
+            for timestamp, entity_id in polled:
+                assert timestamp == start + timedelta(seconds=10 * staggered_poller._slot(entity_id))
+
+            # The entities are bucketed into slots once per polling interval, rather than on every run
+            assert scheduled_states.call_count == 1
+
+            # Every slot holds some of the entities
+            assert {staggered_poller._slot(entity_id) for entity_id in entity_ids} == {0, 1, 2}
+
+        @pytest.mark.parametrize(
+            ("offset", "expected_slots"),
+            [(9.9, {1}), (0.1, set()), (25, {1, 2}), (95, {0, 1, 2})],
+            ids=["early run", "repeated run", "late run", "missed runs"],
+        )
+        async def test_poll_staggered_catches_up(
+            self, queue, staggered_poller: Pipeline.Poller, offset, expected_slots
+        ):
+            """Test that slots are neither repeated nor skipped when runs are early or late."""
+            await self._poll_at(staggered_poller, queue, 0)
+
+            polled = await self._poll_at(staggered_poller, queue, offset)
+
+            assert {staggered_poller._slot(entity_id) for _, entity_id in polled} == expected_slots
+
+            # No entity is polled more than once in a single run
+            assert len(polled) == len({entity_id for _, entity_id in polled})
+
+        async def test_poll_staggered_entity_updated(self, queue, staggered_poller: Pipeline.Poller):
+            """Test that the slots are bucketed again once an entity may have moved to another frequency."""
+            await self._poll_at(staggered_poller, queue, 0)
+
+            assert staggered_poller._slot_buckets
+
+            staggered_poller._handle_entity_registry_updated(
+                MagicMock(
+                    data={"action": "update", "entity_id": "sensor.sensor_0", "changes": {"labels": set()}}
+                )
+            )
+
+            assert not staggered_poller._slot_buckets
+
+        async def test_poll_changed_or_keyframe(self, hass, queue, poller: Pipeline.Poller, freezer):
+            """Test that unchanged entities are only polled once their keyframe interval elapsed."""
+            poller._queue = queue
+            poller._keyframe_interval = 900
+            poller._filterer.passes_filter = MagicMock(return_value=True)
+            poller._clock = MagicMock(time=MagicMock(return_value=0.0))
+
+            start = datetime(2024, 1, 1, tzinfo=UTC)
+
+            def move_to(offset: float) -> None:
+                freezer.move_to(start + timedelta(seconds=offset))
+                poller._clock.time.return_value = offset
+
+            async def poll_at(offset: float) -> list[str]:
+                move_to(offset)
+
+                await poller.poll()
+
+                polled = []
+                while not queue.empty():
+                    polled.append(queue.get_nowait()[1].entity_id)
+
+                return polled
+
+            move_to(0)
+            hass.states.async_set("sensor.changing", "1")
+            hass.states.async_set("sensor.steady", "1")
+
+            assert await poll_at(0) == ["sensor.changing", "sensor.steady"]
+            assert await poll_at(60) == []
+
+            move_to(100)
+            hass.states.async_set("sensor.changing", "2")
+
+            assert await poll_at(120) == ["sensor.changing"]
+
+            # The listener already queued this change, so polling does not queue it again
+            move_to(150)
+            hass.states.async_set("sensor.changing", "3")
+            poller.record_export(hass.states.get("sensor.changing"))
+
+            assert await poll_at(180) == []
+
+            # The keyframe is due at 900s, and the poll at 899.5s is close enough not to wait for the next poll
+            assert await poll_at(840) == []
+            assert await poll_at(899.5) == ["sensor.steady"]
+
+            assert poller.diagnostics()["skipped_unchanged"] == 8
+
+        async def test_poll_keyframe_after_drop(self, hass, poller: Pipeline.Poller):
+            """Test that a state which the queue dropped to make room is polled again rather than skipped."""
+            poller._queue = EventQueue(max_events=1)
+            poller._queue.add_drop_listener(poller.forget_export)
+            poller._keyframe_interval = 900
+            poller._filterer.passes_filter = MagicMock(return_value=True)
+            poller._clock = MagicMock(time=MagicMock(return_value=0.0))
+
+            hass.states.async_set("sensor.dropped", "1")
+            hass.states.async_set("sensor.kept", "1")
+
+            await poller.poll()
+
+            assert poller._queue.get_nowait()[1].entity_id == "sensor.kept"
+
+            poller._clock.time.return_value = 60
+
+            await poller.poll()
+
+            assert [poller._queue.get_nowait()[1].entity_id for _ in range(poller._queue.qsize())] == [
+                "sensor.dropped"
+            ]
+            assert poller.diagnostics()["skipped_unchanged"] == 1
+
+        async def test_poll_targeted(self, queue, poller: Pipeline.Poller):
+            """Test that only the included entities are looked up in targeted mode."""
+            poller._queue = queue
+            poller._filterer.targeted = True
+            poller._filterer.targets = MagicMock(return_value=("light.living_room", "light.removed"))
+
+            with patch.object(poller._hass, "states") as states_mock:
+                states_mock.get = MagicMock(
+                    side_effect=lambda entity_id: (
+                        State(entity_id, "on") if entity_id == "light.living_room" else None
+                    )
+                )
+
+                await poller.poll()
+
+                states_mock.async_all.assert_not_called()
+
+            assert queue.qsize() == 1
+            assert queue.get_nowait()[1].entity_id == "light.living_room"
+
+    class Test_Integration_Tests:
+        """Run the integration tests of the Poller class."""
+
+        @pytest.mark.parametrize(
+            "states",
+            [
+                [],
+                [State("light.living_room", "on")],
+                [State("light.living_room", "on"), State("switch.living_room", "off")],
+            ],
+            ids=["No states", "One state", "Multiple states"],
+        )
+        async def test_poll(
+            self,
+            queue,
+            poller: Pipeline.Poller,
+            states: list[State],
+            freeze_time: FrozenDateTimeFactory,
+            snapshot: SnapshotAssertion,
+        ):
+            """Test polling for different quantities of states."""
+            freeze_time.tick()  # use the fixture so it doesnt show type errors
+
+            # Replace the mock queue with a real queue
+            poller._queue = queue
+
+            with patch.object(poller._hass, "states") as states_mock:
+                states_mock.async_all = MagicMock(return_value=states)
+
+                await poller.poll()
+
+                states_mock.async_all.assert_called_once()
+
+                if len(states) > 0:
+                    assert not poller._queue.empty()
+
+                queued_states: list[dict] = []
+
+                while not poller._queue.empty():
+                    timestamp, state, change_type = poller._queue.get_nowait()
+                    queued_states.append(
+                        {
+                            "timestamp": timestamp,
+                            "state": state.state,
+                            "entity_id": state.entity_id,
+                            "change type": change_type.value,
+                        },
+                    )
+
+                assert poller._queue.empty()
+
+                assert len(queued_states) == len(states)
+
+                assert queued_states == snapshot
 
 
 class Test_Listener:
@@ -772,6 +1694,7 @@ class Test_Listener:
         hass.bus.async_listen.assert_called_once_with(
             "state_changed",
             listener._handle_event,
+            event_filter=listener._filter_event,
         )
 
     @pytest.mark.parametrize(
@@ -801,10 +1724,11 @@ class Test_Listener:
             },
         )
 
-        await listener._handle_event(event)
+        passes = listener._filter_event(event.data)
 
         if change_type is None:
-            listener._queue.put_nowait.assert_not_called()
+            assert passes is False
+            listener._filterer.passes_filter.assert_not_called()
             return
 
         # Ensure listener events are filtered
@@ -813,6 +1737,8 @@ class Test_Listener:
             change_type,
         )
 
+        listener._handle_event(event)
+
         # Ensure the event was queued
         listener._queue.put_nowait.assert_called_once_with(
             (
@@ -822,30 +1748,93 @@ class Test_Listener:
             ),
         )
 
+    async def test_listener_queued_listener(self, listener):
+        """Test that the queued listeners are called with each queued state."""
+        queued_listener = MagicMock()
+        listener.add_queued_listener(queued_listener)
 
-class Test_Publisher:
-    """Test the Pipeline.Publisher class."""
+        new_state = State("light.light_1", "on")
 
-    @pytest.fixture(name="mock_document")
-    def mock_document_fixture(self):
-        """Return a mock entity document without ES action metadata."""
-        return {
-            "data_stream.type": "metrics",
-            "data_stream.dataset": "homeassistant.light",
-            "data_stream.namespace": "default",
-            "event": {
-                "action": "State change",
-            },
-            "hass.entity": {
-                "attributes": {"brightness": 255},
-                "domain": "light",
-                "id": "light.living_room",
-                "value": "on",
-                "valueas": {"boolean": True},
-                "object.id": "living_room",
-            },
+        listener._handle_event(Event("state_changed", {"old_state": None, "new_state": new_state}))
+
+        queued_listener.assert_called_once_with(new_state)
+
+    async def test_listener_filter_rejects(self, listener):
+        """Test that events rejected by the filterer are dropped by the event filter."""
+        listener._filterer.passes_filter = MagicMock(return_value=False)
+
+        event_data = {
+            "entity_id": "light.light_1",
+            "old_state": State("light.light_1", "off"),
+            "new_state": State("light.light_1", "on"),
         }
 
+        assert listener._filter_event(event_data) is False
+
+
+class Test_Listener_Event_Bus:
+    """Test the Pipeline.Listener class with the Home Assistant event bus."""
+
+    async def test_rejected_events_are_not_queued(self, hass: HomeAssistant, listener, mock_filterer):
+        """Test that only the events accepted by the filterer reach the queue."""
+        mock_filterer.passes_filter = MagicMock(
+            side_effect=lambda state, reason: state.entity_id == "light.kept"
+        )
+
+        await listener.async_init()
+
+        for entity_id in ("light.kept", "light.dropped"):
+            hass.bus.async_fire(
+                "state_changed",
+                {"entity_id": entity_id, "old_state": None, "new_state": State(entity_id, "on")},
+            )
+
+        await hass.async_block_till_done()
+
+        listener._queue.put_nowait.assert_called_once()
+        assert listener._queue.put_nowait.call_args.args[0][1].entity_id == "light.kept"
+
+        listener.stop()
+
+    async def test_targeted_mode_tracks_included_entities(self, hass: HomeAssistant, listener, mock_filterer):
+        """Test that only the included entities are tracked in targeted mode, and resubscribed on changes."""
+        mock_filterer.targeted = True
+        mock_filterer.targets = MagicMock(return_value=("light.kept",))
+        mock_filterer.passes_filter = MagicMock(return_value=True)
+
+        await listener.async_init()
+
+        hass.states.async_set("light.kept", "on")
+        hass.states.async_set("light.other", "on")
+        await hass.async_block_till_done()
+
+        listener._queue.put_nowait.assert_called_once()
+        assert listener._queue.put_nowait.call_args.args[0][1].entity_id == "light.kept"
+
+        # The targets changed, e.g. because a label was added to an entity in the registry
+        mock_filterer.targets.return_value = ("light.other",)
+        retrack = mock_filterer.add_targets_listener.call_args.args[0]
+        retrack()
+        retrack()
+        await hass.async_block_till_done()
+
+        assert mock_filterer.targets.call_count == 2
+
+        listener._queue.put_nowait.reset_mock()
+
+        hass.states.async_set("light.kept", "off")
+        hass.states.async_set("light.other", "off")
+        await hass.async_block_till_done()
+
+        listener._queue.put_nowait.assert_called_once()
+        assert listener._queue.put_nowait.call_args.args[0][1].entity_id == "light.other"
+
+        listener.stop()
+
+
+class Test_Publisher:
+    """Test the Pipeline.Publisher class."""
+
     def test_init(self, publisher, mock_gateway, mock_manager, pipeline_settings, mock_logger):
         """Test the initialization of the Publisher."""
         assert publisher._gateway == mock_gateway
@@ -985,6 +1974,597 @@ class Test_Publisher:
                 await publisher.publish()
                 publisher._manager.reload_config_entry.assert_called_once()
 
+    class Test_Flush_Triggers:
+        """Run the tests for the early flush triggers."""
+
+        async def test_no_triggers(self, publisher, put):
+            """Test that the loop is not woken when no flush triggers are configured."""
+            assert not publisher._has_flush_triggers()
+
+            put(100)
+
+            publisher._publish_loop.wake_now.assert_not_called()
+            assert publisher._age_timer is None
+
+        async def test_max_events(self, publisher, put):
+            """Test that the loop is woken once the queue reaches the maximum number of events."""
+            publisher._settings.publish_max_events = 3
+
+            put(2)
+            publisher._publish_loop.wake_now.assert_not_called()
+
+            put(1)
+            publisher._publish_loop.wake_now.assert_called_once()
+
+        async def test_max_bytes(self, publisher, put):
+            """Test that the loop is woken once the queue reaches the maximum estimated size."""
+            publisher._settings.publish_max_bytes = (
+                EventQueue.estimate_size(State("light.entity_0", "on")) * 2
+            )
+
+            put(1)
+            publisher._publish_loop.wake_now.assert_not_called()
+
+            put(1)
+            publisher._publish_loop.wake_now.assert_called_once()
+
+        async def test_disarmed_until_publish(self, publisher, put):
+            """Test that the loop is only woken once until a publish completes."""
+            publisher._settings.publish_max_events = 1
+
+            put(3)
+            publisher._publish_loop.wake_now.assert_called_once()
+
+            # A failed publish keeps early flushes disarmed
+            publisher._gateway.check_connection.return_value = False
+            await publisher.publish()
+            put(1)
+            publisher._publish_loop.wake_now.assert_called_once()
+
+            publisher._gateway.check_connection.return_value = True
+            await publisher.publish()
+            put(1)
+            assert publisher._publish_loop.wake_now.call_count == 2
+
+        async def test_max_age(self, hass, publisher, put):
+            """Test that the loop is woken once the oldest event reaches the maximum age."""
+            publisher._settings.publish_max_age = 5
+
+            put(2)
+
+            assert publisher._age_timer is not None
+            publisher._publish_loop.wake_now.assert_not_called()
+
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+            await hass.async_block_till_done()
+
+            publisher._publish_loop.wake_now.assert_called_once()
+            assert publisher._age_timer is None
+
+        async def test_max_age_cancelled_by_publish(self, hass, publisher, put):
+            """Test that publishing cancels the maximum age timer."""
+            publisher._settings.publish_max_age = 5
+
+            put(1)
+            assert publisher._age_timer is not None
+
+            await publisher.publish()
+
+            assert publisher._age_timer is None
+
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=6))
+            await hass.async_block_till_done()
+
+            publisher._publish_loop.wake_now.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "publisher_settings", [{"spool_enabled": True, "spool_replay_rate": 1, "publish_frequency": 2}]
+    )
+    class Test_Spooling:
+        """Run the tests for spooling events to disk while the connection is not available."""
+
+        async def _published_ids(self, publisher: Pipeline.Publisher) -> list[list[str]]:
+            return [
+                [action["_source"]["hass.entity.id"] async for action in call.kwargs["actions"]]
+                for call in publisher._gateway.bulk.call_args_list
+            ]
+
+        async def test_async_init(self, publisher, config_entry, hass, mock_loop_handler):
+            """Test that the spool is created under the config directory."""
+            publisher._spool = None
+
+            await publisher.async_init(config_entry=config_entry)
+
+            assert publisher._spool is not None
+            assert publisher._spool._path == Path(
+                hass.config.path(".storage", "elasticsearch", "spool", config_entry.entry_id)
+            )
+            assert publisher.diagnostics()["spool"]["segments"] == 0
+
+        async def test_async_init_bounded_queue(self, publisher, config_entry, mock_loop_handler):
+            """Test that the publisher is handed the events which a bounded queue drops, to spool them."""
+            publisher._queue = EventQueue(max_events=2)
+
+            await publisher.async_init(config_entry=config_entry)
+
+            assert publisher._queue._drop_listeners == [publisher._on_event_dropped]
+
+        async def test_spool_events_dropped_by_the_queue(self, publisher, put):
+            """Test that the events which the full event queue drops are spooled and replayed rather than lost."""
+            publisher._queue = publisher._manager.queue = EventQueue(max_events=2)
+            publisher._queue.add_drop_listener(publisher._on_event_dropped)
+
+            put(3)
+
+            await publisher.publish()
+
+            assert await self._published_ids(publisher) == [
+                ["light.entity_0"],
+                ["light.entity_1", "light.entity_2"],
+            ]
+            assert publisher._spool.diagnostics()["spooled"] == 1
+            assert publisher._spool.empty
+
+        async def test_spool_while_disconnected(self, publisher, put):
+            """Test that queued events are spooled when the connection is not available."""
+            publisher._gateway.check_connection.return_value = False
+
+            put(3)
+
+            await publisher.publish()
+
+            publisher._gateway.bulk.assert_not_called()
+            assert publisher._queue.empty()
+            assert publisher._spool.diagnostics()["spooled"] == 3
+
+        async def test_replay_when_reconnected(self, publisher, put):
+            """Test that spooled events are replayed in order and at the replay rate once reconnected."""
+            publisher._gateway.check_connection.return_value = False
+            put(3)
+            await publisher.publish()
+
+            publisher._gateway.check_connection.return_value = True
+            await publisher.publish()
+
+            # Two spooled events are replayed per cycle, followed by the live events
+            assert await self._published_ids(publisher) == [["light.entity_0", "light.entity_1"], []]
+            assert publisher._spool.diagnostics()["replayed"] == 2
+
+            publisher._gateway.bulk.reset_mock()
+            publisher._last_replay = None
+            await publisher.publish()
+
+            assert await self._published_ids(publisher) == [["light.entity_2"], []]
+            assert publisher._spool.empty
+
+        async def test_empty_spool_is_not_read(self, publisher):
+            """Test that an empty spool is not read from disk when publishing."""
+            publisher._spool.read = MagicMock()
+
+            await publisher.publish()
+
+            publisher._spool.read.assert_not_called()
+
+        async def test_replay_failure_keeps_events(self, publisher, put):
+            """Test that spooled events are kept when replaying them fails."""
+            publisher._gateway.check_connection.return_value = False
+            put(1)
+            await publisher.publish()
+
+            publisher._gateway.check_connection.return_value = True
+            publisher._gateway.bulk.side_effect = CannotConnect
+
+            await publisher.publish()
+
+            assert not publisher._spool.empty
+            assert publisher._spool.diagnostics()["replayed"] == 0
+
+        async def test_replay_keeps_events_handed_back(self, publisher, put):
+            """Test that a spooled event handed back to be retried stays in the spool, along with those after it."""
+            publisher._gateway.check_connection.return_value = False
+            put(3)
+            await publisher.publish()
+
+            async def bulk(actions):
+                async for action in actions:
+                    if action["_source"]["hass.entity.id"] == "light.entity_1":
+                        publisher._retry_later(action)
+
+            publisher._gateway.check_connection.return_value = True
+            publisher._gateway.bulk.side_effect = bulk
+
+            await publisher.publish()
+
+            assert not publisher._retries
+            assert publisher._spool.diagnostics()["replayed"] == 1
+            assert [action["_source"]["hass.entity.id"] for action in publisher._spool.read(100).actions] == [
+                "light.entity_1",
+                "light.entity_2",
+            ]
+
+        async def test_spool_retries_while_disconnected(self, publisher, mock_document, put):
+            """Test that the pending retries are spooled ahead of the queued events."""
+            publisher._gateway.check_connection.return_value = False
+            publisher._retry_later(
+                {
+                    "_op_type": "create",
+                    "_index": "metrics-test",
+                    "_source": {**mock_document, "hass.entity.id": "light.retry"},
+                }
+            )
+            put(1)
+
+            await publisher.publish()
+
+            batch = publisher._spool.read(100)
+            assert [action["_source"]["hass.entity.id"] for action in batch.actions] == [
+                "light.retry",
+                "light.entity_0",
+            ]
+            assert not publisher._retries
+
+    class Test_Retries:
+        """Run the tests for sending documents again which Elasticsearch could not handle at the time."""
+
+        async def test_async_init(self, publisher, config_entry, mock_loop_handler):
+            """Test that the publisher registers to be handed the documents to retry and those never sent."""
+            await publisher.async_init(config_entry=config_entry)
+
+            publisher._gateway.add_retry_listener.assert_called_once_with(publisher._retry_later)
+            publisher._gateway.add_requeue_listener.assert_called_once_with(publisher._requeue)
+
+        @pytest.fixture(name="sent")
+        def sent_fixture(self, publisher) -> list[list[str]]:
+            """Record the entities sent by each publish, handing light.busy back as Elasticsearch was too busy."""
+            sent: list[list[str]] = []
+
+            async def bulk(actions):
+                ids = []
+                async for action in actions:
+                    ids.append(action["_source"]["hass.entity.id"])
+
+                    if action["_source"]["hass.entity.id"] == "light.busy":
+                        publisher._retry_later(action)
+
+                sent.append(ids)
+
+            publisher._gateway.bulk.side_effect = bulk
+            publisher._clock = MagicMock(time=MagicMock(return_value=0.0))
+
+            return sent
+
+        async def _publish_at(self, publisher: Pipeline.Publisher, now: float, *entity_ids: str) -> None:
+            for entity_id in entity_ids:
+                publisher._queue.put_nowait(
+                    (datetime.now(tz=UTC), State(entity_id, "on"), StateChangeType.STATE)
+                )
+
+            publisher._clock.time.return_value = now
+            await publisher.publish()
+
+        async def test_not_resent_before_backoff(self, publisher, sent):
+            """Test that a document handed back is not sent again until its backoff has passed, which doubles."""
+            await self._publish_at(publisher, 0, "light.ok", "light.busy")
+
+            # A publish triggered early by a flush does not send the document again ahead of its backoff
+            await self._publish_at(publisher, 1.9, "light.early")
+            await self._publish_at(publisher, 2, "light.later")
+            await self._publish_at(publisher, 5.9)
+            await self._publish_at(publisher, 6)
+
+            assert sent == [
+                ["light.ok", "light.busy"],
+                ["light.early"],
+                ["light.busy", "light.later"],
+                [],
+                ["light.busy"],
+            ]
+            assert publisher.diagnostics()["pending_retries"] == 1
+
+        async def test_retried_until_attempts_used(self, publisher, sent):
+            """Test that a document handed back is sent again until it runs out of attempts."""
+            publisher._gateway.settings.bulk_max_retries = 2
+
+            await self._publish_at(publisher, 0, "light.busy")
+            await self._publish_at(publisher, 2)
+            await self._publish_at(publisher, 6)
+
+            assert sent == [["light.busy"], ["light.busy"], ["light.busy"]]
+            assert publisher.diagnostics()["pending_retries"] == 0
+
+            publisher._logger.error.assert_called_once_with(
+                "Failed to publish %d documents after %d attempts", 1, 3
+            )
+
+        async def test_attempts_kept_with_the_action(self, publisher):
+            """Test that the attempts of a document are carried by its action, and are not serialized with it."""
+            action = {
+                "_op_type": "create",
+                "_index": "metrics-test",
+                "_source": {"hass.entity.id": "light.busy"},
+            }
+
+            publisher._retry_later(action)
+            publisher._retry_later(publisher._retries[0])
+
+            retry = publisher._retries[1]
+
+            assert retry.attempts == 2
+            assert retry == action
+            assert json.loads(publisher._serializer.json_dumps(retry)) == action
+
+        async def test_requeue_keeps_attempts(self, publisher):
+            """Test that a document which was never sent is sent by the next publish without using up an attempt."""
+            publisher._clock = MagicMock(time=MagicMock(return_value=0.0))
+
+            publisher._retry_later({"_source": {"hass.entity.id": "light.busy"}})
+
+            publisher._clock.time.return_value = 2
+            publisher._requeue(publisher._retries.popleft())
+
+            assert publisher._retries[0].attempts == 1
+            assert publisher._retries[0].retry_at == 2
+
+        async def test_retries_kept_when_not_reached(self, publisher):
+            """Test that the retries a failed publish did not reach stay pending."""
+            publisher._clock = MagicMock(time=MagicMock(return_value=0.0))
+
+            for i in range(2):
+                publisher._retry_later({"_source": {"hass.entity.id": f"light.retry_{i}"}})
+
+            async def bulk(actions):
+                await anext(actions)
+                raise CannotConnect
+
+            publisher._gateway.bulk.side_effect = bulk
+            publisher._clock.time.return_value = 10
+
+            await publisher.publish()
+
+            assert [action["_source"]["hass.entity.id"] for action in publisher._retries] == ["light.retry_1"]
+
+    @pytest.mark.parametrize("publisher_settings", [{"shutdown_flush_timeout": 5}])
+    class Test_Shutdown_Flush:
+        """Run the tests for publishing the queued events on shutdown."""
+
+        def _spooled_ids(self, publisher: Pipeline.Publisher) -> list[str]:
+            return [action["_source"]["hass.entity.id"] for action in publisher._spool.read(100).actions]
+
+        async def test_flush(self, publisher, put):
+            """Test that the queued events are published, in fixed batches, and the publishing loop is stopped."""
+            put(5)
+
+            with patch("custom_components.elasticsearch.es_publish_pipeline.SHUTDOWN_FLUSH_BATCH_SIZE", 2):
+                await publisher.async_flush(timeout=5)
+
+            publisher._publish_loop.stop.assert_called_once()
+            assert publisher._gateway.bulk.await_count == 3
+            assert publisher._queue.empty()
+            assert publisher._spool.empty
+
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 5, 0, 0
+            )
+
+        async def test_flush_persists_dropped_events(self, publisher, put):
+            """Test that the events which the full event queue dropped are persisted on shutdown."""
+            publisher._queue = publisher._manager.queue = EventQueue(max_events=1)
+            publisher._queue.add_drop_listener(publisher._on_event_dropped)
+
+            put(2)
+
+            await publisher.async_flush(timeout=5)
+
+            assert self._spooled_ids(publisher) == ["light.entity_0"]
+
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 1, 1, 0
+            )
+
+        async def test_flush_timeout(self, publisher, put):
+            """Test that the events not published before the timeout are persisted, including the batch in flight."""
+            put(5)
+
+            async def bulk(actions):
+                if publisher._gateway.bulk.await_count > 1:
+                    await asyncio.sleep(10)
+
+            publisher._gateway.bulk.side_effect = bulk
+
+            with patch("custom_components.elasticsearch.es_publish_pipeline.SHUTDOWN_FLUSH_BATCH_SIZE", 2):
+                await publisher.async_flush(timeout=0.05)
+
+            assert self._spooled_ids(publisher) == ["light.entity_2", "light.entity_3", "light.entity_4"]
+
+            publisher._logger.warning.assert_called_once_with(
+                "Publishing the queued events did not complete within %ss.", 0.05
+            )
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 2, 3, 0
+            )
+
+        async def test_flush_timeout_while_draining(self, publisher, put, mock_document):
+            """Test that the events drained from the queue are persisted when the timeout passes during the drain."""
+            put(5)
+
+            async def sip_queue(deadline=None):
+                while not publisher._queue.empty():
+                    if deadline is not None and asyncio.get_running_loop().time() >= deadline:
+                        return
+
+                    _, state, _ = publisher._queue.get_nowait()
+                    await asyncio.sleep(0.02)
+                    yield {**mock_document, "hass.entity.id": state.entity_id}
+
+            async def bulk(actions):
+                await asyncio.sleep(0)
+
+            publisher._manager.sip_queue = sip_queue
+            publisher._gateway.bulk.side_effect = bulk
+
+            await publisher.async_flush(timeout=0.05)
+
+            assert self._spooled_ids(publisher) == [f"light.entity_{i}" for i in range(5)]
+
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 0, 5, 0
+            )
+
+        async def test_flush_retries(self, publisher, put, mock_document):
+            """Test that the pending retries are flushed first, and those handed back by the flush are persisted."""
+            put(5)
+
+            publisher._retry_later(
+                {
+                    "_op_type": "create",
+                    "_index": "metrics-test",
+                    "_source": {**mock_document, "hass.entity.id": "light.retry"},
+                }
+            )
+
+            published: list[str] = []
+
+            async def bulk(actions):
+                async for action in actions:
+                    published.append(action["_source"]["hass.entity.id"])
+
+                    if action["_source"]["hass.entity.id"] == "light.entity_4":
+                        publisher._retry_later(action)
+
+            publisher._gateway.bulk.side_effect = bulk
+
+            await publisher.async_flush(timeout=5)
+
+            assert published == ["light.retry"] + [f"light.entity_{i}" for i in range(5)]
+            assert self._spooled_ids(publisher) == ["light.entity_4"]
+
+            # The document handed back is counted as persisted rather than published
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 5, 1, 0
+            )
+
+        async def test_flush_disconnected(self, publisher, put):
+            """Test that the queued events are persisted when the connection is not available."""
+            put(5)
+
+            publisher._gateway.check_connection.return_value = False
+
+            await publisher.async_flush(timeout=5)
+
+            publisher._gateway.bulk.assert_not_called()
+            assert len(self._spooled_ids(publisher)) == 5
+
+        async def test_flush_waits_for_publish(self, publisher, put):
+            """Test that the flush does not run alongside a publish in progress."""
+            put(5)
+
+            async with publisher._publish_lock:
+                await publisher.async_flush(timeout=0.05)
+
+            publisher._gateway.bulk.assert_not_called()
+            assert len(self._spooled_ids(publisher)) == 5
+
+        async def test_flush_without_spool(self, publisher, put):
+            """Test that the events which could not be published are discarded without a spool."""
+            put(5)
+
+            publisher._spool = None
+            publisher._gateway.bulk.side_effect = CannotConnect
+
+            await publisher.async_flush(timeout=5)
+
+            publisher._logger.info.assert_called_once_with(
+                "Published %s queued event(s) on shutdown, persisted %s and discarded %s.", 0, 0, 5
+            )
+
+        async def test_flush_not_initialized(self, publisher, put):
+            """Test that nothing is flushed when the publisher was never initialized."""
+            put(5)
+
+            publisher._publish_loop = None
+
+            await publisher.async_flush(timeout=5)
+
+            publisher._gateway.check_connection.assert_not_called()
+            assert publisher._queue.qsize() == 5
+
+    @pytest.mark.parametrize("publisher_settings", [{"dead_letter_enabled": True}])
+    class Test_Dead_Letter:
+        """Run the tests for writing rejected documents to the dead letter file."""
+
+        async def test_async_init(self, publisher, config_entry, hass, mock_loop_handler):
+            """Test that the dead letter file is created under the config directory and listens for rejections."""
+            await publisher.async_init(config_entry=config_entry)
+
+            assert publisher._dead_letter is not None
+            assert publisher._dead_letter.file.parent == Path(
+                hass.config.path(".storage", "elasticsearch", "deadletter", config_entry.entry_id)
+            )
+            publisher._gateway.add_rejection_listener.assert_called_once_with(publisher._dead_letter.add)
+            assert publisher.diagnostics()["dead_letter"]["written"] == 0
+
+        async def test_rejected_documents_are_written(self, publisher, mock_logger, tmp_path):
+            """Test that documents rejected during a publish are written once the publish completes."""
+            publisher._dead_letter = DeadLetterFile(
+                path=tmp_path / "deadletter", max_bytes=0, log=mock_logger
+            )
+            publisher._gateway.check_connection.return_value = True
+
+            async def bulk(actions):
+                publisher._dead_letter.add(
+                    RejectedDocument(
+                        action={"_index": "metrics-test", "_source": {"hass.entity.id": "sensor.bad"}},
+                        operation="create",
+                        status=400,
+                        error_type="document_parsing_exception",
+                        error_reason="failed to parse",
+                    )
+                )
+
+            publisher._gateway.bulk.side_effect = bulk
+
+            await publisher.publish()
+
+            assert publisher.diagnostics()["dead_letter"]["written"] == 1
+            assert publisher.diagnostics()["dead_letter"]["entities"] == {"sensor.bad": 1}
+
+        async def test_flush_error_is_logged(self, publisher, mock_logger, tmp_path):
+            """Test that an error writing the dead letter file is logged instead of stopping the publish loop."""
+            publisher._dead_letter = DeadLetterFile(
+                path=tmp_path / "deadletter", max_bytes=0, log=mock_logger
+            )
+            publisher._gateway.check_connection.return_value = True
+            publisher._dead_letter.add(
+                RejectedDocument(
+                    action={"_index": "metrics-test", "_source": {"hass.entity.id": "sensor.bad"}},
+                    operation="create",
+                    status=400,
+                    error_type="document_parsing_exception",
+                    error_reason="failed to parse",
+                )
+            )
+
+            with patch.object(
+                publisher._dead_letter, "flush", side_effect=OSError("No space left on device")
+            ):
+                await publisher.publish()
+
+            publisher._logger.error.assert_called_once_with(
+                "Error writing rejected documents to the dead letter file, will retry on the next publish."
+            )
+
+        async def test_nothing_rejected_skips_flush(self, publisher, mock_logger, tmp_path):
+            """Test that the dead letter file is not flushed when no documents were rejected."""
+            publisher._dead_letter = DeadLetterFile(
+                path=tmp_path / "deadletter", max_bytes=0, log=mock_logger
+            )
+            publisher._gateway.check_connection.return_value = True
+
+            with patch.object(publisher._dead_letter, "flush") as flush:
+                await publisher.publish()
+
+            flush.assert_not_called()
+
 
 class Test_Formatter:
     """Test the Pipeline.Formatter class."""
@@ -1141,7 +2721,137 @@ class Test_Formatter:
             "data_stream.namespace": "default",
         }
 
-    async def test_state_to_extended_details(
+    @pytest.mark.parametrize(*testconst.ENTITY_STATE_MATRIX_COMPREHENSIVE)
+    async def test_format_matches_prepare_dict(
+        self,
+        formatter,
+        entity,
+        entity_state_value,
+        entity_state_change_type,
+        entity_attributes: dict,
+    ):
+        """Test that the document matches one built as a nested dict and cleaned with prepare_dict."""
+        time = datetime.now(tz=UTC)
+        state = State(entity_id=entity.entity_id, state=entity_state_value, attributes=entity_attributes)
+        reason = entity_state_change_type
+
+        static_fields = {"agent.version": "1.0.0", "host.location": [1.0, 2.0], "tags": []}
+
+        await formatter.async_init(static_fields=static_fields)
+
+        reference = utils.prepare_dict(
+            {
+                "@timestamp": time.isoformat(),
+                "event.action": reason.to_publish_reason(),
+                "event.kind": "event",
+                "event.type": "info" if reason == StateChangeType.NO_CHANGE else "change",
+                "hass.entity": {
+                    **formatter._entity_to_extended_details(state.entity_id),
+                    "friendly_name": state.name,
+                    "location": formatter._state_to_location(state),
+                },
+                "hass.entity.attributes": formatter._state_to_attributes(state),
+                "hass.entity.value": state.state,
+                "hass.entity.valueas": formatter._state_to_coerced_value(state),
+                "hass.entity.object.id": state.object_id,
+                **formatter.domain_to_datastream(state.domain),
+                **static_fields,
+            }
+        )
+
+        # Format twice, so that the cached entity fragment is used as well
+        assert list(formatter.format(time, state, reason).items()) == list(reference.items())
+        assert list(formatter.format(time, state, reason).items()) == list(reference.items())
+
+        formatter.stop()
+
+    async def test_entity_fragment_is_cached(self, entity, entity_state, formatter):
+        """Test that the registries are only consulted the first time an entity is formatted."""
+        await formatter.async_init(static_fields={})
+
+        time = datetime.now(tz=UTC)
+
+        with patch.object(
+            formatter, "_entity_to_extended_details", wraps=formatter._entity_to_extended_details
+        ) as entity_to_extended_details:
+            first = formatter.format(time, entity_state, StateChangeType.STATE)
+            second = formatter.format(time, entity_state, StateChangeType.STATE)
+
+        entity_to_extended_details.assert_called_once_with(entity.entity_id)
+        assert first == second
+
+        formatter.stop()
+
+    async def test_entity_fragment_invalidated_on_entity_registry_update(
+        self, hass, entity, entity_state, entity_registry, formatter
+    ):
+        """Test that updating an entity in the registry rebuilds its fragment."""
+        await formatter.async_init(static_fields={})
+
+        time = datetime.now(tz=UTC)
+
+        formatter.format(time, entity_state, StateChangeType.STATE)
+
+        entity_registry.async_update_entity(entity.entity_id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        document = formatter.format(time, entity_state, StateChangeType.STATE)
+
+        assert document["hass.entity.labels"] == ["new_label"]
+
+        formatter.stop()
+
+    async def test_entity_fragment_invalidated_on_device_registry_update(
+        self, hass, entity, device, entity_state, device_registry, formatter
+    ):
+        """Test that updating a device in the registry rebuilds the fragments of its entities."""
+        await formatter.async_init(static_fields={})
+
+        time = datetime.now(tz=UTC)
+
+        formatter.format(time, entity_state, StateChangeType.STATE)
+
+        device_registry.async_update_device(device.id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        document = formatter.format(time, entity_state, StateChangeType.STATE)
+
+        assert document["hass.entity.device.labels"] == ["new_label"]
+
+        formatter.stop()
+
+    async def test_entity_fragment_invalidated_on_area_registry_update(
+        self, hass, entity, entity_state, area_registry, formatter
+    ):
+        """Test that updating an area forgets every cached fragment."""
+        await formatter.async_init(static_fields={})
+
+        formatter.format(datetime.now(tz=UTC), entity_state, StateChangeType.STATE)
+
+        assert entity.entity_id in formatter._fragments
+
+        area_registry.async_create("New Area")
+        await hass.async_block_till_done()
+
+        assert formatter._fragments == {}
+
+        formatter.stop()
+
+    async def test_entity_fragment_kept_after_stop(
+        self, hass, entity, entity_state, entity_registry, formatter
+    ):
+        """Test that registry updates are no longer tracked once the formatter is stopped."""
+        await formatter.async_init(static_fields={})
+
+        formatter.format(datetime.now(tz=UTC), entity_state, StateChangeType.STATE)
+        formatter.stop()
+
+        entity_registry.async_update_entity(entity.entity_id, labels={"new_label"})
+        await hass.async_block_till_done()
+
+        assert entity.entity_id in formatter._fragments
+
+    async def test_entity_to_extended_details(
         self,
         formatter,
         entity: RegistryEntry,
@@ -1155,31 +2865,18 @@ class Test_Formatter:
         device_labels,
         snapshot,
     ):
-        """Test converting a state to entity details."""
-        state = State(
-            entity_id=entity.entity_id,
-            state="on",
-            attributes={
-                "brightness": 255,
-                "latitude": 1.0,
-                "longitude": 1.0,
-            },
-        )
-
-        entity_details = formatter._state_to_extended_details(state)
+        """Test gathering the registry details of an entity."""
+        entity_details = formatter._entity_to_extended_details(entity.entity_id)
 
         assert entity_details == snapshot
 
-    async def test_state_to_extended_details_exception(
+    async def test_entity_to_extended_details_exception(
         self,
         formatter,
-        snapshot,
     ):
         """Test that we properly raise an exception when we canoot get additional entity details."""
-        state = State(entity_id="tomato.pancakes", state="on", attributes={"brightness": 255})
-
         with pytest.raises(ValueError):
-            formatter._state_to_extended_details(state)
+            formatter._entity_to_extended_details("tomato.pancakes")
 
     @pytest.mark.parametrize(*testconst.DEVICE_MATRIX_SIMPLE)
     @pytest.mark.parametrize(*testconst.ENTITY_MATRIX_SIMPLE)
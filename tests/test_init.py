@@ -19,6 +19,7 @@ from custom_components.elasticsearch.errors import ESIntegrationException
 from custom_components.elasticsearch.es_integration import ElasticIntegration
 from freezegun.api import FrozenDateTimeFactory
 from homeassistant.config_entries import ConfigEntryState, ConfigFlow
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.setup import async_setup_component
 from pytest_homeassistant_custom_component.common import (
     MockConfigEntry,  # noqa: F401
@@ -640,6 +641,28 @@ class Test_Public_Methods:
         assert await hass.config_entries.async_unload(config_entry.entry_id)
         await hass.async_block_till_done()
 
+    async def test_async_setup_entry_shutdown_on_stop(
+        self,
+        hass: HomeAssistant,
+        integration_setup: Callable[[], Awaitable[bool]],
+        config_entry: ConfigEntry,
+        _block_init_async_init,
+    ) -> None:
+        """Test that the integration is shut down, flushing its queued events, when Home Assistant stops."""
+        with mock.patch(
+            f"{MODULE}.es_integration.ElasticIntegration.async_shutdown",
+            return_value=True,
+        ) as mock_shutdown:
+            assert await integration_setup()
+            assert config_entry.state is ConfigEntryState.LOADED
+
+            mock_shutdown.assert_not_called()
+
+            hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+            await hass.async_block_till_done()
+
+            mock_shutdown.assert_awaited_once()
+
     async def test_async_setup_entry_async_init_integration_exception(
         self,
         hass: HomeAssistant,
@@ -2,11 +2,63 @@
 
 import asyncio
 import time
-from unittest.mock import AsyncMock, MagicMock
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from custom_components.elasticsearch.logger import LOGGER as BASE_LOGGER
-from custom_components.elasticsearch.loop import LoopHandler
+from custom_components.elasticsearch.loop import DrainBudget, LoopHandler, LoopLagMonitor, LoopMode
+
+
+class ManualTimer:
+    """Timer scheduled on a manual clock."""
+
+    def __init__(self, when: float, callback: Callable[[], Any]) -> None:
+        """Initialize the timer."""
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel the timer."""
+        self.cancelled = True
+
+
+class ManualClock:
+    """Clock whose time only moves when the test advances it."""
+
+    def __init__(self, now: float = 1000) -> None:
+        """Initialize the clock."""
+        self.now = now
+        self.timers: list[ManualTimer] = []
+
+    def time(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def call_at(self, when: float, callback: Callable[[], Any]) -> ManualTimer:
+        """Schedule the callback for the given time."""
+        timer = ManualTimer(when, callback)
+        self.timers.append(timer)
+        return timer
+
+    async def advance(self, seconds: float) -> None:
+        """Move the clock forward, firing the timers that became due and letting the event loop catch up."""
+        self.now += seconds
+
+        for _ in range(10):
+            for timer in [timer for timer in self.timers if not timer.cancelled and timer.when <= self.now]:
+                timer.cancelled = True
+                timer.callback()
+
+            await asyncio.sleep(0)
+
+
+@pytest.fixture(name="clock")
+def clock_fixture() -> ManualClock:
+    """Return a manual clock."""
+    return ManualClock()
 
 
 class Test_Initialization:
@@ -29,8 +81,9 @@ class Test_Initialization:
         assert loop_handler._should_stop is False
         assert loop_handler._run_count == 0
         assert loop_handler._log == BASE_LOGGER
-        assert loop_handler._next_run_time <= time.monotonic()
-        assert loop_handler._next_run_time >= time.monotonic() - 2
+        assert loop_handler._mode is LoopMode.FIXED_RATE
+        assert loop_handler._clock is None
+        assert loop_handler._next_run_time is None
 
 
 class Test_Loop_Handler:
@@ -100,13 +153,16 @@ class Test_Loop_Handler:
 
         assert loop_task.done()
 
-    async def test_loop_handler_time_to_run(self):
+    async def test_loop_handler_time_to_run(self, clock: ManualClock):
         """Test the _time_to_run method of LoopHandler."""
         mock_func = MagicMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+        loop_handler = LoopHandler(mock_func, "test_loop", 1, clock=clock)
+
+        # Nothing is scheduled before the first run
+        assert loop_handler._time_to_run() is True
 
         # Set the next run time to be in the future
-        loop_handler._next_run_time = time.monotonic() + 100
+        loop_handler._next_run_time = clock.time() + 100
 
         assert loop_handler._time_to_run() is False
 
@@ -115,76 +171,303 @@ class Test_Loop_Handler:
 
         assert loop_handler._time_to_run() is True
 
-    async def test_loop_handler_time_until_next_run(self):
+    async def test_loop_handler_time_until_next_run(self, clock: ManualClock):
         """Test the _time_until_next_run method of LoopHandler."""
         mock_func = MagicMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+        loop_handler = LoopHandler(mock_func, "test_loop", 1, clock=clock)
 
-        # Set the next run time to be in the future
-        loop_handler._next_run_time = time.monotonic() + 100
+        # Set the next run time to be in the future, which is not rounded to whole seconds
+        loop_handler._next_run_time = clock.time() + 0.25
 
-        assert loop_handler._time_until_next_run() <= 100
-        assert loop_handler._time_until_next_run() > 90
+        assert loop_handler._time_until_next_run() == 0.25
 
         # Set the next run time to be in the past
         loop_handler._next_run_time = 0
 
         assert loop_handler._time_until_next_run() == 0
 
-    async def test_loop_handler_schedule_next_run(self):
-        """Test the _schedule_next_run method of LoopHandler."""
-        mock_func = MagicMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+    async def test_loop_handler_schedule_next_run_fixed_rate(self, clock: ManualClock):
+        """Test that fixed rate runs start a fixed interval apart, skipping missed runs."""
+        loop_handler = LoopHandler(MagicMock(), "test_loop", 10, clock=clock)
 
-        # Set the next run time to be in the past
-        loop_handler._next_run_time = 0
+        clock.now = 1000.5
+        loop_handler._schedule_next_run(started=1000)
 
-        loop_handler._schedule_next_run()
+        assert loop_handler._next_run_time == 1010
 
-        assert loop_handler._next_run_time > 0
+        # The previous run overran two intervals, so the next run keeps to the original phase
+        clock.now = 1025
+        loop_handler._schedule_next_run(started=1000)
 
-    async def test_loop_handler_wait_for_next_run(self):
-        """Test the _wait_for_next_run method of LoopHandler."""
+        assert loop_handler._next_run_time == 1030
 
-        mock_func = MagicMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+    async def test_loop_handler_schedule_next_run_fixed_delay(self, clock: ManualClock):
+        """Test that fixed delay runs start a fixed interval after the previous run finished."""
+        loop_handler = LoopHandler(MagicMock(), "test_loop", 10, mode=LoopMode.FIXED_DELAY, clock=clock)
 
-        # Set the next run time to be in the past
-        loop_handler._next_run_time = time.monotonic() + 1
+        clock.now = 1003
+        loop_handler._schedule_next_run(started=1000)
 
-        assert loop_handler._time_to_run() is False
+        assert loop_handler._next_run_time == 1013
 
-        await loop_handler._wait_for_next_run()
+    async def test_loop_handler_wait_for_next_run(self, clock: ManualClock):
+        """Test that waiting for the next run sleeps on a timer rather than polling the clock."""
+        loop_handler = LoopHandler(MagicMock(), "test_loop", 1, clock=clock)
+        loop_handler._next_run_time = clock.time() + 10
 
+        wait_task = asyncio.ensure_future(loop_handler._wait_for_next_run())
+
+        await clock.advance(9.5)
+        assert not wait_task.done()
+        assert len(clock.timers) == 1
+
+        await clock.advance(0.5)
+        assert wait_task.done()
         assert loop_handler._time_to_run() is True
 
-    async def test_loop_handler_wait_for_next_run_should_stop(self):
-        """Test the _wait_for_next_run method of LoopHandler."""
+    async def test_loop_handler_wait_for_next_run_should_stop(self, clock: ManualClock):
+        """Test that stopping the loop ends the wait for the next run straight away."""
+        loop_handler = LoopHandler(MagicMock(), "test_loop", 1, clock=clock)
+        loop_handler._next_run_time = clock.time() + 30
 
-        mock_func = MagicMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+        wait_task = asyncio.ensure_future(loop_handler._wait_for_next_run())
+        await clock.advance(0)
 
-        # Set the next run time to be in the future
-        loop_handler._next_run_time = time.monotonic() + 30
-        loop_handler._should_stop_running = MagicMock(return_value=True)
+        loop_handler.stop()
+        await clock.advance(0)
+
+        assert wait_task.done()
+        assert all(timer.cancelled for timer in clock.timers)
+
+    async def test_loop_handler_cancelled(self, clock: ManualClock):
+        """Test that cancelling the loop cancels its timer."""
+        loop_handler = LoopHandler(AsyncMock(), "test_loop", 60, clock=clock)
+
+        loop_task = asyncio.ensure_future(loop_handler.start())
+        await loop_handler.wait_for_first_run()
+        await clock.advance(0)
+
+        loop_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await loop_task
+
+        assert len(clock.timers) == 1
+        assert clock.timers[0].cancelled
+
+    async def test_loop_handler_fixed_rate(self, clock: ManualClock):
+        """Test that fixed rate runs do not drift by the time spent running."""
+        runs: list[float] = []
+
+        async def func() -> None:
+            runs.append(clock.time())
+            clock.now += 3
+
+        loop_handler = LoopHandler(func, "test_loop", 10, clock=clock)
+
+        loop_task = asyncio.ensure_future(loop_handler.start())
+        await loop_handler.wait_for_first_run()
+
+        await clock.advance(7)
+        await clock.advance(7)
+
+        assert runs == [1000, 1010, 1020]
+
+        loop_handler.stop()
+        await asyncio.wait_for(loop_task, timeout=1)
+
+    async def test_loop_handler_fixed_delay(self, clock: ManualClock):
+        """Test that fixed delay runs wait a full interval after the previous run finished."""
+        runs: list[float] = []
+
+        async def func() -> None:
+            runs.append(clock.time())
+            clock.now += 3
+
+        loop_handler = LoopHandler(func, "test_loop", 10, mode=LoopMode.FIXED_DELAY, clock=clock)
+
+        loop_task = asyncio.ensure_future(loop_handler.start())
+        await loop_handler.wait_for_first_run()
+
+        await clock.advance(7)
+        assert runs == [1000]
+
+        await clock.advance(3)
+        assert runs == [1000, 1013]
+
+        loop_handler.stop()
+        await asyncio.wait_for(loop_task, timeout=1)
 
-        # wait for the next run time should throw a runtimeerror using pytest raises
-        with pytest.raises(RuntimeError):
-            await loop_handler._wait_for_next_run()
+    @pytest.mark.parametrize("mode", [LoopMode.FIXED_RATE, LoopMode.FIXED_DELAY])
+    async def test_loop_handler_wake_now_while_running(self, clock: ManualClock, mode: LoopMode):
+        """Test that waking the loop while it runs starts another run as soon as it finishes."""
+        loop_handler: LoopHandler
 
-    async def test_loop_handler_wait_for_next_run_should_spin(self):
-        """Test the _wait_for_next_run method of LoopHandler."""
+        async def func() -> None:
+            if loop_handler.get_run_count() == 1:
+                loop_handler.wake_now()
+
+        loop_handler = LoopHandler(func, "test_loop", 60, mode=mode, clock=clock)
+
+        loop_task = asyncio.ensure_future(loop_handler.start())
+        await clock.advance(0)
+
+        assert loop_handler.get_run_count() == 2
+        assert loop_handler._next_run_time == 1060
+
+        loop_handler.stop()
+        await asyncio.wait_for(loop_task, timeout=1)
+
+    async def test_loop_handler_wake_now(self):
+        """Test that wake_now runs the loop ahead of its schedule."""
 
         mock_func = AsyncMock()
-        loop_handler = LoopHandler(mock_func, "test_loop", 1)
+        loop_handler = LoopHandler(mock_func, "test_loop", 60)
 
-        # Set the next run time to be in the future
-        loop_handler._next_run_time = time.monotonic() + 1
-        loop_handler._spin = AsyncMock()
-        loop_handler._should_stop_running = MagicMock(side_effect=[False, True])
+        loop_task = asyncio.ensure_future(loop_handler.start())
+        await loop_handler.wait_for_first_run()
+
+        assert loop_handler.get_run_count() == 1
+        assert loop_handler._time_to_run() is False
+
+        loop_handler.wake_now()
+
+        # The timer is interrupted, so the loop runs again well before the frequency has elapsed
+        await asyncio.wait_for(_wait_for_run_count(loop_handler, 2), timeout=1)
+
+        loop_handler.stop()
+        loop_handler.wake_now()
+
+        await asyncio.wait_for(loop_task, timeout=1)
+
+
+class Test_Drain_Budget:
+    """Test the DrainBudget class."""
+
+    async def test_yields_after_max_items(self):
+        """Test that the budget yields to the event loop every max_items checkpoints."""
+        budget = DrainBudget(max_items=3, max_time=0)
+
+        with patch("custom_components.elasticsearch.loop.asyncio.sleep", AsyncMock()) as sleep:
+            for _ in range(7):
+                await budget.checkpoint()
+
+        assert sleep.await_count == 2
+        assert budget.yields == 2
+
+    async def test_yields_after_max_time(self):
+        """Test that the budget yields to the event loop once the time budget is spent."""
+        budget = DrainBudget(max_items=0, max_time=0.005)
+
+        with (
+            patch("custom_components.elasticsearch.loop.time.monotonic", side_effect=[0.001, 0.006, 0.007]),
+            patch("custom_components.elasticsearch.loop.asyncio.sleep", AsyncMock()) as sleep,
+        ):
+            budget._started = 0.0
+
+            await budget.checkpoint()
+            assert sleep.await_count == 0
+
+            await budget.checkpoint()
+            assert sleep.await_count == 1
+
+    async def test_disabled(self):
+        """Test that a budget without limits never yields."""
+        budget = DrainBudget(max_items=0, max_time=0)
+
+        with patch("custom_components.elasticsearch.loop.asyncio.sleep", AsyncMock()) as sleep:
+            for _ in range(100):
+                await budget.checkpoint()
+
+        sleep.assert_not_awaited()
+
+    async def test_lets_other_tasks_run(self):
+        """Test that a long drain lets other tasks run before it finishes."""
+        budget = DrainBudget(max_items=10, max_time=0)
+        progress: list[int] = []
+
+        async def drain() -> None:
+            for item in range(100):
+                progress.append(item)
+                await budget.checkpoint()
+
+        async def other() -> int:
+            return len(progress)
+
+        drain_task = asyncio.ensure_future(drain())
+        other_task = asyncio.ensure_future(other())
+
+        await asyncio.gather(drain_task, other_task)
+
+        assert other_task.result() < 100
+
+
+class Test_Loop_Lag_Monitor:
+    """Test the LoopLagMonitor class."""
+
+    async def test_diagnostics_without_samples(self):
+        """Test the diagnostics before any sample was taken."""
+        assert LoopLagMonitor().diagnostics() == {
+            "samples": 0,
+            "last_ms": 0.0,
+            "max_ms": 0.0,
+            "mean_ms": None,
+        }
+
+    async def test_record(self):
+        """Test that samples are summarized in milliseconds."""
+        monitor = LoopLagMonitor()
+
+        monitor.record(0.002)
+        monitor.record(0.010)
+        monitor.record(0.003)
+
+        assert monitor.diagnostics() == {"samples": 3, "last_ms": 3.0, "max_ms": 10.0, "mean_ms": 5.0}
+
+    async def test_samples_running_loop(self):
+        """Test that the monitor samples the running loop until it is stopped."""
+        monitor = LoopLagMonitor(interval=0.01)
+
+        monitor.start()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+        samples = monitor.diagnostics()["samples"]
+        assert samples > 0
+
+        await asyncio.sleep(0.05)
+
+        assert monitor.diagnostics()["samples"] == samples
+
+    async def test_sampling(self):
+        """Test that the monitor only samples while a sampling context is active, counting nested contexts."""
+        monitor = LoopLagMonitor(interval=0.01)
+
+        with monitor.sampling():
+            with monitor.sampling():
+                assert monitor._handle is not None
+
+            assert monitor._handle is not None
+
+            time.sleep(0.03)
+
+        assert monitor._handle is None
+
+        # The sample which was due while the loop was blocked is recorded when sampling stops
+        assert monitor.diagnostics()["samples"] == 1
+        assert monitor.diagnostics()["max_ms"] >= 20
+
+    async def test_measures_blocked_loop(self):
+        """Test that blocking the event loop shows up as lag."""
+        monitor = LoopLagMonitor(interval=0.01)
+
+        monitor.start()
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        monitor.stop()
+
+        assert monitor.diagnostics()["max_ms"] >= 30
 
-        # will throw a runtimeerror using pytest raises
-        with pytest.raises(RuntimeError):
-            await loop_handler._wait_for_next_run()
 
-        assert loop_handler._spin.call_count >= 1
+async def _wait_for_run_count(loop_handler: LoopHandler, count: int) -> None:
+    while loop_handler.get_run_count() < count:
+        await asyncio.sleep(0.01)
@@ -0,0 +1,86 @@
+"""Tests for the polling_schedule module."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from custom_components.elasticsearch.polling_schedule import PollingSchedule, PollingScheduleKey
+from homeassistant.core import State
+
+
+def _entity(labels: set[str]) -> MagicMock:
+    entity = MagicMock()
+    entity.labels = labels
+    return entity
+
+
+class Test_Polling_Schedule:
+    """Test the PollingSchedule class."""
+
+    @pytest.mark.parametrize(
+        ("entry", "expected"),
+        [
+            ("domain:sun=3600", (PollingScheduleKey.DOMAIN, "sun", 3600)),
+            (" device_class:temperature = 60 ", (PollingScheduleKey.DEVICE_CLASS, "temperature", 60)),
+            ("label:energy=0", (PollingScheduleKey.LABEL, "energy", 0)),
+        ],
+        ids=["domain", "device class with whitespace", "disabled label"],
+    )
+    def test_parse_entry(self, entry, expected):
+        """Test parsing valid entries."""
+        assert PollingSchedule.parse_entry(entry) == expected
+
+    @pytest.mark.parametrize(
+        "entry",
+        ["domain:sun", "domain:=60", "area:kitchen=60", "domain:sun=hourly", "domain:sun=-1", "sun=60"],
+        ids=["no frequency", "no value", "unknown key", "invalid frequency", "negative frequency", "no key"],
+    )
+    def test_parse_invalid_entry(self, entry):
+        """Test that invalid entries are rejected."""
+        with pytest.raises(ValueError, match="Polling schedule entry"):
+            PollingSchedule.parse_entry(entry)
+
+    def test_frequency_precedence(self):
+        """Test that labels take precedence over device classes, which take precedence over domains."""
+        schedule = PollingSchedule(
+            default=300,
+            entries=["domain:sensor=120", "device_class:energy=10", "label:slow=3600", "label:fast=5"],
+        )
+
+        energy = State("sensor.energy", "1", {"device_class": "energy"})
+        temperature = State("sensor.temperature", "1", {"device_class": "temperature"})
+
+        assert schedule.frequency(energy, _entity({"slow", "fast"})) == 5
+        assert schedule.frequency(energy, _entity({"slow"})) == 3600
+        assert schedule.frequency(energy, _entity(set())) == 10
+        assert schedule.frequency(temperature, None) == 120
+        assert schedule.frequency(State("sun.sun", "above_horizon"), None) == 300
+
+    def test_conflicting_labels(self):
+        """Test that a label which disables polling does not override a label which enables it."""
+        schedule = PollingSchedule(default=300, entries=["label:a=0", "label:b=60", "label:c=0", "label:d=0"])
+
+        sensor = State("sensor.power", "1")
+
+        assert schedule.frequency(sensor, _entity({"a", "b"})) == 60
+        assert schedule.frequency(sensor, _entity({"c", "d"})) == 0
+
+    def test_repeated_entry(self):
+        """Test that an entry repeated with a frequency of zero does not disable polling."""
+        schedule = PollingSchedule(default=300, entries=["domain:sun=0", "domain:sun=3600"])
+
+        assert schedule.frequency(State("sun.sun", "above_horizon"), None) == 3600
+
+    def test_frequencies(self):
+        """Test that every distinct frequency other than zero gets its own loop."""
+        schedule = PollingSchedule(default=60, entries=["domain:sun=3600", "domain:zone=0", "label:a=60"])
+
+        assert schedule.has_entries
+        assert schedule.frequencies == {60, 3600}
+
+    def test_empty(self):
+        """Test that a schedule without entries polls everything at the default frequency."""
+        schedule = PollingSchedule(default=0)
+
+        assert not schedule.has_entries
+        assert schedule.frequencies == set()
+        assert schedule.frequency(State("sun.sun", "above_horizon"), None) == 0
@@ -0,0 +1,181 @@
+"""Tests for the spool module."""
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from custom_components.elasticsearch.spool import CHECKPOINT_FILE, Spool, SpoolPosition
+
+
+def _lines(start: int, count: int) -> list[bytes]:
+    return [
+        json.dumps({"_index": "metrics-test", "_source": {"id": i}}).encode()
+        for i in range(start, start + count)
+    ]
+
+
+def _ids(actions: list[dict]) -> list[int]:
+    return [action["_source"]["id"] for action in actions]
+
+
+@pytest.fixture(name="spool")
+def spool_fixture(tmp_path: Path) -> Spool:
+    """Return an opened spool with small segments."""
+    spool = Spool(path=tmp_path / "spool", max_bytes=0, segment_max_bytes=200)
+    spool.open()
+    return spool
+
+
+class Test_Spool:
+    """Test the Spool class."""
+
+    def test_empty(self, spool: Spool):
+        """Test that a new spool has nothing to replay."""
+        assert spool.empty
+
+        batch = spool.read(10)
+
+        assert batch.actions == []
+
+    def test_append_and_read_in_order(self, spool: Spool):
+        """Test that actions are replayed in the order they were spooled, across segments."""
+        assert spool.append(_lines(0, 5)) == 5
+        assert spool.append(_lines(5, 5)) == 5
+
+        assert not spool.empty
+        assert spool.diagnostics()["segments"] > 1
+
+        batch = spool.read(100)
+
+        assert _ids(batch.actions) == list(range(10))
+
+    def test_read_does_not_advance_without_commit(self, spool: Spool):
+        """Test that reading alone does not move the checkpoint."""
+        spool.append(_lines(0, 5))
+
+        assert _ids(spool.read(3).actions) == [0, 1, 2]
+        assert _ids(spool.read(3).actions) == [0, 1, 2]
+
+    def test_commit_advances_and_cleans_up(self, spool: Spool, tmp_path: Path):
+        """Test that committing batches advances the checkpoint and removes replayed segments."""
+        spool.append(_lines(0, 5))
+        spool.append(_lines(5, 5))
+
+        batch = spool.read(4)
+        spool.commit(batch.position, len(batch.actions))
+
+        assert _ids(spool.read(100).actions) == list(range(4, 10))
+
+        batch = spool.read(100)
+        spool.commit(batch.position, len(batch.actions))
+
+        assert spool.empty
+        assert list((tmp_path / "spool").glob("*.ndjson")) == []
+        assert spool.diagnostics()["replayed"] == 10
+
+    def test_commit_part_of_a_batch(self, spool: Spool):
+        """Test that committing the position after part of a batch replays the rest of it again."""
+        spool.append(_lines(0, 10))
+
+        batch = spool.read(100)
+        spool.commit(batch.position_after(6), 6)
+
+        assert _ids(spool.read(100).actions) == list(range(6, 10))
+        assert spool.diagnostics()["replayed"] == 6
+
+        # The spool keeps working after it has been emptied
+        spool.append(_lines(10, 2))
+
+        assert _ids(spool.read(100).actions) == [10, 11]
+
+    def test_resume_after_restart(self, spool: Spool, tmp_path: Path):
+        """Test that a new spool resumes from the committed checkpoint without losing or repeating events."""
+        spool.append(_lines(0, 10))
+
+        batch = spool.read(6)
+        spool.commit(batch.position, len(batch.actions))
+
+        # Simulate a crash after reading, but before committing, the next batch
+        spool.read(2)
+
+        restarted = Spool(path=tmp_path / "spool", max_bytes=0, segment_max_bytes=200)
+        restarted.open()
+
+        restarted.append(_lines(10, 2))
+
+        assert _ids(restarted.read(100).actions) == list(range(6, 12))
+
+    def test_partial_line_is_skipped(self, spool: Spool, tmp_path: Path):
+        """Test that a partially written line left by a crash is skipped."""
+        spool.append(_lines(0, 2))
+
+        segment = sorted((tmp_path / "spool").glob("*.ndjson"))[-1]
+        with segment.open("ab") as segment_file:
+            segment_file.write(b'{"_index": "metrics-test", "_sou')
+
+        restarted = Spool(path=tmp_path / "spool", max_bytes=0)
+        restarted.open()
+
+        batch = restarted.read(100)
+        assert _ids(batch.actions) == [0, 1]
+
+        restarted.commit(batch.position, len(batch.actions))
+        assert restarted.empty
+
+    def test_unreadable_checkpoint(self, spool: Spool, tmp_path: Path):
+        """Test that an unreadable checkpoint replays from the oldest segment."""
+        spool.append(_lines(0, 2))
+
+        (tmp_path / "spool" / CHECKPOINT_FILE).write_text("not json", encoding="utf-8")
+
+        restarted = Spool(path=tmp_path / "spool", max_bytes=0)
+        restarted.open()
+
+        assert _ids(restarted.read(100).actions) == [0, 1]
+
+    def test_max_bytes(self, tmp_path: Path):
+        """Test that batches which do not fit in the spool are rejected."""
+        spool = Spool(path=tmp_path / "spool", max_bytes=100)
+        spool.open()
+
+        assert spool.append(_lines(0, 1)) == 1
+        assert spool.append(_lines(1, 10)) == 0
+
+        assert spool.diagnostics()["rejected"] == 10
+        assert _ids(spool.read(100).actions) == [0]
+
+    def test_empty_does_not_touch_the_disk(self, spool: Spool):
+        """Test that checking for spooled actions neither reads the disk nor waits for a write in progress."""
+        spool.append(_lines(0, 2))
+
+        with spool._lock, patch.object(Path, "stat", side_effect=AssertionError):
+            assert not spool.empty
+
+        batch = spool.read(100)
+        spool.commit(batch.position, len(batch.actions))
+
+        with spool._lock, patch.object(Path, "stat", side_effect=AssertionError):
+            assert spool.empty
+
+    def test_pending_bytes_after_restart(self, spool: Spool, tmp_path: Path):
+        """Test that the pending bytes are recovered from the segments and the checkpoint on open."""
+        spool.append(_lines(0, 4))
+
+        batch = spool.read(2)
+        spool.commit(batch.position, len(batch.actions))
+
+        restarted = Spool(path=tmp_path / "spool", max_bytes=0, segment_max_bytes=200)
+        restarted.open()
+
+        assert restarted.diagnostics()["pending_bytes"] == spool.diagnostics()["pending_bytes"] > 0
+
+    def test_stale_commit_is_ignored(self, spool: Spool):
+        """Test that committing a position behind the checkpoint does nothing."""
+        spool.append(_lines(0, 5))
+
+        batch = spool.read(3)
+        spool.commit(batch.position, len(batch.actions))
+        spool.commit(SpoolPosition(), 3)
+
+        assert _ids(spool.read(100).actions) == [3, 4]
@@ -1,6 +1,6 @@
 """Utility functions for the Elasticsearch Integration."""
 
-from custom_components.elasticsearch.utils import flatten_dict
+from custom_components.elasticsearch.utils import flatten_dict, flatten_dict_into, prepare_dict
 
 
 def test_flatten_dict():
@@ -44,3 +44,36 @@ def test_flatten_dict():
     }
 
     assert flatten_dict(nested_dict) == expected_result
+
+
+def test_flatten_dict_into():
+    """Test that flatten_dict_into matches prepare_dict, including the values it skips."""
+    nested_dict = {
+        "a": 1,
+        "b": {
+            "c": [2, 3, 4],
+            "d": {
+                "e": (5, 6, 7),
+                "empty": {},
+            },
+            "none": None,
+            "list": [],
+        },
+        "f": {8, 9, 10},
+        "g": {
+            "zero": 0,
+            "false": False,
+            "string": "",
+            "tuple": (),
+            "set": set(),
+        },
+    }
+
+    target = {"existing": "value"}
+
+    flatten_dict_into(target=target, d=nested_dict)
+
+    assert list(target.items()) == [("existing", "value"), *prepare_dict(nested_dict).items()]
+
+    assert flatten_dict_into(target={}, d={"a": {"b": None}}, parent_key="prefix") == {}
+    assert flatten_dict_into(target={}, d={"a": {"b": 1}}, parent_key="prefix") == {"prefix.a.b": 1}